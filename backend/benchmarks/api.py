@@ -0,0 +1,167 @@
+"""
+Load-test the main API endpoints at several data scales.
+
+    python benchmarks/api.py --scales 1000,10000,100000 --output results.json
+    python benchmarks/compare.py baseline.json results.json
+
+For each scale the dataset is grown with generate_load_data to that many
+products, with --movements-per-product stock movements each, and every
+scenario is requested --repeat times through the Django test client.
+Reported per scenario: throughput (requests/s), median/p95/p99 latency in
+milliseconds and SQL queries per request. The API response cache is off
+(dummy backend) unless --with-cache is given, so the numbers reflect the
+database and serialization work. See common.py for which database is used.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+if '--with-cache' not in sys.argv:
+    os.environ.setdefault('CACHE_BACKEND', 'dummy')
+
+from common import analyze, prepare_database, summarize  # noqa: E402
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from inventory.models import Category, Product, StockMovement  # noqa: E402
+
+
+def consume(response):
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def scenarios(rng):
+    """name -> callable(client, iteration) returning a response"""
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    category = Category.objects.order_by('id').values_list('id', flat=True).first()
+    words = ['keyboard', 'lamp', 'cab', 'pro mo', 'usb', 'chair']
+    week_ago = (timezone.localdate() - timedelta(days=7)).isoformat()
+
+    def adjust(client, i):
+        # Alternate +1/-1 on the same product so stock levels stay put
+        product = product_ids[(i // 2) % len(product_ids)]
+        return client.post(
+            f'/api/products/{product}/adjust_stock/',
+            {'adjustment_type': 'add' if i % 2 == 0 else 'subtract', 'quantity': 1},
+            content_type='application/json',
+        )
+
+    return {
+        'product_list': lambda client, i: client.get('/api/products/'),
+        'product_detail': lambda client, i: client.get(f'/api/products/{rng.choice(product_ids)}/'),
+        'product_search': lambda client, i: client.get('/api/products/', {'search': words[i % len(words)]}),
+        'product_filter': lambda client, i: client.get(
+            '/api/products/', {'category': category, 'is_active': 'true'}
+        ),
+        'export_csv': lambda client, i: consume(client.get('/api/products/export_csv/')),
+        'adjust_stock': adjust,
+        'movement_list': lambda client, i: client.get('/api/stock-movements/'),
+        'movement_filter': lambda client, i: client.get(
+            '/api/stock-movements/', {'movement_type': 'ADJ', 'date_from': week_ago}
+        ),
+    }
+
+
+def run_scenario(client, request, repeat):
+    request(client, 0)  # warm up
+    timings = []
+    started = time.perf_counter()
+    for i in range(1, repeat + 1):
+        began = time.perf_counter()
+        response = request(client, i)
+        timings.append((time.perf_counter() - began) * 1000)
+        assert response.status_code == 200, response.status_code
+    elapsed = time.perf_counter() - started
+
+    with CaptureQueriesContext(connection) as ctx:
+        request(client, repeat + 1)
+    return {
+        'requests': repeat,
+        'throughput_rps': round(repeat / elapsed, 1),
+        **summarize(timings),
+        'queries': len(ctx.captured_queries),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='1000,10000,100000',
+                        help='Comma separated product counts, measured in increasing order')
+    parser.add_argument('--movements-per-product', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--export-repeat', type=int, default=3,
+                        help='Repetitions for export_csv, which reads every product')
+    parser.add_argument('--only', default=None, help='Comma separated scenario names to run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--with-cache', action='store_true', help='Keep the API response cache enabled')
+    parser.add_argument('--output', default=None, help='Also write the JSON report to this file')
+    args = parser.parse_args()
+
+    scales = sorted(int(scale) for scale in args.scales.split(','))
+    only = set(args.only.split(',')) if args.only else None
+
+    prepare_database()
+    report = {
+        'revision': git_revision(),
+        'vendor': connection.vendor,
+        'python': platform.python_version(),
+        'cache': args.with_cache,
+        'movements_per_product': args.movements_per_product,
+        'scales': {},
+    }
+
+    client = Client()
+    rng = random.Random(args.seed)
+    for index, scale in enumerate(scales):
+        # Grow the dataset to this scale; lookups are only created the first time
+        missing = scale - Product.objects.count()
+        started = time.perf_counter()
+        call_command(
+            'generate_load_data', products=missing, movements=missing * args.movements_per_product,
+            categories=20 if index == 0 else 0, suppliers=10 if index == 0 else 0,
+            seed=args.seed + scale, verbosity=0,
+        )
+        analyze()
+        print(f'Scale {scale}: loaded {Product.objects.count()} products and '
+              f'{StockMovement.objects.count()} movements in {time.perf_counter() - started:.1f}s',
+              file=sys.stderr)
+
+        results = {}
+        for name, request in scenarios(rng).items():
+            if only and name not in only:
+                continue
+            repeat = args.export_repeat if name == 'export_csv' else args.repeat
+            results[name] = run_scenario(client, request, repeat)
+            print(f'  {name}: {results[name]}', file=sys.stderr)
+        report['scales'][str(scale)] = results
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Shared setup for the benchmark scripts. Importing this module configures
+Django; unless SQL_ENGINE is set, a throwaway SQLite database is created in a
+temp directory so the development database is never touched.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_app.settings')
+if 'SQL_ENGINE' not in os.environ:
+    os.environ['SQL_DATABASE'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+
+def prepare_database():
+    settings.ALLOWED_HOSTS = ['*']
+    call_command('migrate', verbosity=0)
+
+
+def analyze():
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+    }
+
+
+def measure(client, urls, repeat):
+    """Time GET requests through the Django test client, per named URL"""
+    results = {}
+    for name, url in urls.items():
+        client.get(url)  # warm up
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, (url, response.status_code)
+        results[name] = summarize(timings)
+    return results
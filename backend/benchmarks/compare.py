@@ -0,0 +1,64 @@
+"""
+Compare two JSON reports from benchmarks/api.py and flag regressions.
+
+    python benchmarks/compare.py baseline.json candidate.json --threshold 0.2
+
+A scenario regresses when its latency metric grows by more than --threshold
+(a fraction) and by at least --min-ms, or when it issues more SQL queries.
+Exits with status 1 if anything regressed, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, candidate, metric='p95_ms', threshold=0.2, min_ms=1.0):
+    """Yield (scale, scenario, before, after, change, query_change, regressed)"""
+    for scale, scenarios in candidate['scales'].items():
+        for name, result in scenarios.items():
+            before = baseline['scales'].get(scale, {}).get(name)
+            if before is None:
+                continue
+            old, new = before[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            query_change = result['queries'] - before['queries']
+            regressed = (change > threshold and new - old >= min_ms) or query_change > 0
+            yield scale, name, old, new, change, query_change, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--metric', default='p95_ms', choices=['median_ms', 'p95_ms', 'p99_ms'])
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--min-ms', type=float, default=1.0,
+                        help='Ignore slowdowns smaller than this many milliseconds')
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    print(f'{args.metric}: {baseline.get("revision")} -> {candidate.get("revision")}')
+    print(f'{"scale":>8}  {"scenario":<16} {"before":>9} {"after":>9} {"change":>8} {"queries":>8}')
+
+    regressions = 0
+    for scale, name, old, new, change, query_change, regressed in compare(
+        baseline, candidate, args.metric, args.threshold, args.min_ms
+    ):
+        regressions += regressed
+        print(
+            f'{scale:>8}  {name:<16} {old:>9.2f} {new:>9.2f} {change:>+8.1%} {query_change:>+8d}'
+            f'{"  REGRESSION" if regressed else ""}'
+        )
+
+    if regressions:
+        print(f'{regressions} regression(s)', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Compare concurrent read throughput of the WSGI (gunicorn sync workers) and
+ASGI (gunicorn with uvicorn workers) deployments.
+
+    python benchmarks/concurrency.py --products 10000 --concurrency 1,8,32
+
+A dataset is generated with generate_load_data, then for each server both
+the DRF endpoints and, under ASGI, their /api/async/ variants are hammered
+by --concurrency client threads for --duration seconds each. Reported per
+server, endpoint and concurrency level: throughput (requests/s), median/p95
+latency in milliseconds and failed requests. Servers run with DEBUG off and
+the dummy cache, so every request reaches the database.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+os.environ.setdefault('CACHE_BACKEND', 'dummy')
+
+from common import analyze, prepare_database, summarize  # noqa: E402
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from inventory.models import Product  # noqa: E402
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SERVERS = {
+    'wsgi': ['inventory_app.wsgi:application'],
+    'asgi': ['-k', 'uvicorn.workers.UvicornWorker', 'inventory_app.asgi:application'],
+}
+
+
+def endpoints(product_ids, prefix):
+    return {
+        'product_list': lambda rng: f'{prefix}/products/',
+        'product_detail': lambda rng: f'{prefix}/products/{rng.choice(product_ids)}/',
+        'movement_list': lambda rng: f'{prefix}/stock-movements/?movement_type=OUT',
+        'dashboard': lambda rng: f'{prefix}/dashboard/summary/',
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name, workers):
+    port = free_port()
+    env = dict(os.environ, DEBUG='0', DJANGO_ALLOWED_HOSTS='127.0.0.1')
+    process = subprocess.Popen(
+        ['gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning',
+         *SERVERS[name]],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f'{base}/api/categories/', timeout=1).read()
+            return process, base
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f'{name} server did not start')
+
+
+def load(base, url_for, concurrency, duration, seed):
+    """Run `concurrency` closed-loop clients for `duration` seconds"""
+    timings, errors = [], []
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base + url_for(rng), timeout=30) as response:
+                    response.read()
+                timings.append((time.perf_counter() - started) * 1000)
+            except (urllib.error.URLError, ConnectionError, TimeoutError) as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(timings),
+        'throughput_rps': round(len(timings) / elapsed, 1),
+        **(summarize(timings) if timings else {}),
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--movements-per-product', type=int, default=10)
+    parser.add_argument('--concurrency', default='1,8,32', help='Comma separated numbers of clients')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per measurement')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Server worker processes')
+    parser.add_argument('--only', default=None, help='Comma separated endpoint names to run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help='Also write the JSON report to this file')
+    args = parser.parse_args()
+
+    prepare_database()
+    call_command(
+        'generate_load_data', products=args.products, movements=args.products * args.movements_per_product,
+        categories=20, suppliers=10, seed=args.seed, verbosity=0,
+    )
+    analyze()
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    # The servers open their own connections to the same database
+    connection.close()
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    only = set(args.only.split(',')) if args.only else None
+    report = {'vendor': connection.vendor, 'products': args.products, 'workers': args.workers, 'servers': {}}
+    for name in SERVERS:
+        process, base = start_server(name, args.workers)
+        try:
+            variants = {'': endpoints(product_ids, '/api')}
+            if name == 'asgi':
+                variants['async_'] = endpoints(product_ids, '/api/async')
+            results = report['servers'][name] = {}
+            for label, urls in variants.items():
+                for endpoint, url_for in urls.items():
+                    if only and endpoint not in only:
+                        continue
+                    for level in levels:
+                        result = load(base, url_for, level, args.duration, args.seed)
+                        results.setdefault(label + endpoint, {})[str(level)] = result
+                        print(f'  {name} {label}{endpoint} x{level}: {result}', file=sys.stderr)
+        finally:
+            process.terminate()
+            process.wait()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
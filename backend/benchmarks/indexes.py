@@ -0,0 +1,107 @@
+"""
+Measure list/filter latency of the hot stock movement and product queries
+with and without the indexes added in migration 0003.
+
+    python benchmarks/indexes.py --movements 1000000 --products 20000
+
+Results are printed as JSON (median / p95 milliseconds per endpoint, per
+variant). See common.py for which database is used.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import timedelta
+
+from common import analyze, measure, prepare_database
+
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+
+from inventory.models import Category, Supplier, Product, StockMovement
+
+
+def populate(products, movements, batch_size=10000):
+    category = Category.objects.create(name='Bench Category')
+    supplier = Supplier.objects.create(name='Bench Supplier')
+    Product.objects.bulk_create([
+        Product(
+            name=f'Bench Product {i:07d}', sku=f'BENCH-{i:07d}', price=random.randint(1, 500),
+            quantity=random.randint(0, 200), min_stock_level=random.randint(0, 20),
+            category=category, supplier=supplier, is_active=random.random() > 0.1,
+        )
+        for i in range(products)
+    ], batch_size=batch_size)
+
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    now = timezone.now()
+    types = ['IN', 'OUT', 'OUT', 'ADJ']
+    for start in range(0, movements, batch_size):
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                product_id=random.choice(product_ids), quantity=random.randint(1, 20),
+                movement_type=random.choice(types), reason='bench',
+            )
+            for _ in range(min(batch_size, movements - start))
+        ])
+    # auto_now_add stamps every row with "now"; spread them over a year instead
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT MIN(id), MAX(id) FROM inventory_stockmovement')
+        low, high = cursor.fetchone()
+    span = max(high - low, 1)
+    for start in range(low, high + 1, batch_size * 10):
+        end = start + batch_size * 10
+        StockMovement.objects.filter(id__gte=start, id__lt=end).update(
+            timestamp=now - timedelta(days=365) * (1 - (start - low) / span)
+        )
+    return product_ids
+
+
+def scenarios(product_ids):
+    product = product_ids[len(product_ids) // 2]
+    return {
+        'movements_first_page': '/api/stock-movements/',
+        'movements_by_product': f'/api/stock-movements/?product={product}',
+        'movements_by_type': '/api/stock-movements/?movement_type=ADJ',
+        'movements_last_week': '/api/stock-movements/?date_from=' + (timezone.localdate() - timedelta(days=7)).isoformat(),
+        'products_active': '/api/products/?is_active=true',
+        'dashboard_summary': '/api/dashboard/summary/',
+    }
+
+
+def benchmark_indexes():
+    return [(model, index) for model in (Product, StockMovement) for index in model._meta.indexes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--movements', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    prepare_database()
+
+    started = time.perf_counter()
+    product_ids = populate(args.products, args.movements)
+    print(f'Loaded {args.products} products and {args.movements} movements '
+          f'in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    analyze()
+
+    client = Client()
+    urls = scenarios(product_ids)
+    report = {'vendor': connection.vendor, 'products': args.products, 'movements': args.movements}
+    report['with_indexes'] = measure(client, urls, args.repeat)
+
+    with connection.schema_editor() as editor:
+        for model, index in benchmark_indexes():
+            editor.remove_index(model, index)
+    report['without_indexes'] = measure(client, urls, args.repeat)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Measure product search latency on a large synthetic catalogue, simulating
+typeahead: each query is a prefix of a word as it is being typed.
+
+    python benchmarks/search.py --products 500000
+
+Prints JSON with median / p95 milliseconds for the full-text backend and,
+with --compare-icontains, for DRF's plain icontains search over the same
+data. See common.py for which database is used.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from unittest import mock
+
+from common import analyze, prepare_database, summarize
+
+from django.db import connection
+from django.test import Client
+from rest_framework import filters
+
+from inventory.models import Category, Supplier, Product
+from inventory.search import ProductSearchFilter
+
+WORDS = (
+    'wireless bluetooth usb keyboard mouse monitor laptop desk lamp chair cable adapter charger '
+    'printer paper stapler notebook pen marker headset speaker webcam router switch drive ssd '
+    'battery case stand hub dock tablet phone screen protector bag backpack bottle mug tape'
+).split()
+ADJECTIVES = 'black white silver compact portable ergonomic premium basic pro mini max ultra'.split()
+
+
+def populate(products, batch_size=10000):
+    category = Category.objects.create(name='Bench Category')
+    supplier = Supplier.objects.create(name='Bench Supplier')
+    rng = random.Random(42)
+    for start in range(0, products, batch_size):
+        Product.objects.bulk_create([
+            Product(
+                name=f'{rng.choice(ADJECTIVES).title()} {rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}',
+                sku=f'{rng.choice(WORDS)[:3].upper()}-{i:07d}',
+                description=' '.join(rng.choice(WORDS + ADJECTIVES) for _ in range(12)),
+                price=1, category=category, supplier=supplier,
+            )
+            for i in range(start, min(start + batch_size, products))
+        ])
+
+
+def typeahead_queries(count):
+    rng = random.Random(7)
+    queries = []
+    while len(queries) < count:
+        word = rng.choice(WORDS)
+        queries.extend(word[:length] for length in range(2, len(word) + 1))
+    return queries[:count]
+
+
+def run(client, queries):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        response = client.get('/api/products/', {'search': query, 'page_size': 10})
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, (query, response.status_code)
+    return summarize(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=500000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--compare-icontains', action='store_true')
+    args = parser.parse_args()
+
+    prepare_database()
+    started = time.perf_counter()
+    populate(args.products)
+    print(f'Loaded {args.products} products in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    analyze()
+
+    client = Client()
+    queries = typeahead_queries(args.queries)
+    client.get('/api/products/', {'search': queries[0]})  # warm up
+    report = {'vendor': connection.vendor, 'products': args.products, 'queries': len(queries)}
+    report['full_text'] = run(client, queries)
+
+    if args.compare_icontains:
+        with mock.patch.object(ProductSearchFilter, 'filter_queryset', filters.SearchFilter.filter_queryset):
+            report['icontains'] = run(client, queries)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,12 @@
+from datetime import timedelta
+
 from django.contrib import admin
-from .models import Category, Supplier, Product, StockMovement
+from django.utils import timezone
+
+from .models import (
+    Category, Supplier, Product, StockMovement, StockSnapshot, LowStockAlert, PurchaseOrder, PurchaseOrderLine,
+    MovementArchive, MovementArchiveBalance, OutboxEvent, Location, StockLevel
+)
 
 
 @admin.register(Category)
@@ -16,21 +23,132 @@ class SupplierAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
 
 
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'is_active', 'created_at')
+    search_fields = ('code', 'name')
+    list_filter = ('is_active',)
+
+
+class StockLevelInline(admin.TabularInline):
+    """Read-only: levels change with the product's quantity and through stock adjustments and transfers"""
+    model = StockLevel
+    extra = 0
+    can_delete = False
+    fields = ('location', 'quantity', 'updated_at')
+    readonly_fields = ('location', 'quantity', 'updated_at')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'sku', 'price', 'quantity', 'min_stock_level', 'category', 'supplier', 'is_active')
     search_fields = ('name', 'sku', 'description')
     list_filter = ('is_active', 'category', 'supplier', 'created_at')
     list_editable = ('quantity', 'is_active')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('version', 'created_at', 'updated_at')
+    inlines = [StockLevelInline]
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('category', 'supplier')
 
 
+class MovementPeriodFilter(admin.SimpleListFilter):
+    """
+    Recent movements by default: the changelist would otherwise sort and count
+    the whole history on every page. Archived months are not listed here.
+    """
+    title = 'period'
+    parameter_name = 'period'
+    default = '30'
+    periods = (('7', 'Last 7 days'), ('30', 'Last 30 days'), ('90', 'Last 90 days'), ('all', 'All'))
+
+    def lookups(self, request, model_admin):
+        return self.periods
+
+    def value(self):
+        value = super().value()
+        return value if value in dict(self.periods) else self.default
+
+    def choices(self, changelist):
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        if self.value() == 'all':
+            return queryset
+        return queryset.filter(timestamp__gte=timezone.now() - timedelta(days=int(self.value())))
+
+
 @admin.register(StockMovement)
 class StockMovementAdmin(admin.ModelAdmin):
-    list_display = ('product', 'movement_type', 'quantity', 'reason', 'reference', 'performed_by', 'timestamp')
+    list_display = (
+        'product', 'location', 'movement_type', 'quantity', 'reason', 'reference', 'performed_by', 'timestamp'
+    )
     search_fields = ('product__name', 'reason', 'reference')
-    list_filter = ('movement_type', 'timestamp', 'performed_by')
+    list_filter = (MovementPeriodFilter, 'movement_type', 'location', 'performed_by')
+    list_select_related = ('product', 'location')
+    show_full_result_count = False
     readonly_fields = ('timestamp',)
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('product', 'date', 'closing_quantity', 'in_total', 'out_total', 'adj_total')
+    search_fields = ('product__name', 'product__sku')
+    list_filter = ('date',)
+    list_select_related = ('product',)
+    readonly_fields = ('product', 'date', 'closing_quantity', 'in_total', 'out_total', 'adj_total')
+
+
+@admin.register(MovementArchive)
+class MovementArchiveAdmin(admin.ModelAdmin):
+    list_display = ('month', 'row_count', 'path', 'first_timestamp', 'last_timestamp', 'updated_at')
+    readonly_fields = ('month', 'path', 'row_count', 'first_timestamp', 'last_timestamp', 'created_at', 'updated_at')
+
+
+@admin.register(MovementArchiveBalance)
+class MovementArchiveBalanceAdmin(admin.ModelAdmin):
+    list_display = ('product', 'archive', 'opening_quantity', 'in_total', 'out_total', 'adj_total', 'closing_quantity')
+    search_fields = ('product__name', 'product__sku')
+    list_filter = ('archive__month',)
+    list_select_related = ('product', 'archive')
+    readonly_fields = (
+        'archive', 'product', 'opening_quantity', 'in_total', 'out_total', 'adj_total', 'closing_quantity'
+    )
+
+
+@admin.register(LowStockAlert)
+class LowStockAlertAdmin(admin.ModelAdmin):
+    list_display = ('product', 'quantity', 'min_stock_level', 'triggered_at', 'cleared_at')
+    search_fields = ('product__name', 'product__sku')
+    list_filter = (('cleared_at', admin.EmptyFieldListFilter), 'triggered_at')
+    list_select_related = ('product',)
+    readonly_fields = ('product', 'quantity', 'min_stock_level', 'triggered_at', 'cleared_at')
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'topic', 'created_at', 'published_at', 'attempts', 'last_error')
+    list_filter = ('topic', ('published_at', admin.EmptyFieldListFilter))
+    readonly_fields = ('topic', 'payload', 'created_at', 'published_at', 'attempts', 'last_error')
+
+
+class PurchaseOrderLineInline(admin.TabularInline):
+    model = PurchaseOrderLine
+    extra = 0
+    raw_id_fields = ('product',)
+
+
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'supplier', 'status', 'created_at', 'updated_at')
+    list_filter = ('status', 'supplier')
+    list_select_related = ('supplier',)
+    inlines = [PurchaseOrderLineInline]
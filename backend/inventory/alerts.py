@@ -0,0 +1,145 @@
+"""
+Low-stock alerts, maintained incrementally.
+
+A product has an open LowStockAlert while it is active and at or below its
+minimum stock level. Instead of re-checking the catalogue, every code path
+that changes a quantity or threshold re-evaluates just the products it
+touched, and only writes when one of them crossed the boundary. Each
+trigger and clear is also logged as a LowStockAlertEvent, whose id is the
+cursor of the long-poll/SSE feed (read through inventory.cursors, so events
+committed out of id order are not skipped).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cursors
+from .models import LowStockAlert, LowStockAlertEvent, Product
+
+
+LOW_STOCK = Q(is_active=True, quantity__lte=F('min_stock_level'))
+STOCK_FIELDS = {'quantity', 'min_stock_level', 'is_active'}
+
+# Wakes up feed readers in this process as soon as new events are committed;
+# readers in other processes notice them on their next poll
+new_events = threading.Condition()
+
+
+def notify():
+    with new_events:
+        new_events.notify_all()
+
+
+def evaluate(product_ids=None, batch_size=500):
+    """
+    Open alerts for the given products (all when None) that are now low on
+    stock and clear the ones that recovered. Products whose state did not
+    change cost one indexed lookup per batch and no writes. Returns the
+    number of (triggered, cleared) alerts.
+    """
+    if product_ids is None:
+        return evaluate_batch(None)
+    product_ids = list(product_ids)
+    triggered = cleared = 0
+    for start in range(0, len(product_ids), batch_size):
+        counts = evaluate_batch(product_ids[start:start + batch_size])
+        triggered += counts[0]
+        cleared += counts[1]
+    return triggered, cleared
+
+
+def evaluate_batch(product_ids):
+    products = Product.objects.all()
+    open_alerts = LowStockAlert.objects.filter(cleared_at__isnull=True)
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+        open_alerts = open_alerts.filter(product_id__in=product_ids)
+
+    now = timezone.now()
+    with transaction.atomic():
+        recovered = list(
+            open_alerts.exclude(
+                product__is_active=True, product__quantity__lte=F('product__min_stock_level')
+            ).values_list('id', 'product__quantity', 'product__min_stock_level')
+        )
+        if recovered:
+            LowStockAlert.objects.filter(pk__in=[pk for pk, _, _ in recovered]).update(cleared_at=now)
+
+        depleted = list(
+            products.filter(LOW_STOCK)
+            .filter(~Exists(LowStockAlert.objects.filter(product=OuterRef('pk'), cleared_at__isnull=True)))
+            .values_list('id', 'quantity', 'min_stock_level')
+        )
+        alerts = LowStockAlert.objects.bulk_create([
+            LowStockAlert(product_id=pk, quantity=quantity, min_stock_level=min_stock_level, triggered_at=now)
+            for pk, quantity, min_stock_level in depleted
+        ])
+
+        events = [
+            LowStockAlertEvent(
+                alert_id=pk, event_type=LowStockAlertEvent.CLEARED, quantity=quantity,
+                min_stock_level=min_stock_level, timestamp=now,
+            )
+            for pk, quantity, min_stock_level in recovered
+        ] + [
+            LowStockAlertEvent(
+                alert_id=alert.pk, event_type=LowStockAlertEvent.TRIGGERED, quantity=alert.quantity,
+                min_stock_level=alert.min_stock_level, timestamp=now,
+            )
+            for alert in alerts
+        ]
+        if events:
+            LowStockAlertEvent.objects.bulk_create(events)
+            transaction.on_commit(notify)
+    return len(alerts), len(recovered)
+
+
+def quantity_changed(product_id, delta, quantity, min_stock_level, is_active):
+    """
+    Re-evaluate a product after its quantity changed by `delta` to `quantity`,
+    only if that moved it across its minimum level.
+    """
+    was_low = is_active and quantity - delta <= min_stock_level
+    if was_low != (is_active and quantity <= min_stock_level):
+        evaluate([product_id])
+
+
+@receiver(post_save, sender=Product)
+def evaluate_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not STOCK_FIELDS & instance.get_deferred_fields():
+        previous = False if created else instance._loaded_low_stock
+        if previous == instance.needs_low_stock_alert():
+            return
+    evaluate([instance.pk])
+
+
+def events_after(last_id, limit=100):
+    return cursors.rows_after(LowStockAlertEvent.objects.select_related('alert__product'), last_id, limit)
+
+
+def last_event_id():
+    return cursors.latest_id(LowStockAlertEvent.objects.all())
+
+
+def wait_for_events(last_id, timeout):
+    """
+    Events after `last_id`, waiting up to `timeout` seconds for the first one.
+    Checks the database again whenever this process commits new events, and
+    at least every LOW_STOCK_FEED_POLL_INTERVAL seconds for other processes.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        events = events_after(last_id)
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events
+        with new_events:
+            new_events.wait(min(remaining, settings.LOW_STOCK_FEED_POLL_INTERVAL))
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class InventoryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "inventory"
+
+    def ready(self):
+        # Connect the signal handlers that invalidate cached API responses,
+        # generate image renditions on upload, maintain low-stock alerts,
+        # record deletions for sync, wake the stock event streams and write
+        # stock movements to the outbox
+        from . import alerts, caching, images, outbox, streams, sync  # noqa: F401
+        from .search import restore_sqlite_triggers
+
+        post_migrate.connect(restore_sqlite_triggers, sender=self)
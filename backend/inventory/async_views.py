@@ -0,0 +1,96 @@
+"""
+Async variants of the read-heavy endpoints, for ASGI deployments.
+
+They return the same JSON as their DRF counterparts, but the page or
+aggregates are fetched with the async ORM, so a worker can keep serving
+other requests while the database is busy. Filtering and serialization
+reuse the viewsets: filter backends can validate against the database (a
+category id, the search index check), so the queryset is built in a thread,
+while serializing an already fetched page does not touch the database.
+Unlike the DRF views they do not go through the response cache.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import dashboard, streams
+from .models import Product
+from .views import ProductViewSet, StockMovementViewSet, parse_summary_params
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def viewset_for(viewset_class, request, action, **kwargs):
+    drf_request = Request(request)
+    view = viewset_class(request=drf_request, action=action, format_kwarg=None, args=(), kwargs=kwargs)
+    return view, drf_request
+
+
+async def paginated_list(viewset_class, request):
+    view, drf_request = viewset_for(viewset_class, request, 'list')
+
+    def filtered_sources():
+        view.check_permissions(drf_request)
+        sources = [view.filter_queryset(view.get_queryset())]
+        if hasattr(view, 'get_archive_sources'):
+            sources.extend(view.get_archive_sources())
+        return sources
+
+    try:
+        sources = await sync_to_async(filtered_sources)()
+        paginator = view.paginator
+        if len(sources) > 1:
+            page = await paginator.apaginate_sources(sources, drf_request, view=view)
+        else:
+            page = await paginator.apaginate_queryset(sources[0], drf_request, view=view)
+    except APIException as e:
+        return json_response(e.detail, status=e.status_code)
+
+    serializer = view.get_serializer(page, many=True)
+    return json_response(paginator.get_paginated_data(serializer.data))
+
+
+async def product_list(request):
+    return await paginated_list(ProductViewSet, request)
+
+
+async def stock_movement_list(request):
+    return await paginated_list(StockMovementViewSet, request)
+
+
+async def product_detail(request, pk):
+    view, _ = viewset_for(ProductViewSet, request, 'retrieve', pk=pk)
+    try:
+        product = await view.get_queryset().aget(pk=pk)
+    except (Product.DoesNotExist, ValueError, DjangoValidationError):
+        return json_response({'detail': 'No Product matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+    return json_response(view.get_serializer(product).data)
+
+
+async def dashboard_summary(request):
+    values, error = parse_summary_params(request.GET)
+    if error:
+        return json_response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    return json_response(await dashboard.abuild_summary(**values))
+
+
+async def stock_stream(request):
+    """
+    Server-sent events for new stock movements and the stock they leave,
+    from now on, or after ?after=<movement id> / Last-Event-ID on reconnect
+    (see inventory.streams). Under WSGI each stream holds a worker thread.
+    """
+    after = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    try:
+        after = int(after) if after else None
+    except ValueError:
+        return json_response({'error': 'after must be a movement id'}, status=status.HTTP_400_BAD_REQUEST)
+    if streams.is_asgi(request):
+        return streams.stream_events(streams.stock_events(after))
+    return streams.stream_events(streams.sync_stock_events(after))
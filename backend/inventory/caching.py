@@ -0,0 +1,171 @@
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Category, Supplier, Product, ProductForecast
+
+
+# Each model has a generation counter; writes bump it, and every cached
+# response is keyed on the generations of the models it was built from, so
+# stale entries are never read again and simply expire.
+CACHED_MODELS = (Category, Supplier, Product, ProductForecast)
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def scope_for(model):
+    return model._meta.model_name
+
+
+def generation_key(scope):
+    return f'inventory:generation:{scope}'
+
+
+def generations(scopes):
+    """Current generation of each scope, starting unseen ones from the clock"""
+    cache = get_cache()
+    keys = [generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # A clock-based start never repeats a generation from before an eviction
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(scopes):
+    cache = get_cache()
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate(*scopes):
+    """
+    Invalidate cached responses built from the given scopes. The bump happens
+    now, so the writing request never sees its own stale data, and again when
+    the transaction commits, so a response cached by a concurrent reader from
+    the pre-commit state is discarded too.
+    """
+    bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump(scopes))
+
+
+def invalidate_models(*models):
+    invalidate(*(scope_for(model) for model in models))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_on_write(sender, **kwargs):
+    if sender in CACHED_MODELS:
+        invalidate_models(sender)
+
+
+def request_etags(request):
+    return parse_etags(request.headers.get('If-None-Match', ''))
+
+
+# Detail responses of versioned models are tagged "v<version>-<cache key hash>"
+VERSIONED_ETAG = re.compile(r'^(?:W/)?"(?:v(\d+)-)?([^"]*)"$')
+
+
+def etag_digest(etag):
+    """Cache key hash an ETag was built from"""
+    match = VERSIONED_ETAG.match(etag)
+    return match[2] if match else etag
+
+
+def if_match_version(request):
+    """
+    Version the client's If-Match header requires, or None without a header
+    or for "*". A tag naming no version matches none, so it yields 0.
+    """
+    etags = parse_etags(request.headers.get('If-Match', ''))
+    if not etags or '*' in etags:
+        return None
+    for etag in etags:
+        match = VERSIONED_ETAG.match(etag)
+        if match and match[1]:
+            return int(match[1])
+    return 0
+
+
+class CachedResponseMixin:
+    """
+    Serves list and detail GETs from the API cache and answers conditional
+    requests. Entries are keyed on the path, query parameters and host, plus
+    the generations of `cache_models`, which must cover every model the
+    serializer reads from. The ETag is derived from that key, so a client
+    holding the current ETag gets a 304 without the view touching the
+    database or the cache entry. With `etag_version_field` set, detail ETags
+    also carry the object's version, for clients to send back in If-Match.
+    """
+    cache_models = ()
+    etag_version_field = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request):
+        params = sorted((key, value) for key, values in request.query_params.lists() for value in values)
+        versions = generations([scope_for(model) for model in self.cache_models])
+        raw = repr((request.get_host(), request.path, params, versions))
+        return f'inventory:response:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+    def entity_tag(self, digest, data):
+        version = data.get(self.etag_version_field) if self.etag_version_field and isinstance(data, dict) else None
+        return f'"v{version}-{digest}"' if version is not None else f'"{digest}"'
+
+    def current_etag(self, request, data):
+        """ETag of `data` as served now, e.g. for the response to a write"""
+        return self.entity_tag(self.get_cache_key(request).rsplit(':', 1)[1], data)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        digest = key.rsplit(':', 1)[1]
+        headers = {'Cache-Control': 'private, no-cache'}
+
+        # The hash alone identifies the current data, versioned or not
+        etags = request_etags(request)
+        for etag in etags:
+            if etag != '*' and etag_digest(etag) == digest:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={**headers, 'ETag': etag})
+
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data, headers={'X-Cache': 'hit'})
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+            response['X-Cache'] = 'miss'
+        etag = self.entity_tag(digest, response.data)
+
+        # "*" matches any current representation, so it is only answered once there is one
+        if '*' in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={**headers, 'ETag': etag})
+        for name, value in {**headers, 'ETag': etag}.items():
+            response[name] = value
+        return response
@@ -0,0 +1,349 @@
+"""
+Cold storage of old stock movements in compressed files.
+
+archive_stock_movements moves whole months of movements older than
+MOVEMENT_COLD_MONTHS out of the database (from both the main and the archive
+table, see inventory.partitions) into one gzip file per month under
+MOVEMENT_ARCHIVE_DIR. Each line of a file is a JSON chunk of up to
+CHUNK_ROWS rows stored column by column ({"id": [...], "quantity": [...]}),
+which compresses far better than a row per line and needs no extra
+dependency. Re-archiving a month appends another gzip member, so a run that
+was interrupted can simply be repeated.
+
+A month is only archived once rollup_stock_snapshots has covered it, and
+only if its movements add up to the snapshot totals. Its per-product totals
+and opening and closing stock are kept as MovementArchiveBalance rows.
+
+The stock movement API reads the files of the months a ?date_from reaches
+(ArchivedMovements), filtering rows as it decompresses them.
+"""
+import gzip
+import json
+import operator
+import os
+import shutil
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from . import partitions
+from .models import (
+    ArchivedStockMovement, MovementArchive, MovementArchiveBalance, Product, StockMovement, StockSnapshot
+)
+
+
+COLUMNS = [
+    'id', 'product_id', 'quantity', 'movement_type', 'reason', 'reference', 'performed_by', 'timestamp', 'location_id'
+]
+CHUNK_ROWS = 10000
+TOTAL_FIELDS = {'IN': 0, 'OUT': 1, 'ADJ': 2}
+
+
+def archive_dir():
+    return Path(settings.MOVEMENT_ARCHIVE_DIR)
+
+
+def month_path(month):
+    """File of a month, relative to MOVEMENT_ARCHIVE_DIR"""
+    return f'{month:%Y}/movements-{month:%Y-%m}.ndjson.gz'
+
+
+def write_chunks(file, rows):
+    """Write rows, tuples in COLUMNS order, as columnar JSON lines; returns the rows written"""
+    written = 0
+    chunk = []
+
+    def flush():
+        columns = dict(zip(COLUMNS, map(list, zip(*chunk))))
+        columns['timestamp'] = [timestamp.isoformat(timespec='microseconds') for timestamp in columns['timestamp']]
+        file.write(json.dumps(columns, separators=(',', ':')).encode() + b'\n')
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_ROWS:
+            flush()
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        flush()
+        written += len(chunk)
+    return written
+
+
+def read_rows(path):
+    """Rows of an archive file as tuples in COLUMNS order"""
+    with gzip.open(archive_dir() / path, 'rb') as file:
+        for line in file:
+            chunk = json.loads(line)
+            chunk['timestamp'] = map(datetime.fromisoformat, chunk['timestamp'])
+            # Files written before locations have no location column
+            chunk.setdefault('location_id', [None] * len(chunk['id']))
+            yield from zip(*(chunk[column] for column in COLUMNS))
+
+
+def database_rows(month):
+    """Rows of a month still in the main or archive table, in COLUMNS order"""
+    start, end = partitions.month_bounds(month)
+    for model in (StockMovement, ArchivedStockMovement):
+        yield from (
+            model.objects.filter(timestamp__gte=start, timestamp__lt=end)
+            .order_by('timestamp', 'id').values_list(*COLUMNS)
+            .iterator(chunk_size=CHUNK_ROWS)
+        )
+
+
+def add_totals(totals, rows):
+    """Accumulate [in, out, adj] per product over `rows`, passing them through"""
+    for row in rows:
+        product_totals = totals.setdefault(row[1], [0, 0, 0])
+        product_totals[TOTAL_FIELDS[row[3]]] += row[2]
+        yield row
+
+
+def month_balances(month):
+    """Per product snapshot totals of a month and closing stock: {product id: [in, out, adj, closing]}"""
+    balances = {}
+    rows = StockSnapshot.objects.filter(
+        date__gte=month, date__lt=partitions.add_months(month, 1)
+    ).order_by('product_id', 'date').values_list('product_id', 'in_total', 'out_total', 'adj_total', 'closing_quantity')
+    for product_id, in_total, out_total, adj_total, closing in rows.iterator(chunk_size=CHUNK_ROWS):
+        balance = balances.setdefault(product_id, [0, 0, 0, 0])
+        balance[0] += in_total
+        balance[1] += out_total
+        balance[2] += adj_total
+        balance[3] = closing
+    return balances
+
+
+def archive_month(month, batch_size=10000):
+    """
+    Move the movements of `month` still in the database into its file and
+    record the month with its balances. Raises ValueError, leaving the
+    database and file untouched, if the rows disagree with the snapshots.
+    Returns the number of rows moved.
+    """
+    relative = month_path(month)
+    path = archive_dir() / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.tmp')
+
+    totals = {}
+    archived_ids = set()
+    timestamps = []
+
+    def track(rows):
+        for row in add_totals(totals, rows):
+            archived_ids.add(row[0])
+            timestamps.append(row[7])
+            yield row
+
+    if path.exists():
+        for _ in track(read_rows(relative)):
+            pass
+    # Rows already in the file are left from an interrupted run
+    pending = track(row for row in database_rows(month) if row[0] not in archived_ids)
+
+    # The new rows become one more gzip member after the existing ones, and
+    # the whole file is swapped in only once it has been checked
+    try:
+        with open(partial, 'wb') as file:
+            if path.exists():
+                with open(path, 'rb') as existing:
+                    shutil.copyfileobj(existing, file)
+            with gzip.GzipFile(fileobj=file, mode='wb') as compressed:
+                moved = write_chunks(compressed, pending)
+            file.flush()
+            os.fsync(file.fileno())
+
+        balances = month_balances(month)
+        mismatched = [
+            pk for pk in totals.keys() | balances.keys()
+            if totals.get(pk, [0, 0, 0]) != balances.get(pk, [0, 0, 0, 0])[:3]
+        ]
+        if mismatched:
+            raise ValueError(
+                f'Movements of {month:%Y-%m} do not match the stock snapshots of '
+                f'{len(mismatched)} products; re-run rollup_stock_snapshots for that month first'
+            )
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    if not timestamps:
+        partial.unlink()
+        return 0
+    os.replace(partial, path)
+
+    with transaction.atomic():
+        archive, _ = MovementArchive.objects.update_or_create(month=month, defaults={
+            'path': relative,
+            'row_count': len(archived_ids),
+            'first_timestamp': min(timestamps),
+            'last_timestamp': max(timestamps),
+        })
+        archive.balances.all().delete()
+        MovementArchiveBalance.objects.bulk_create([
+            MovementArchiveBalance(
+                archive=archive, product_id=pk, in_total=in_total, out_total=out_total, adj_total=adj_total,
+                opening_quantity=closing - in_total + out_total - adj_total, closing_quantity=closing,
+            )
+            for pk, (in_total, out_total, adj_total, closing) in balances.items()
+            if pk in totals
+        ], batch_size=1000)
+
+    for model in (StockMovement, ArchivedStockMovement):
+        delete_month(model, month, batch_size)
+    return moved
+
+
+def delete_month(model, month, batch_size):
+    """Remove a month of movements: dropping its partition if it has one, else in batches"""
+    if partitions.drop_partition(model._meta.db_table, month):
+        return
+    start, end = partitions.month_bounds(month)
+    rows = model.objects.filter(timestamp__gte=start, timestamp__lt=end).order_by('id')
+    while True:
+        with transaction.atomic():
+            ids = list(rows.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return
+            model.objects.filter(id__in=ids)._raw_delete(connection.alias)
+
+
+def archive_before(cutoff, batch_size=10000, log=None):
+    """
+    Archive every month before the `cutoff` month, held back to the months
+    covered by stock snapshots. Returns (months archived, rows moved).
+    """
+    log = log or (lambda message: None)
+    cutoff = partitions.archivable_cutoff(cutoff)
+    if cutoff is None:
+        return [], 0
+    end, _ = partitions.month_bounds(cutoff)
+    earliest = [
+        model.objects.filter(timestamp__lt=end).aggregate(first=Min('timestamp'))['first']
+        for model in (StockMovement, ArchivedStockMovement)
+    ]
+    earliest = [timestamp for timestamp in earliest if timestamp is not None]
+    if not earliest:
+        return [], 0
+
+    months, moved = [], 0
+    month = partitions.month_start(timezone.localtime(min(earliest)))
+    while month < cutoff:
+        rows = archive_month(month, batch_size)
+        if rows:
+            months.append(month)
+            moved += rows
+            log(f'Archived {rows} movements of {month:%Y-%m}')
+        month = partitions.add_months(month, 1)
+    return months, moved
+
+
+def cold_cutoff(today=None, months=None):
+    """First month kept in the database"""
+    return partitions.hot_cutoff(today, months or settings.MOVEMENT_COLD_MONTHS)
+
+
+def instances(rows):
+    """
+    Unsaved ArchivedStockMovement instances for row tuples, with their
+    products fetched in one query; products since deleted are None.
+    """
+    movements = [ArchivedStockMovement(**dict(zip(COLUMNS, row))) for row in rows]
+    products = Product.objects.in_bulk({movement.product_id for movement in movements})
+    field = ArchivedStockMovement._meta.get_field('product')
+    for movement in movements:
+        field.set_cached_value(movement, products.get(movement.product_id))
+    return movements
+
+
+def product_of(movement):
+    """Product of a movement built by instances(), None when deleted"""
+    return ArchivedStockMovement._meta.get_field('product').get_cached_value(movement, default=None)
+
+
+class ArchivedMovements:
+    """
+    Movements in archived month files matching the stock movement API's
+    filters. Rows are filtered as tuples while the files are decompressed,
+    and only those returned become ArchivedStockMovement instances. Pages
+    through KeysetPagination like a queryset, via page().
+    """
+    model = ArchivedStockMovement
+
+    def __init__(self, archives, start=None, end=None, product_id=None, movement_type=None,
+                 search_terms=(), search_fields=()):
+        self.archives = archives
+        self.start, self.end = start, end
+        self.product_id, self.movement_type = product_id, movement_type
+        self.search_terms = [term.casefold() for term in search_terms]
+        self.search_fields = [COLUMNS.index(field) for field in search_fields]
+
+    @classmethod
+    def between(cls, start, end=None, **filters):
+        """Files of the months overlapping [start, end), or None when there are none"""
+        archives = MovementArchive.objects.filter(last_timestamp__gte=start)
+        if end is not None:
+            archives = archives.filter(first_timestamp__lt=end)
+        archives = list(archives)
+        return cls(archives, start, end, **filters) if archives else None
+
+    def matches(self, row):
+        if self.product_id is not None and row[1] != self.product_id:
+            return False
+        if self.movement_type and row[3] != self.movement_type:
+            return False
+        if self.start is not None and row[7] < self.start:
+            return False
+        if self.end is not None and row[7] >= self.end:
+            return False
+        return all(
+            any(term in row[field].casefold() for field in self.search_fields)
+            for term in self.search_terms
+        )
+
+    def rows(self, archive):
+        return filter(self.matches, read_rows(archive.path))
+
+    def page(self, paginator):
+        """
+        The rows for paginator's page. Months do not overlap in time, so when
+        the page is ordered by timestamp they are read in page order, months
+        entirely before the cursor are skipped, and reading stops as soon as
+        the page is full or the remaining months fall after the rows other
+        sources already filled it with.
+        """
+        indexes = [COLUMNS.index(field) for field, _ in paginator.seek_keys]
+        values = operator.itemgetter(*indexes) if len(indexes) > 1 else lambda row: (row[indexes[0]],)
+        field, descending = paginator.seek_keys[0]
+        if field != 'timestamp':
+            return instances(paginator.page_rows(chain.from_iterable(map(self.rows, self.archives)), values))
+
+        cursor = paginator.cursor_values[0] if paginator.cursor_values is not None else None
+        bound = paginator.page_bound[0] if paginator.page_bound is not None else None
+        page = []
+        for archive in sorted(self.archives, key=lambda archive: archive.month, reverse=descending):
+            if cursor is not None and (
+                archive.first_timestamp > cursor if descending else archive.last_timestamp < cursor
+            ):
+                continue
+            if bound is not None and (
+                archive.last_timestamp < bound if descending else archive.first_timestamp > bound
+            ):
+                break
+            page = paginator.page_rows(chain(page, self.rows(archive)), values)
+            if len(page) > paginator.page_size:
+                break
+        return instances(page)
+
+    def newest_first(self, chunk_size=2000):
+        """All matching movements, most recent first, a month at a time"""
+        for archive in sorted(self.archives, key=lambda archive: archive.month, reverse=True):
+            rows = sorted(self.rows(archive), key=operator.itemgetter(7, 0), reverse=True)
+            for offset in range(0, len(rows), chunk_size):
+                yield from instances(rows[offset:offset + chunk_size])
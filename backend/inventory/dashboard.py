@@ -0,0 +1,186 @@
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import cold_storage, partitions
+from .alerts import LOW_STOCK
+from .models import ArchivedStockMovement, Product, StockMovement
+
+
+DEFAULT_WINDOW_DAYS = 7
+MAX_WINDOW_DAYS = 365
+DEFAULT_LOW_STOCK_LIMIT = 5
+MAX_LOW_STOCK_LIMIT = 100
+
+MOVEMENT_TYPES = [code for code, _ in StockMovement.MOVEMENT_TYPES]
+
+
+def window_bounds(days, now=None):
+    """Return the (start, end) datetimes covering the last `days` calendar days"""
+    now = now or timezone.now()
+    start_date = timezone.localdate(now) - timedelta(days=days - 1)
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    return start, now
+
+
+def product_totals_aggregates():
+    return {
+        'total_products': Count('id'),
+        'active_products': Count('id', filter=Q(is_active=True)),
+        'low_stock_count': Count('id', filter=LOW_STOCK),
+        'inventory_value': Coalesce(
+            Sum(F('price') * F('quantity'), filter=Q(is_active=True),
+                output_field=DecimalField(max_digits=20, decimal_places=2)),
+            0, output_field=DecimalField(max_digits=20, decimal_places=2)
+        ),
+    }
+
+
+def product_totals():
+    """Catalogue-wide counters computed in a single aggregate query"""
+    totals = Product.objects.aggregate(**product_totals_aggregates())
+    totals['inventory_value'] = str(totals['inventory_value'])
+    return totals
+
+
+def low_stock_queryset(limit):
+    """The most depleted active products, relative to their minimum level"""
+    return (
+        Product.objects.filter(LOW_STOCK)
+        .annotate(shortfall=F('min_stock_level') - F('quantity'))
+        .order_by('-shortfall', 'name')
+        .values('id', 'name', 'sku', 'quantity', 'min_stock_level')[:limit]
+    )
+
+
+def low_stock_products(limit):
+    return list(low_stock_queryset(limit))
+
+
+def stock_by_category_queryset():
+    return (
+        Product.objects.filter(is_active=True)
+        .values('category_id', category_name=F('category__name'))
+        .annotate(total_quantity=Sum('quantity'), product_count=Count('id'))
+        .order_by('category_name')
+    )
+
+
+def stock_by_category():
+    return list(stock_by_category_queryset())
+
+
+def movement_queries(start, end, model=StockMovement):
+    """(aggregates, per day and type rows) for the movements of `model`'s table within the window"""
+    movements = model.objects.filter(timestamp__gte=start, timestamp__lte=end)
+    per_type = {
+        code: Coalesce(Sum('quantity', filter=Q(movement_type=code)), 0)
+        for code in MOVEMENT_TYPES
+    }
+    rows = (
+        movements.annotate(date=TruncDate('timestamp'))
+        .values('date', 'movement_type')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+    )
+    return movements, {'count': Count('id'), **per_type}, rows
+
+
+def file_movement_totals(start, end):
+    """The aggregates and rows of movement_queries for the archived month files the window overlaps"""
+    files = cold_storage.ArchivedMovements.between(start, end)
+    if files is None:
+        return None
+    totals = {'count': 0, **dict.fromkeys(MOVEMENT_TYPES, 0)}
+    daily = {}
+    for archive in files.archives:
+        for row in files.rows(archive):
+            quantity, movement_type, timestamp = row[2], row[3], row[7]
+            totals['count'] += 1
+            totals[movement_type] += quantity
+            key = (timezone.localdate(timestamp), movement_type)
+            daily[key] = daily.get(key, 0) + quantity
+    rows = [{'date': date, 'movement_type': code, 'total': total} for (date, code), total in daily.items()]
+    return totals, rows
+
+
+def archived_movement_totals(start, end):
+    """
+    (aggregates, rows) pairs for the movements within the window that have
+    left the main table: the archive table's, when the window reaches back
+    to it, and the month files'
+    """
+    parts = []
+    latest = partitions.latest_archived()
+    if latest is not None and start <= latest:
+        movements, aggregates, rows = movement_queries(start, end, ArchivedStockMovement)
+        parts.append((movements.aggregate(**aggregates), list(rows)))
+    files = file_movement_totals(start, end)
+    if files is not None:
+        parts.append(files)
+    return parts
+
+
+def format_movement_totals(parts, start, end):
+    """Combine the (aggregates, rows) pairs of each movement source"""
+    count = 0
+    totals = dict.fromkeys(MOVEMENT_TYPES, 0)
+    by_date = {}
+    for aggregates, rows in parts:
+        count += aggregates['count']
+        for code in MOVEMENT_TYPES:
+            totals[code] += aggregates[code]
+        for row in rows:
+            by_date.setdefault(row['date'], dict.fromkeys(MOVEMENT_TYPES, 0))
+            by_date[row['date']][row['movement_type']] += row['total']
+
+    daily = []
+    day = timezone.localdate(start)
+    while day <= timezone.localdate(end):
+        daily.append({'date': day.isoformat(), **by_date.get(day, dict.fromkeys(MOVEMENT_TYPES, 0))})
+        day += timedelta(days=1)
+
+    return {'count': count, 'totals': totals, 'daily': daily}
+
+
+def movement_totals(start, end):
+    """Movement quantities per type, overall and per day, within the window, archived months included"""
+    movements, aggregates, rows = movement_queries(start, end)
+    return format_movement_totals(
+        [(movements.aggregate(**aggregates), list(rows)), *archived_movement_totals(start, end)], start, end
+    )
+
+
+def build_summary(days=DEFAULT_WINDOW_DAYS, low_stock_limit=DEFAULT_LOW_STOCK_LIMIT):
+    """Everything the dashboard needs, aggregated in the database"""
+    start, end = window_bounds(days)
+    return {
+        'generated_at': end,
+        'window': {'days': days, 'start': start, 'end': end},
+        'products': product_totals(),
+        'low_stock': low_stock_products(low_stock_limit),
+        'stock_by_category': stock_by_category(),
+        'movements': movement_totals(start, end),
+    }
+
+
+async def abuild_summary(days=DEFAULT_WINDOW_DAYS, low_stock_limit=DEFAULT_LOW_STOCK_LIMIT):
+    """build_summary with the async ORM, for the ASGI endpoints"""
+    start, end = window_bounds(days)
+    totals = await Product.objects.aaggregate(**product_totals_aggregates())
+    totals['inventory_value'] = str(totals['inventory_value'])
+    movements, aggregates, rows = movement_queries(start, end)
+    return {
+        'generated_at': end,
+        'window': {'days': days, 'start': start, 'end': end},
+        'products': totals,
+        'low_stock': [row async for row in low_stock_queryset(low_stock_limit)],
+        'stock_by_category': [row async for row in stock_by_category_queryset()],
+        'movements': format_movement_totals([
+            (await movements.aaggregate(**aggregates), [row async for row in rows]),
+            *await sync_to_async(archived_movement_totals)(start, end),
+        ], start, end),
+    }
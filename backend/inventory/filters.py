@@ -0,0 +1,81 @@
+from datetime import datetime, time, timedelta
+
+import django_filters
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LowStockAlert, Product, StockMovement
+
+
+def start_of_day(value):
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+class StockMovementFilter(django_filters.FilterSet):
+    # Date bounds are turned into timestamp ranges so the timestamp index stays usable
+    date_from = django_filters.DateFilter(method='filter_date_from')
+    date_to = django_filters.DateFilter(method='filter_date_to')
+
+    class Meta:
+        model = StockMovement
+        fields = ['movement_type', 'product', 'date_from', 'date_to']
+
+    def filter_date_from(self, queryset, name, value):
+        return queryset.filter(timestamp__gte=start_of_day(value))
+
+    def filter_date_to(self, queryset, name, value):
+        return queryset.filter(timestamp__lt=start_of_day(value + timedelta(days=1)))
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Product list filters. Ranges are inclusive; created/updated dates are
+    turned into timestamp ranges like StockMovementFilter's.
+    """
+    price_min = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    price_max = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    quantity_min = django_filters.NumberFilter(field_name='quantity', lookup_expr='gte')
+    quantity_max = django_filters.NumberFilter(field_name='quantity', lookup_expr='lte')
+    # Active products at or below their minimum level, as in the low-stock alerts
+    low_stock = django_filters.BooleanFilter(method='filter_low_stock')
+    created_from = django_filters.DateFilter(field_name='created_at', method='filter_from')
+    created_to = django_filters.DateFilter(field_name='created_at', method='filter_to')
+    updated_from = django_filters.DateFilter(field_name='updated_at', method='filter_from')
+    updated_to = django_filters.DateFilter(field_name='updated_at', method='filter_to')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'supplier', 'is_active']
+
+    def filter_low_stock(self, queryset, name, value):
+        # Matches the condition of product_low_stock_idx so it can serve the filter
+        low_stock = {'is_active': True, 'quantity__lte': F('min_stock_level')}
+        return queryset.filter(**low_stock) if value else queryset.exclude(**low_stock)
+
+    def filter_from(self, queryset, name, value):
+        return queryset.filter(**{f'{name}__gte': start_of_day(value)})
+
+    def filter_to(self, queryset, name, value):
+        return queryset.filter(**{f'{name}__lt': start_of_day(value + timedelta(days=1))})
+
+
+class LowStockAlertFilter(django_filters.FilterSet):
+    state = django_filters.ChoiceFilter(
+        choices=[('open', 'Open'), ('cleared', 'Cleared'), ('all', 'All')], method='filter_state'
+    )
+
+    class Meta:
+        model = LowStockAlert
+        fields = ['state', 'product']
+
+    def __init__(self, data=None, *args, **kwargs):
+        # Only open alerts unless asked otherwise
+        if data is not None and not data.get('state'):
+            data = data.copy()
+            data['state'] = 'open'
+        super().__init__(data, *args, **kwargs)
+
+    def filter_state(self, queryset, name, value):
+        if value == 'all':
+            return queryset
+        return queryset.filter(cleared_at__isnull=value == 'open')
@@ -0,0 +1,141 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .caching import invalidate_models
+from .models import Product
+
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def output_format():
+    fmt = settings.PRODUCT_IMAGE_FORMAT.upper()
+    if fmt == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return fmt
+
+
+def rendition_name(name, size_name, fmt):
+    """products/chair.png -> products/chair.thumb.webp, next to the original"""
+    root, _ = os.path.splitext(name)
+    return f'{root}.{size_name}.{EXTENSIONS[fmt]}'
+
+
+def render(image, size, fmt):
+    """Resize a copy of `image` to fit within `size` and encode it"""
+    copy = image.copy()
+    copy.thumbnail(size, Image.LANCZOS)
+    if fmt == 'JPEG' and copy.mode != 'RGB':
+        copy = copy.convert('RGB')
+    elif copy.mode not in ('RGB', 'RGBA'):
+        copy = copy.convert('RGBA' if 'transparency' in copy.info else 'RGB')
+    buffer = io.BytesIO()
+    copy.save(buffer, fmt, quality=settings.PRODUCT_IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def generate_renditions(name, storage=default_storage):
+    """
+    Write every configured rendition of the stored image `name` and return
+    {'source': name, size_name: rendition_name, ...}. Runs without touching
+    the database, so it is safe to call from worker processes.
+    """
+    fmt = output_format()
+    sizes = settings.PRODUCT_IMAGE_RENDITIONS
+    largest = (max(w for w, _ in sizes.values()), max(h for _, h in sizes.values()))
+    with storage.open(name) as f:
+        image = Image.open(f)
+        # JPEGs can be decoded straight at a reduced scale that still covers
+        # the largest rendition, which is most of the work for big photos
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    renditions = {'source': name}
+    for size_name, size in sizes.items():
+        path = rendition_name(name, size_name, fmt)
+        if storage.exists(path):
+            storage.delete(path)
+        renditions[size_name] = storage.save(path, ContentFile(render(image, size, fmt)))
+    return renditions
+
+
+def save_renditions(product_id, renditions):
+    """
+    Record renditions, unless the product's image changed in the meantime.
+    They are part of the representation, so the version moves on like for
+    any other change: ETags and If-Match checks must not match the old one.
+    """
+    updated = Product.objects.filter(pk=product_id, image=renditions['source']).update(
+        image_renditions=renditions, version=F('version') + 1, updated_at=timezone.now()
+    )
+    if updated:
+        invalidate_models(Product)
+    return updated
+
+
+def process(product_id, name):
+    try:
+        save_renditions(product_id, generate_renditions(name))
+    except Exception:
+        logger.exception('Could not generate renditions for product %s (%s)', product_id, name)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PRODUCT_IMAGE_WORKERS, thread_name_prefix='renditions'
+            )
+        return _executor
+
+
+def schedule(product_id, name):
+    """
+    Generate renditions once the current transaction commits: on the thread
+    pool (Pillow releases the GIL while decoding, resizing and encoding), or
+    inline when PRODUCT_IMAGE_WORKERS is 0.
+    """
+    if settings.PRODUCT_IMAGE_WORKERS:
+        transaction.on_commit(lambda: get_executor().submit(process, product_id, name))
+    else:
+        transaction.on_commit(lambda: process(product_id, name))
+
+
+def needs_renditions(product):
+    return bool(product.image) and product.image_renditions.get('source') != product.image.name
+
+
+def rendition_url(product, size_name):
+    """URL of a rendition, or of the original until the rendition exists"""
+    if not product.image:
+        return None
+    renditions = product.image_renditions or {}
+    if renditions.get('source') == product.image.name and size_name in renditions:
+        return product.image.storage.url(renditions[size_name])
+    return product.image.url
+
+
+@receiver(post_save, sender=Product)
+def renditions_on_upload(sender, instance, raw=False, **kwargs):
+    if not raw and needs_renditions(instance):
+        schedule(instance.pk, instance.image.name)
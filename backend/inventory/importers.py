@@ -0,0 +1,401 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+
+from . import alerts, outbox
+from .caching import invalidate_models
+from .models import Category, Location, Supplier, Product, StockLevel, StockMovement
+
+
+FORMATS = {'.csv': 'csv', '.json': 'json', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'active'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'inactive'}
+
+# Header aliases so a file produced by export_csv can be imported back as-is
+ALIASES = {'active': 'is_active', 'min_stock': 'min_stock_level'}
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(filename, default='csv'):
+    return FORMATS.get(os.path.splitext(filename or '')[1].lower(), default)
+
+
+def normalize_key(key):
+    key = (key or '').strip().lower().replace(' ', '_')
+    return ALIASES.get(key, key)
+
+
+def iter_json_array(stream, read_size=64 * 1024):
+    """Yield the items of a top-level JSON array without loading the whole document"""
+    decoder = json.JSONDecoder()
+    buffer, started = '', False
+    while True:
+        data = stream.read(read_size)
+        buffer += data
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != '[':
+                    raise ValueError('Expected a JSON array of objects')
+                buffer, started = buffer[1:], True
+                continue
+            buffer = buffer.lstrip(',').lstrip()
+            if not buffer or buffer[0] == ']':
+                break
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if not data:
+                    raise
+                break  # need more input
+            yield item
+            buffer = buffer[end:]
+        if not data:
+            return
+
+
+def read_rows(stream, fmt):
+    """Yield one dict per record from a text stream, with normalized keys"""
+    if fmt == 'csv':
+        records = csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        records = (json.loads(line) for line in stream if line.strip())
+    elif fmt == 'json':
+        records = iter_json_array(stream)
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+    for record in records:
+        if not isinstance(record, dict):
+            raise ValueError('Each record must be an object')
+        yield {normalize_key(key): value for key, value in record.items()}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def clean_text(row, key, required=False, max_length=None):
+    value = row.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'{key} is required')
+    if max_length and len(value) > max_length:
+        raise RowError(f'{key} must be at most {max_length} characters')
+    return value
+
+
+def clean_int(row, key, default=0):
+    value = row.get(key)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(str(value).strip())
+    except ValueError:
+        raise RowError(f'{key} must be a valid integer')
+    if value < 0:
+        raise RowError(f'{key} cannot be negative')
+    return value
+
+
+def clean_decimal(row, key):
+    value = row.get(key)
+    if value in (None, ''):
+        raise RowError(f'{key} is required')
+    try:
+        value = Decimal(str(value).strip().lstrip('$'))
+    except InvalidOperation:
+        raise RowError(f'{key} must be a number')
+    if value < 0:
+        raise RowError(f'{key} cannot be negative')
+    return value.quantize(Decimal('0.01'))
+
+
+def clean_bool(row, key, default=True):
+    value = row.get(key)
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError(f'{key} must be yes/no or true/false')
+
+
+class ImportReport:
+    def __init__(self, max_errors=1000):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    def add_error(self, row, message, key=None):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            error = {'row': row, 'error': message}
+            if key:
+                error['key'] = key
+            self.errors.append(error)
+
+    def finish(self):
+        self.seconds = time.monotonic() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.seconds, 1) if self.seconds else float(self.rows)
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': self.rows_per_second,
+        }
+
+
+class BaseImporter:
+    """
+    Streams records in chunks and upserts each chunk with a handful of set-based
+    queries, so the cost per row stays constant however large the file is.
+    Each chunk is committed on its own.
+    """
+    key = None
+    chunk_size = 1000
+
+    def __init__(self, chunk_size=None, dry_run=False):
+        self.chunk_size = chunk_size or self.chunk_size
+        self.dry_run = dry_run
+
+    def run(self, rows):
+        report = ImportReport()
+        numbered = enumerate(rows, start=1)
+        for chunk in chunked(numbered, self.chunk_size):
+            report.rows += len(chunk)
+            parsed = {}
+            for number, row in chunk:
+                try:
+                    record = self.parse(row)
+                except RowError as e:
+                    report.add_error(number, str(e), row.get(self.key))
+                    continue
+                # Later rows for the same key win, as they would if applied one by one
+                record['row'] = number
+                parsed[record[self.key]] = record
+            if parsed:
+                with transaction.atomic():
+                    self.import_chunk(list(parsed.values()), report)
+                    if self.dry_run:
+                        transaction.set_rollback(True)
+        return report.finish()
+
+    def parse(self, row):
+        raise NotImplementedError
+
+    def import_chunk(self, records, report):
+        raise NotImplementedError
+
+
+class NamedModelImporter(BaseImporter):
+    """Upserts a lookup model (categories, suppliers) keyed on its unique name"""
+    key = 'name'
+    model = None
+    fields = ()
+
+    def parse(self, row):
+        record = {'name': clean_text(row, 'name', required=True, max_length=100)}
+        for field in self.fields:
+            max_length = self.model._meta.get_field(field).max_length
+            record[field] = clean_text(row, field, max_length=max_length)
+        return record
+
+    def import_chunk(self, records, report):
+        names = [record['name'] for record in records]
+        existing = set(self.model.objects.filter(name__in=names).values_list('name', flat=True))
+        self.model.objects.bulk_create(
+            [self.model(name=record['name'], **{field: record[field] for field in self.fields})
+             for record in records],
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=[*self.fields, 'updated_at'],
+        )
+        report.created += len(records) - len(existing)
+        report.updated += len(existing)
+        # bulk_create sends no save signals
+        invalidate_models(self.model)
+
+
+class CategoryImporter(NamedModelImporter):
+    model = Category
+    fields = ('description',)
+
+
+class SupplierImporter(NamedModelImporter):
+    model = Supplier
+    fields = ('contact_person', 'email', 'phone', 'address')
+
+
+class ProductImporter(BaseImporter):
+    """
+    Upserts products on SKU. Categories and suppliers are referenced by name and
+    created when missing. Stock level changes are recorded as movements: new
+    products get an opening-stock IN, existing ones an IN/OUT for the difference.
+    """
+    key = 'sku'
+    update_fields = [
+        'name', 'description', 'price', 'quantity', 'min_stock_level',
+        'category', 'supplier', 'is_active', 'updated_at',
+    ]
+
+    def __init__(self, chunk_size=None, dry_run=False, create_missing=True,
+                 performed_by='Import', reference='Bulk import'):
+        super().__init__(chunk_size, dry_run)
+        self.create_missing = create_missing
+        self.performed_by = performed_by
+        self.reference = reference
+
+    def parse(self, row):
+        return {
+            'sku': clean_text(row, 'sku', required=True, max_length=50),
+            'name': clean_text(row, 'name', required=True, max_length=200),
+            'description': clean_text(row, 'description'),
+            'price': clean_decimal(row, 'price'),
+            'quantity': clean_int(row, 'quantity'),
+            'min_stock_level': clean_int(row, 'min_stock_level'),
+            'category': clean_text(row, 'category', required=True, max_length=100),
+            'supplier': clean_text(row, 'supplier', required=True, max_length=100),
+            'is_active': clean_bool(row, 'is_active'),
+        }
+
+    def resolve_names(self, model, names):
+        """Map names to ids with one lookup, creating the missing ones in bulk"""
+        ids = dict(model.objects.filter(name__in=names).values_list('name', 'id'))
+        missing = set(names) - set(ids)
+        if missing and self.create_missing:
+            model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+        return ids
+
+    def import_chunk(self, records, report):
+        categories = self.resolve_names(Category, {record['category'] for record in records})
+        suppliers = self.resolve_names(Supplier, {record['supplier'] for record in records})
+
+        products = []
+        for record in records:
+            category_id = categories.get(record['category'])
+            supplier_id = suppliers.get(record['supplier'])
+            if category_id is None or supplier_id is None:
+                missing = 'category' if category_id is None else 'supplier'
+                report.add_error(record['row'], f'Unknown {missing}: {record[missing]}', record['sku'])
+                continue
+            products.append(Product(
+                category_id=category_id, supplier_id=supplier_id,
+                **{k: v for k, v in record.items() if k not in ('category', 'supplier', 'row')}
+            ))
+        if not products:
+            return
+
+        skus = [product.sku for product in products]
+        existing = {
+            sku: (pk, quantity)
+            for sku, pk, quantity in Product.objects.filter(sku__in=skus).values_list('sku', 'id', 'quantity')
+        }
+        # The imported quantity is the total. Changes are made at the default
+        # location, so it cannot drop below the stock held at the others
+        location = Location.default()
+        default_levels = dict(
+            StockLevel.objects.filter(product_id__in=[pk for pk, _ in existing.values()], location=location)
+            .values_list('product_id', 'quantity')
+        )
+        elsewhere = {sku: quantity - default_levels.get(pk, 0) for sku, (pk, quantity) in existing.items()}
+        short = {product.sku for product in products if product.quantity < elsewhere.get(product.sku, 0)}
+        if short:
+            for record in records:
+                if record['sku'] in short:
+                    report.add_error(
+                        record['row'],
+                        f'Quantity is below the stock held at other locations ({elsewhere[record["sku"]]})',
+                        record['sku']
+                    )
+                    existing.pop(record['sku'])
+            products = [product for product in products if product.sku not in short]
+            if not products:
+                return
+            skus = [product.sku for product in products]
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=self.update_fields,
+        )
+        if existing:
+            # The upsert writes the imported values as they are; bump versions separately
+            Product.objects.filter(pk__in=[pk for pk, _ in existing.values()]).update(version=F('version') + 1)
+        report.created += len(products) - len(existing)
+        report.updated += len(existing)
+
+        new_ids = dict(
+            Product.objects.filter(sku__in=[sku for sku in skus if sku not in existing]).values_list('sku', 'id')
+        )
+        movements, levels = [], []
+        for product in products:
+            if product.sku in existing:
+                product_id, old_quantity = existing[product.sku]
+                reason = 'Stock level set by import'
+            else:
+                product_id, old_quantity = new_ids[product.sku], 0
+                reason = 'Opening stock'
+            change = product.quantity - old_quantity
+            if change:
+                levels.append(StockLevel(
+                    product_id=product_id, location=location,
+                    quantity=product.quantity - elsewhere.get(product.sku, 0),
+                ))
+                movements.append(StockMovement(
+                    product_id=product_id,
+                    location=location,
+                    quantity=abs(change),
+                    movement_type='IN' if change > 0 else 'OUT',
+                    reason=reason,
+                    reference=self.reference,
+                    performed_by=self.performed_by,
+                ))
+        StockLevel.objects.bulk_create(
+            levels, update_conflicts=True, unique_fields=['product', 'location'], update_fields=['quantity', 'updated_at']
+        )
+        StockMovement.objects.bulk_create(movements)
+        invalidate_models(Product, Category, Supplier)
+        # bulk_create sends no save signals
+        outbox.record_movements(movements)
+        alerts.evaluate([pk for pk, _ in existing.values()] + list(new_ids.values()))
+
+
+IMPORTERS = {
+    'products': ProductImporter,
+    'categories': CategoryImporter,
+    'suppliers': SupplierImporter,
+}
@@ -0,0 +1,42 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import cold_storage, partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Move whole months of stock movements older than MOVEMENT_COLD_MONTHS out of the database '
+        'into compressed files, keeping per-product balances for each month'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=None,
+                            help='Months of movements, including the current one, kept in the database')
+        parser.add_argument('--before', type=str, default=None,
+                            help='Archive the months before the month of this date (YYYY-MM-DD) instead')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Rows deleted per transaction')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                cutoff = partitions.month_start(date.fromisoformat(options['before']))
+            except ValueError:
+                raise CommandError('--before must be a date in YYYY-MM-DD format')
+        else:
+            cutoff = cold_storage.cold_cutoff(months=options['months'])
+
+        try:
+            months, moved = cold_storage.archive_before(
+                cutoff, batch_size=options['batch_size'], log=self.stdout.write
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not months:
+            self.stdout.write('Nothing to archive (months not yet rolled up into snapshots are kept)')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} movements of {len(months)} months to {cold_storage.archive_dir()}'
+        ))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.forecasting import compute_reorder_points
+
+
+class Command(BaseCommand):
+    help = 'Forecast daily demand from stock movements and store suggested reorder points and quantities'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history-days', type=int, default=None,
+                            help='Days of movement history to use (FORECAST_HISTORY_DAYS)')
+        parser.add_argument('--window', type=int, default=None,
+                            help='Moving average window in days (FORECAST_MOVING_AVERAGE_DAYS)')
+        parser.add_argument('--alpha', type=float, default=None,
+                            help='Exponential smoothing factor, 0 to 1 (FORECAST_SMOOTHING)')
+        parser.add_argument('--service-level', type=float, default=None,
+                            help='Target probability of no stockout, 0 to 1 (FORECAST_SERVICE_LEVEL)')
+        parser.add_argument('--cycle-days', type=int, default=None,
+                            help='Days of demand a suggested order covers (FORECAST_ORDER_CYCLE_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Products per batch')
+        parser.add_argument('--apply', action='store_true',
+                            help='Also set each product\'s min_stock_level to its reorder point')
+
+    def handle(self, *args, **options):
+        for name in ('history_days', 'window', 'cycle_days', 'batch_size'):
+            if options[name] is not None and options[name] <= 0:
+                raise CommandError(f'--{name.replace("_", "-")} must be positive')
+        for name in ('alpha', 'service_level'):
+            if options[name] is not None and not 0 < options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be between 0 and 1')
+
+        started = time.monotonic()
+        count = compute_reorder_points(
+            history_days=options['history_days'],
+            window=options['window'],
+            alpha=options['alpha'],
+            service_level=options['service_level'],
+            cycle_days=options['cycle_days'],
+            batch_size=options['batch_size'],
+            apply=options['apply'],
+            log=(lambda message: self.stdout.write(message)) if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Computed reorder points for {count} products in {time.monotonic() - started:.1f}s')
+        )
@@ -0,0 +1,60 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from inventory.images import generate_renditions, needs_renditions, save_renditions
+from inventory.models import Product
+
+
+def render_one(item):
+    """Worker process entry point: returns (product_id, renditions, error)"""
+    product_id, name = item
+    try:
+        return product_id, generate_renditions(name), None
+    except Exception as e:
+        return product_id, None, f'{name}: {e}'
+
+
+class Command(BaseCommand):
+    help = 'Generate missing thumbnail/medium renditions for existing product images, in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes, defaults to the number of CPUs')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate renditions that already exist')
+
+    def handle(self, *args, **options):
+        pending = [
+            (product.pk, product.image.name)
+            for product in Product.objects.exclude(image='').exclude(image=None)
+            .only('id', 'image', 'image_renditions').iterator(chunk_size=2000)
+            if options['force'] or needs_renditions(product)
+        ]
+        if not pending:
+            self.stdout.write('All product images already have renditions')
+            return
+
+        self.stdout.write(f'Generating renditions for {len(pending)} images with {options["workers"]} workers...')
+        started = time.monotonic()
+        done = failed = 0
+        # Workers only touch storage; don't let them inherit open database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+            for product_id, renditions, error in executor.map(render_one, pending, chunksize=16):
+                if error:
+                    failed += 1
+                    self.stderr.write(f'Product {product_id}: {error}')
+                    continue
+                save_renditions(product_id, renditions)
+                done += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Generated renditions for {done} images in {time.monotonic() - started:.2f}s, {failed} failed'
+            )
+        )
@@ -0,0 +1,233 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from inventory import alerts
+from inventory.caching import invalidate_models
+from inventory.models import Category, Location, Supplier, Product, StockLevel, StockMovement
+
+
+ADJECTIVES = 'black white silver compact portable ergonomic premium basic pro mini max ultra heavy-duty'.split()
+NOUNS = (
+    'keyboard mouse monitor laptop desk lamp chair cable adapter charger printer paper stapler '
+    'notebook pen marker headset speaker webcam router switch drive battery case stand hub dock '
+    'tablet phone screen bag backpack bottle mug tape shelf drawer cabinet label scanner'
+).split()
+REASONS = {
+    'IN': ['Purchase order received', 'Customer return', 'Transfer in'],
+    'OUT': ['Sales order', 'Damaged', 'Transfer out'],
+    'ADJ': ['Cycle count', 'Stocktake correction'],
+}
+# Roughly what a warehouse sees: mostly picks, regular receipts, few corrections
+MOVEMENT_WEIGHTS = {'IN': 3, 'OUT': 6, 'ADJ': 1}
+
+PREFIX = 'LOAD'
+
+
+def create_movements(movements, timestamps, batch_size):
+    """
+    Bulk insert movements with the given timestamps. bulk_create stamps them
+    with the current time (auto_now_add), so the generated times are written
+    afterwards with bulk_update, which takes values as they are.
+    """
+    created = StockMovement.objects.bulk_create(movements, batch_size=batch_size)
+    for movement, timestamp in zip(created, timestamps):
+        movement.timestamp = timestamp
+    StockMovement.objects.bulk_update(created, ['timestamp'], batch_size=batch_size)
+
+
+def apply_deltas(deltas, levels, location, now):
+    """Add each product's net change to its quantity and to its stock at `location`"""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    Product.objects.filter(pk__in=deltas).update(
+        quantity=F('quantity') + Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()], output_field=IntegerField()
+        ),
+        version=F('version') + 1,
+        updated_at=now,
+    )
+    existing = {pk: levels[pk] for pk in deltas if pk in levels}
+    if existing:
+        StockLevel.objects.filter(pk__in=existing.values()).update(
+            quantity=F('quantity') + Case(
+                *[When(pk=level, then=Value(deltas[pk])) for pk, level in existing.items()],
+                output_field=IntegerField()
+            ),
+            updated_at=now,
+        )
+    for level in StockLevel.objects.bulk_create([
+        StockLevel(product_id=pk, location=location, quantity=delta)
+        for pk, delta in deltas.items() if pk not in levels
+    ]):
+        levels[level.product_id] = level.pk
+
+
+def generate(categories=0, suppliers=0, products=0, movements=0, days=365, seed=None,
+             batch_size=5000, log=None):
+    """
+    Add synthetic data with bulk inserts. Every call appends: names and SKUs
+    continue from what earlier runs created, so a dataset can be grown in
+    steps. New products are spread over all (load) categories and suppliers,
+    new movements over all products and the last `days` days.
+
+    Stock always agrees with the movements: new products get an opening
+    stock movement at the start of the window, and movements are generated
+    in time order against each product's running stock at the default
+    location (an OUT never takes more than is there), each batch updating
+    the quantities and stock levels it changed.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    now = timezone.now()
+    window_start = now - timedelta(days=days)
+
+    def add_named(model, label, count):
+        start = model.objects.filter(name__startswith=f'{PREFIX} {label} ').count()
+        model.objects.bulk_create(
+            [model(name=f'{PREFIX} {label} {i:05d}') for i in range(start, start + count)],
+            batch_size=batch_size,
+        )
+        return list(model.objects.filter(name__startswith=f'{PREFIX} {label} ').values_list('id', flat=True))
+
+    category_ids = add_named(Category, 'Category', categories)
+    supplier_ids = add_named(Supplier, 'Supplier', suppliers)
+    if products and not (category_ids and supplier_ids):
+        raise ValueError('Products need at least one load category and supplier')
+    log(f'{len(category_ids)} categories, {len(supplier_ids)} suppliers')
+
+    start = Product.objects.filter(sku__startswith=f'{PREFIX}-').count()
+    location = Location.default()
+    for offset in range(start, start + products, batch_size):
+        with transaction.atomic():
+            created = Product.objects.bulk_create([
+                Product(
+                    name=f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} {i}',
+                    sku=f'{PREFIX}-{i:08d}',
+                    description=' '.join(rng.choice(NOUNS + ADJECTIVES) for _ in range(10)),
+                    price=Decimal(rng.randint(100, 50000)) / 100,
+                    quantity=rng.randint(0, 500),
+                    min_stock_level=rng.randint(0, 30),
+                    category_id=rng.choice(category_ids),
+                    supplier_id=rng.choice(supplier_ids),
+                    is_active=rng.random() < 0.9,
+                )
+                for i in range(offset, min(offset + batch_size, start + products))
+            ])
+            # All of it held at the default location, received at the start of the window
+            stocked = [product for product in created if product.quantity]
+            StockLevel.objects.bulk_create([
+                StockLevel(product=product, location=location, quantity=product.quantity)
+                for product in stocked
+            ])
+            create_movements([
+                StockMovement(
+                    product=product, location=location, quantity=product.quantity, movement_type='IN',
+                    reason='Opening stock', performed_by='Load generator',
+                )
+                for product in stocked
+            ], [window_start] * len(stocked), batch_size)
+        log(f'{min(offset + batch_size, start + products) - start}/{products} products')
+    if products:
+        alerts.evaluate()
+
+    if movements:
+        product_ids = list(Product.objects.values_list('id', flat=True))
+        if not product_ids:
+            raise ValueError('Movements need at least one product')
+        stock = dict.fromkeys(product_ids, 0)
+        levels = {}
+        for level_id, product_id, quantity in StockLevel.objects.filter(location=location).values_list(
+            'id', 'product_id', 'quantity'
+        ):
+            levels[product_id] = level_id
+            stock[product_id] = quantity
+        types = list(MOVEMENT_WEIGHTS)
+        weights = list(MOVEMENT_WEIGHTS.values())
+        span = (now - window_start).total_seconds()
+        for offset in range(0, movements, batch_size):
+            count = min(batch_size, movements - offset)
+            # Each batch covers its own slice of the window, so stock is followed in time order
+            first = window_start + timedelta(seconds=span * offset / movements)
+            timestamps = sorted(
+                first + timedelta(seconds=rng.uniform(0, span * count / movements)) for _ in range(count)
+            )
+            batch, deltas = [], {}
+            for movement_type in rng.choices(types, weights, k=count):
+                product_id = rng.choice(product_ids)
+                quantity = rng.randint(1, 25)
+                if movement_type == 'OUT':
+                    if not stock[product_id]:
+                        movement_type = 'IN'
+                    quantity = min(quantity, stock[product_id]) or quantity
+                net = -quantity if movement_type == 'OUT' else quantity
+                stock[product_id] += net
+                deltas[product_id] = deltas.get(product_id, 0) + net
+                batch.append(StockMovement(
+                    product_id=product_id,
+                    location=location,
+                    quantity=quantity,
+                    movement_type=movement_type,
+                    reason=rng.choice(REASONS[movement_type]),
+                    reference=f'{PREFIX}-{rng.randint(1, 99999):05d}',
+                    performed_by='Load generator',
+                ))
+            with transaction.atomic():
+                create_movements(batch, timestamps, batch_size)
+                apply_deltas(deltas, levels, location, now)
+            log(f'{offset + count}/{movements} movements')
+        alerts.evaluate()
+
+    invalidate_models(Category, Supplier, Product)
+
+
+class Command(BaseCommand):
+    help = 'Bulk insert synthetic categories, suppliers, products and stock movements for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--suppliers', type=int, default=10)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--movements', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread movement timestamps over this many past days')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        for name in ('categories', 'suppliers', 'products', 'movements', 'batch_size', 'days'):
+            if options[name] < 0 or (name in ('batch_size', 'days') and options[name] == 0):
+                raise CommandError(f'--{name.replace("_", "-")} must be positive')
+
+        started = time.monotonic()
+        log = (lambda message: self.stdout.write(message)) if options['verbosity'] > 1 else None
+        try:
+            generate(
+                categories=options['categories'],
+                suppliers=options['suppliers'],
+                products=options['products'],
+                movements=options['movements'],
+                days=options['days'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                log=log,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not options['verbosity']:
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Added {options["categories"]} categories, {options["suppliers"]} suppliers, '
+                f'{options["products"]} products and {options["movements"]} movements '
+                f'in {time.monotonic() - started:.1f}s'
+            )
+        )
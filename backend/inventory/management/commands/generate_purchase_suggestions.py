@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.models import PurchaseOrderLine
+from inventory.purchasing import generate_drafts
+
+
+class Command(BaseCommand):
+    help = 'Group low-stock products by supplier into draft purchase orders (safe to run every few minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--supplier', type=int, default=None, help='Only this supplier id')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        orders = generate_drafts(options['supplier'])
+        lines = PurchaseOrderLine.objects.filter(order__in=[order.pk for order in orders.values()]).count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{len(orders)} draft purchase orders with {lines} lines in {time.monotonic() - started:.2f}s'
+            )
+        )
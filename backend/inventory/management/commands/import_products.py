@@ -0,0 +1,55 @@
+import csv
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importers import IMPORTERS, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products (or categories/suppliers) from a CSV, JSON or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='File to import, or - for stdin')
+        parser.add_argument('--model', choices=sorted(IMPORTERS), default='products')
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl'], default=None,
+                            help='Defaults to the file extension, or csv')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Validate and roll back every chunk')
+        parser.add_argument('--no-create-missing', action='store_true',
+                            help='Reject products whose category or supplier does not exist yet')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+
+        kwargs = {'chunk_size': options['chunk_size'], 'dry_run': options['dry_run']}
+        if options['model'] == 'products':
+            kwargs['create_missing'] = not options['no_create_missing']
+        importer = IMPORTERS[options['model']](**kwargs)
+
+        self.stdout.write(f'Importing {options["model"]} from {path} ({fmt})...')
+        try:
+            if path == '-':
+                stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+                report = importer.run(read_rows(stream, fmt))
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    report = importer.run(read_rows(stream, fmt))
+        except (OSError, ValueError, csv.Error) as e:
+            raise CommandError(f'Import failed: {e}')
+
+        for error in report.errors:
+            key = f' [{error["key"]}]' if error.get('key') else ''
+            self.stderr.write(f'Row {error["row"]}{key}: {error["error"]}')
+        if report.failed > len(report.errors):
+            self.stderr.write(f'... and {report.failed - len(report.errors)} more errors')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{"[DRY RUN] " if options["dry_run"] else ""}'
+                f'Processed {report.rows} rows in {report.seconds:.2f}s ({report.rows_per_second} rows/sec)\n'
+                f'Created: {report.created}, Updated: {report.updated}, Failed: {report.failed}'
+            )
+        )
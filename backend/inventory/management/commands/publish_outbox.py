@@ -0,0 +1,67 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from inventory import outbox
+
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        'Publish pending stock movement events from the outbox to OUTBOX_SINK in batches, '
+        'retrying failed batches with backoff, until stopped (or once with --once)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', choices=sorted(outbox.SINKS), default=None,
+                            help='Where to publish (default: OUTBOX_SINK)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Events per delivery (default: OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--once', action='store_true',
+                            help='Publish what is pending and exit, failing on the first error')
+
+    def handle(self, *args, **options):
+        try:
+            sink = outbox.get_sink(options['sink'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        batch_size = options['batch_size'] or settings.OUTBOX_BATCH_SIZE
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        if options['once']:
+            try:
+                published = outbox.drain(sink, batch_size)
+            except outbox.PublishError as e:
+                raise CommandError(str(e))
+            purged = outbox.purge_published()
+            self.stdout.write(self.style.SUCCESS(
+                f'Published {published} events, deleted {purged} published before the retention period'
+            ))
+            return
+
+        failures, purged_at = 0, 0
+        while True:
+            try:
+                if time.monotonic() - purged_at >= PURGE_INTERVAL:
+                    outbox.purge_published()
+                    purged_at = time.monotonic()
+                published = outbox.drain(sink, batch_size)
+                if published:
+                    self.stdout.write(f'Published {published} events')
+                failures = 0
+                delay = settings.OUTBOX_POLL_INTERVAL
+            except outbox.PublishError as e:
+                failures += 1
+                delay = outbox.backoff(failures)
+                logger.warning('%s; retrying in %.1fs', e, delay)
+            finally:
+                close_old_connections()
+            time.sleep(delay)
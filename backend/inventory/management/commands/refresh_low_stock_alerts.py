@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from inventory.alerts import evaluate
+
+
+class Command(BaseCommand):
+    help = 'Reconcile low-stock alerts with current stock, e.g. after raw SQL or bulk loads that bypass the app'
+
+    def handle(self, *args, **options):
+        triggered, cleared = evaluate()
+        self.stdout.write(self.style.SUCCESS(f'Triggered {triggered} and cleared {cleared} low stock alerts'))
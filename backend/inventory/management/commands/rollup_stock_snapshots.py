@@ -0,0 +1,32 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.snapshots import rollup
+
+
+class Command(BaseCommand):
+    help = 'Roll stock movements up into daily per-product stock snapshots (incremental)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', type=str, default=None,
+                            help='Last day to roll up (YYYY-MM-DD), defaults to yesterday')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Products processed per transaction')
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            try:
+                until = date.fromisoformat(options['until'])
+            except ValueError:
+                raise CommandError('--until must be a date in YYYY-MM-DD format')
+
+        first_day, last_day, written = rollup(until=until, chunk_size=options['chunk_size'])
+        if not written:
+            self.stdout.write(f'Snapshots already up to date (through {last_day})')
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Wrote {written} snapshots for {first_day} to {last_day}')
+        )
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from inventory import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Create upcoming monthly stock movement partitions (PostgreSQL) and move months '
+        'older than the hot window to the archive table'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=settings.MOVEMENT_PARTITIONS_AHEAD,
+                            help='Months of partitions to create ahead of the current one')
+        parser.add_argument('--hot-months', type=int, default=settings.MOVEMENT_HOT_MONTHS,
+                            help='Months of movements, including the current one, kept in the main table')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Rows moved per transaction when tables are not partitioned')
+
+    def handle(self, *args, **options):
+        created, cutoff, moved = partitions.rotate(
+            ahead=options['ahead'], hot_months=options['hot_months'], batch_size=options['batch_size']
+        )
+        for month in created:
+            self.stdout.write(f'Created partition {partitions.partition_name(month)}')
+        if cutoff is None:
+            self.stdout.write('Nothing archived: run rollup_stock_snapshots first')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} movements from before {cutoff:%Y-%m}'))
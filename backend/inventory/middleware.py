@@ -0,0 +1,232 @@
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    In-process per-route request metrics, rendered in the Prometheus text
+    format. Each worker process keeps its own numbers; Prometheus sums them
+    when every worker is scraped (or use a single-process server).
+    """
+    HISTOGRAMS = {
+        'http_request_duration_seconds': ('Request duration', DURATION_BUCKETS),
+        'http_request_db_seconds': ('Time spent in SQL per request', DURATION_BUCKETS),
+        'http_request_render_seconds': ('Time spent rendering the response body', DURATION_BUCKETS),
+        'http_request_queries': ('SQL queries per request', QUERY_BUCKETS),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.histograms = {
+            name: defaultdict(lambda buckets=buckets: Histogram(buckets))
+            for name, (_, buckets) in self.HISTOGRAMS.items()
+        }
+        self.duplicate_requests = Counter()
+
+    def record(self, labels, metrics):
+        with self.lock:
+            self.histograms['http_request_duration_seconds'][labels].observe(metrics.total)
+            self.histograms['http_request_db_seconds'][labels].observe(metrics.sql_time)
+            self.histograms['http_request_render_seconds'][labels].observe(metrics.render_time)
+            self.histograms['http_request_queries'][labels].observe(metrics.query_count)
+            if metrics.duplicates:
+                self.duplicate_requests[labels] += 1
+
+    def render(self):
+        def label_text(labels, **extra):
+            pairs = dict(zip(('method', 'route', 'status'), labels), **extra)
+            return ','.join(f'{key}="{value}"' for key, value in pairs.items())
+
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in self.HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for labels, histogram in sorted(self.histograms[name].items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{label_text(labels, le=bound)}}} {count}')
+                    lines.append(f'{name}_bucket{{{label_text(labels, le="+Inf")}}} {histogram.total}')
+                    lines.append(f'{name}_sum{{{label_text(labels)}}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{{label_text(labels)}}} {histogram.total}')
+            name = 'http_requests_with_duplicate_queries_total'
+            lines += [f'# HELP {name} Requests that repeated the same SQL statement (likely N+1)',
+                      f'# TYPE {name} counter']
+            for labels, count in sorted(self.duplicate_requests.items()):
+                lines.append(f'{name}{{{label_text(labels)}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Collects the SQL statements and timings of one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = Counter()
+        self.sql_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+        self.total = 0.0
+        self.duplicates = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            # The SQL text still has placeholders, so repeats of a statement
+            # with different parameters share a signature
+            self.statements[sql] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.statements.values())
+
+    def finish(self, threshold):
+        self.total = time.perf_counter() - self.started
+        self.duplicates = {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+    def server_timing(self):
+        app_time = max(self.total - self.sql_time - self.render_time, 0.0)
+        entries = [
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.query_count} queries"',
+            f'app;dur={app_time * 1000:.1f}',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ]
+        if self.duplicates:
+            repeated = sum(self.duplicates.values())
+            entries.append(f'dup;desc="{repeated} queries repeat {len(self.duplicates)} statements"')
+        return ', '.join(entries)
+
+
+def route_labels(request, response):
+    match = getattr(request, 'resolver_match', None)
+    route = (match.view_name or match.route) if match else 'unmatched'
+    return request.method, route, response.status_code
+
+
+class QueryMetricsMiddleware:
+    """
+    Measures a sample of requests (REQUEST_METRICS_SAMPLE_RATE, 0 to 1):
+    number of SQL queries and time spent in them, time spent rendering the
+    response, and statements repeated at least
+    REQUEST_METRICS_DUPLICATE_THRESHOLD times, which usually means an N+1
+    query. Results go into a Server-Timing header and the per-route
+    histograms served by metrics_view. Requests that are not sampled only
+    pay for one random() call. Works under WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled(request):
+            return self.get_response(request)
+
+        metrics = request._query_metrics = RequestMetrics()
+        with self.wrap_connections(metrics):
+            response = self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.sampled(request):
+            return await self.get_response(request)
+
+        metrics = request._query_metrics = RequestMetrics()
+        # Connections belong to a thread, and the async ORM (like sync views
+        # under ASGI) runs its queries in the request's thread-sensitive
+        # executor thread, so the wrappers are installed there
+        wrappers = self.wrap_connections(metrics)
+        await sync_to_async(wrappers.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.__exit__)(None, None, None)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def sampled(request):
+        rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return False
+        return request.path != settings.REQUEST_METRICS_PATH
+
+    @staticmethod
+    @contextmanager
+    def wrap_connections(metrics):
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(metrics))
+            yield
+
+    @staticmethod
+    def finish(request, response, metrics):
+        metrics.finish(settings.REQUEST_METRICS_DUPLICATE_THRESHOLD)
+        labels = route_labels(request, response)
+        registry.record(labels, metrics)
+        response['Server-Timing'] = metrics.server_timing()
+        if metrics.duplicates:
+            worst, count = max(metrics.duplicates.items(), key=lambda item: item[1])
+            logger.warning('%s %s repeated a query %d times: %s', *labels[:2], count, worst[:300])
+        return response
+
+    def process_template_response(self, request, response):
+        # Runs just before DRF/template responses are rendered
+        metrics = getattr(request, '_query_metrics', None)
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: self.rendered(metrics))
+        return response
+
+    @staticmethod
+    def rendered(metrics):
+        metrics.render_time += time.perf_counter() - metrics.render_started
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
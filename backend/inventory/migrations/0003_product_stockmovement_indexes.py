@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0002_product_image"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["name", "id"], name="product_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["is_active", "name"], name="product_active_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(
+                    ("is_active", True),
+                    ("quantity__lte", models.F("min_stock_level")),
+                ),
+                fields=["name", "id"],
+                name="product_low_stock_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockmovement",
+            index=models.Index(fields=["-timestamp", "-id"], name="movement_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="stockmovement",
+            index=models.Index(
+                fields=["product", "-timestamp"], name="movement_product_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockmovement",
+            index=models.Index(
+                fields=["movement_type", "-timestamp"], name="movement_type_time_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0003_product_stockmovement_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("closing_quantity", models.IntegerField()),
+                ("in_total", models.IntegerField(default=0)),
+                ("out_total", models.IntegerField(default=0)),
+                ("adj_total", models.IntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="inventory.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Stock Snapshot",
+                "verbose_name_plural": "Stock Snapshots",
+                "ordering": ["-date"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "date"), name="unique_product_snapshot_date"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import inventory.search
+
+FTS_TABLE = "inventory_product_fts"
+
+SQLITE_FORWARD = [
+    # External content table: the text lives in inventory_product only
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, sku, description,
+        content='inventory_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER inventory_product_fts_insert AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER inventory_product_fts_delete AFTER DELETE ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER inventory_product_fts_update AFTER UPDATE OF name, sku, description ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS inventory_product_fts_insert",
+    "DROP TRIGGER IF EXISTS inventory_product_fts_delete",
+    "DROP TRIGGER IF EXISTS inventory_product_fts_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def postgresql_indexes():
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+
+    from inventory.search import search_vector, sku_upper
+
+    return [
+        GinIndex(search_vector(), name="product_search_idx"),
+        GinIndex(
+            OpClass(sku_upper(), name="gin_trgm_ops"), name="product_sku_trgm_idx"
+        ),
+    ]
+
+
+def sqlite_has_fts5(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any("FTS5" in row[0] for row in cursor.fetchall())
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        Product = apps.get_model("inventory", "Product")
+        for index in postgresql_indexes():
+            schema_editor.add_index(Product, index)
+    elif vendor == "sqlite" and sqlite_has_fts5(schema_editor):
+        for statement in SQLITE_FORWARD:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        Product = apps.get_model("inventory", "Product")
+        for index in postgresql_indexes():
+            schema_editor.remove_index(Product, index)
+    elif vendor == "sqlite":
+        for statement in SQLITE_REVERSE:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0004_stocksnapshot"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.CreateModel(
+            name="ProductSearchEntry",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_entry",
+                        serialize=False,
+                        to="inventory.product",
+                    ),
+                ),
+                (
+                    "document",
+                    inventory.search.FullTextField(db_column="inventory_product_fts"),
+                ),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "inventory_product_fts",
+                "managed": False,
+            },
+        ),
+    ]
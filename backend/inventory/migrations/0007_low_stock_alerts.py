@@ -0,0 +1,123 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_existing_alerts(apps, schema_editor):
+    """Open an alert for every product that is already low on stock"""
+    Product = apps.get_model("inventory", "Product")
+    LowStockAlert = apps.get_model("inventory", "LowStockAlert")
+    low = Product.objects.filter(
+        is_active=True, quantity__lte=models.F("min_stock_level")
+    ).values_list("id", "quantity", "min_stock_level")
+    LowStockAlert.objects.bulk_create(
+        [
+            LowStockAlert(product_id=pk, quantity=quantity, min_stock_level=minimum)
+            for pk, quantity, minimum in low.iterator(chunk_size=2000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0006_product_image_renditions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LowStockAlert",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("quantity", models.IntegerField()),
+                ("min_stock_level", models.IntegerField()),
+                (
+                    "triggered_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("cleared_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="low_stock_alerts",
+                        to="inventory.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Low Stock Alert",
+                "verbose_name_plural": "Low Stock Alerts",
+                "ordering": ["-triggered_at", "-id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="LowStockAlertEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[("triggered", "Triggered"), ("cleared", "Cleared")],
+                        max_length=9,
+                    ),
+                ),
+                ("quantity", models.IntegerField()),
+                ("min_stock_level", models.IntegerField()),
+                ("timestamp", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "alert",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="inventory.lowstockalert",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="lowstockalert",
+            index=models.Index(
+                fields=["-triggered_at", "-id"], name="low_stock_alert_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lowstockalert",
+            index=models.Index(
+                condition=models.Q(("cleared_at__isnull", True)),
+                fields=["-triggered_at", "-id"],
+                name="low_stock_alert_open_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="lowstockalert",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("cleared_at__isnull", True)),
+                fields=("product",),
+                name="unique_open_low_stock_alert",
+            ),
+        ),
+        migrations.RunPython(open_existing_alerts, migrations.RunPython.noop),
+    ]
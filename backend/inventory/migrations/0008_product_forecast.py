@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0007_low_stock_alerts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductForecast",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="forecast",
+                        serialize=False,
+                        to="inventory.product",
+                    ),
+                ),
+                ("moving_average", models.FloatField()),
+                ("daily_demand", models.FloatField()),
+                ("demand_std", models.FloatField()),
+                ("lead_time_days", models.PositiveIntegerField()),
+                ("lead_time_demand", models.FloatField()),
+                ("safety_stock", models.PositiveIntegerField()),
+                ("reorder_point", models.PositiveIntegerField()),
+                ("reorder_quantity", models.PositiveIntegerField()),
+                ("history_days", models.PositiveIntegerField()),
+                ("computed_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Product Forecast",
+                "verbose_name_plural": "Product Forecasts",
+            },
+        ),
+        migrations.AddField(
+            model_name="supplier",
+            name="lead_time_days",
+            field=models.PositiveIntegerField(default=7),
+        ),
+    ]
@@ -0,0 +1,205 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:52
+
+from datetime import date, datetime, time
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Copies of the inventory.partitions helpers as they were when this migration
+# was written, so later changes to that module cannot change it
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(parent, month):
+    return f"{parent}_p{month:%Y_%m}"
+
+
+def default_partition_name(parent):
+    return f"{parent}_default"
+
+
+def month_bounds(month):
+    return (
+        timezone.make_aware(datetime.combine(month, time.min)),
+        timezone.make_aware(datetime.combine(add_months(month, 1), time.min)),
+    )
+
+
+def create_partition(schema_editor, parent, month):
+    """Add the partition for `month` under `parent`, moving its rows out of the default partition first"""
+    qn = schema_editor.quote_name
+    name = qn(partition_name(parent, month))
+    default = qn(default_partition_name(parent))
+    start, end = month_bounds(month)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {name} (LIKE {qn(parent)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {default} WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+            f"INSERT INTO {name} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(parent)} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+
+
+def add_indexes(schema_editor, model):
+    """Product and Meta indexes, which create_model skips for unmanaged models"""
+    product = model._meta.get_field("product")
+    schema_editor.execute(schema_editor._create_index_sql(model, fields=[product]))
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+
+
+def partition_movements(apps, schema_editor):
+    """
+    On PostgreSQL, rebuild the movement table partitioned by month, with one
+    partition per month of existing history up to MOVEMENT_PARTITIONS_AHEAD
+    months ahead, and create the archive table partitioned the same way.
+    Elsewhere the archive is a plain table.
+    """
+    ArchivedStockMovement = apps.get_model("inventory", "ArchivedStockMovement")
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.create_model(ArchivedStockMovement)
+        add_indexes(schema_editor, ArchivedStockMovement)
+        return
+
+    StockMovement = apps.get_model("inventory", "StockMovement")
+    qn = schema_editor.quote_name
+    table = StockMovement._meta.db_table
+    old = f"{table}_old"
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT min("timestamp") FROM {qn(table)}')
+        first = cursor.fetchone()[0]
+
+    schema_editor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+    schema_editor.execute(
+        f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING IDENTITY "
+        f'INCLUDING CONSTRAINTS) PARTITION BY RANGE ("timestamp")'
+    )
+    schema_editor.execute(
+        f"CREATE TABLE {qn(default_partition_name(table))} PARTITION OF {qn(table)} DEFAULT"
+    )
+    this_month = month_start(timezone.localdate())
+    month = month_start(timezone.localtime(first)) if first else this_month
+    last = add_months(this_month, settings.MOVEMENT_PARTITIONS_AHEAD)
+    while month <= last:
+        create_partition(schema_editor, table, month)
+        month = add_months(month, 1)
+
+    schema_editor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old)}")
+    schema_editor.execute(f"DROP TABLE {qn(old)}")
+    # The partition key has to be part of the primary key
+    schema_editor.execute(f'ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, "timestamp")')
+    product = StockMovement._meta.get_field("product")
+    schema_editor.execute(
+        schema_editor._create_fk_sql(
+            StockMovement, product, "_fk_%(to_table)s_%(to_column)s"
+        )
+    )
+    add_indexes(schema_editor, StockMovement)
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 1)) FROM {qn(table)}"
+    )
+
+    archive = ArchivedStockMovement._meta.db_table
+    schema_editor.execute(
+        f'CREATE TABLE {qn(archive)} (LIKE {qn(table)}) PARTITION BY RANGE ("timestamp")'
+    )
+    schema_editor.execute(
+        f"CREATE TABLE {qn(default_partition_name(archive))} PARTITION OF {qn(archive)} DEFAULT"
+    )
+    schema_editor.execute(
+        f'ALTER TABLE {qn(archive)} ADD PRIMARY KEY (id, "timestamp")'
+    )
+    add_indexes(schema_editor, ArchivedStockMovement)
+
+
+def unarchive_movements(apps, schema_editor):
+    """
+    Move archived rows back into the movement table and drop the archive. A
+    partitioned movement table stays partitioned: it is used the same way.
+    """
+    StockMovement = apps.get_model("inventory", "StockMovement")
+    ArchivedStockMovement = apps.get_model("inventory", "ArchivedStockMovement")
+    qn = schema_editor.quote_name
+    columns = ", ".join(
+        qn(field.column) for field in StockMovement._meta.concrete_fields
+    )
+    schema_editor.execute(
+        f"INSERT INTO {qn(StockMovement._meta.db_table)} ({columns}) "
+        f"SELECT {columns} FROM {qn(ArchivedStockMovement._meta.db_table)}"
+    )
+    schema_editor.execute(f"DROP TABLE {qn(ArchivedStockMovement._meta.db_table)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0009_purchase_orders"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedStockMovement",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="inventory.product",
+                    ),
+                ),
+                ("quantity", models.IntegerField()),
+                (
+                    "movement_type",
+                    models.CharField(
+                        choices=[
+                            ("IN", "Stock In"),
+                            ("OUT", "Stock Out"),
+                            ("ADJ", "Adjustment"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("reason", models.CharField(blank=True, max_length=200)),
+                ("reference", models.CharField(blank=True, max_length=100)),
+                ("performed_by", models.CharField(blank=True, max_length=100)),
+                ("timestamp", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "inventory_stockmovement_archive",
+                "ordering": ["-timestamp"],
+                "managed": False,
+                "indexes": [
+                    models.Index(
+                        fields=["-timestamp", "-id"], name="archived_movement_time_idx"
+                    ),
+                    models.Index(
+                        fields=["product", "-timestamp"],
+                        name="archived_movement_product_idx",
+                    ),
+                    models.Index(
+                        fields=["movement_type", "-timestamp"],
+                        name="archived_movement_type_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(partition_movements, unarchive_movements),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0010_partition_stock_movements"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MovementArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(unique=True)),
+                ("path", models.CharField(max_length=255)),
+                ("row_count", models.PositiveIntegerField(default=0)),
+                ("first_timestamp", models.DateTimeField()),
+                ("last_timestamp", models.DateTimeField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["-month"],
+            },
+        ),
+        migrations.CreateModel(
+            name="MovementArchiveBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("opening_quantity", models.IntegerField()),
+                ("in_total", models.IntegerField(default=0)),
+                ("out_total", models.IntegerField(default=0)),
+                ("adj_total", models.IntegerField(default=0)),
+                ("closing_quantity", models.IntegerField()),
+                (
+                    "archive",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balances",
+                        to="inventory.movementarchive",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_balances",
+                        to="inventory.product",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("archive", "product"),
+                        name="unique_archive_product_balance",
+                    )
+                ],
+            },
+        ),
+    ]
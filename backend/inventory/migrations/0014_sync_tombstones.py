@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0013_product_list_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "model_name",
+                    models.CharField(
+                        choices=[
+                            ("product", "Product"),
+                            ("category", "Category"),
+                            ("supplier", "Supplier"),
+                        ],
+                        max_length=8,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                ("key", models.CharField(blank=True, max_length=100)),
+                ("deleted_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "ordering": ["deleted_at", "id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["updated_at", "id"], name="category_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="supplier",
+            index=models.Index(
+                fields=["updated_at", "id"], name="supplier_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(
+                fields=["deleted_at", "id"], name="tombstone_deleted_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def stock_at_default_location(apps, schema_editor):
+    """Hold every product's current stock at the default location"""
+    Location = apps.get_model("inventory", "Location")
+    Product = apps.get_model("inventory", "Product")
+    StockLevel = apps.get_model("inventory", "StockLevel")
+    location, _ = Location.objects.using(schema_editor.connection.alias).get_or_create(
+        code=settings.DEFAULT_STOCK_LOCATION, defaults={"name": "Main warehouse"}
+    )
+    qn = schema_editor.quote_name
+    now = schema_editor.connection.ops.adapt_datetimefield_value(timezone.now())
+    # One statement however large the catalogue is
+    schema_editor.execute(
+        f"INSERT INTO {qn(StockLevel._meta.db_table)} (product_id, location_id, quantity, updated_at) "
+        f"SELECT id, %s, quantity, %s FROM {qn(Product._meta.db_table)} WHERE quantity > 0",
+        [location.pk, now],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0015_stock_movement_outbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Location",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("code", models.CharField(max_length=20, unique=True)),
+                ("name", models.CharField(max_length=100)),
+                ("address", models.TextField(blank=True)),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["code"],
+            },
+        ),
+        migrations.AddField(
+            model_name="stockmovement",
+            name="location",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="movements",
+                to="inventory.location",
+            ),
+        ),
+        migrations.CreateModel(
+            name="StockLevel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("quantity", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "location",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="stock_levels",
+                        to="inventory.location",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_levels",
+                        to="inventory.product",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["product", "location"],
+                "indexes": [
+                    models.Index(
+                        fields=["location", "product"], name="stock_level_location_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "location"), name="unique_stock_level"
+                    ),
+                    models.CheckConstraint(
+                        condition=models.Q(("quantity__gte", 0)),
+                        name="stock_level_not_negative",
+                    ),
+                ],
+            },
+        ),
+        # The archive keeps the same columns as the movement table (see inventory.partitions)
+        migrations.RunSQL(
+            "ALTER TABLE inventory_stockmovement_archive ADD COLUMN location_id bigint NULL",
+            "ALTER TABLE inventory_stockmovement_archive DROP COLUMN location_id",
+        ),
+        migrations.RunPython(stock_at_default_location, migrations.RunPython.noop),
+    ]
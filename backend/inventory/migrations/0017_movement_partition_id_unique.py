@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:05
+
+from django.db import migrations
+
+TABLES = ("inventory_stockmovement", "inventory_stockmovement_archive")
+
+
+def partitions_of(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = ANY(%s)",
+            [list(TABLES)],
+        )
+        return [name for name, in cursor.fetchall()]
+
+
+def add_id_unique_indexes(apps, schema_editor):
+    """
+    The primary key of the partitioned movement tables is (id, timestamp), so
+    the database does not keep ids unique (see inventory.partitions). Index
+    id uniquely in every existing partition, default ones included; new
+    partitions get the index when they are created.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    qn = schema_editor.quote_name
+    for partition in partitions_of(schema_editor):
+        schema_editor.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS {qn(f"{partition}_id_uniq")} ON {qn(partition)} (id)'
+        )
+
+
+def remove_id_unique_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    qn = schema_editor.quote_name
+    for partition in partitions_of(schema_editor):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {qn(f"{partition}_id_uniq")}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0016_stock_locations"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_id_unique_indexes, remove_id_unique_indexes),
+    ]
@@ -1,5 +1,9 @@
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .search import FTS_TABLE, FullTextField
 
 
 class Category(models.Model):
@@ -10,6 +14,10 @@ class Category(models.Model):
 
     class Meta:
         verbose_name_plural = "categories"
+        indexes = [
+            # Incremental sync reads changes in (updated_at, id) order
+            models.Index(fields=['updated_at', 'id'], name='category_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -21,13 +29,63 @@ class Supplier(models.Model):
     email = models.EmailField(blank=True)
     phone = models.CharField(max_length=20, blank=True)
     address = models.TextField(blank=True)
+    # Days between placing an order and the stock arriving, used for reorder points
+    lead_time_days = models.PositiveIntegerField(default=7)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Incremental sync reads changes in (updated_at, id) order
+            models.Index(fields=['updated_at', 'id'], name='supplier_updated_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class Location(models.Model):
+    """A warehouse or other place stock is held at; see StockLevel"""
+    code = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=100)
+    address = models.TextField(blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['code']
+
+    def __str__(self):
+        return f"{self.code} - {self.name}"
+
+    @classmethod
+    def default(cls):
+        """Where stock changes that name no location are made (DEFAULT_STOCK_LOCATION)"""
+        location, _ = cls.objects.get_or_create(
+            code=settings.DEFAULT_STOCK_LOCATION, defaults={'name': 'Main warehouse'}
+        )
+        return location
+
+
+class InsufficientStock(Exception):
+    """Raised when a stock change would take a product, or its stock at a location, below zero"""
+
+    def __init__(self, product, available, message=None):
+        self.product = product
+        self.available = available
+        super().__init__(message or f'Cannot remove more than current stock ({available})')
+
+
+class VersionConflict(Exception):
+    """Raised when saving a product that was changed since the version it was read at"""
+
+    def __init__(self, product_id, expected_version):
+        self.product_id = product_id
+        self.expected_version = expected_version
+        super().__init__(f'Product {product_id} was changed since version {expected_version}')
+
+
 class Product(models.Model):
     name = models.CharField(max_length=200)
     sku = models.CharField(max_length=50, unique=True)
@@ -38,40 +96,155 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Resized copies of `image` by size name, plus the 'source' they were made from
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
+    # Incremented by every write, so updates can compare-and-swap on it
+    version = models.PositiveIntegerField(default=1, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Default list ordering and keyset pagination
+            models.Index(fields=['name', 'id'], name='product_name_idx'),
+            models.Index(fields=['is_active', 'name'], name='product_active_name_idx'),
+            # The other sortable product list columns, which their range filters use
+            # too; (updated_at, id) also serves incremental sync
+            models.Index(fields=['price', 'id'], name='product_price_idx'),
+            models.Index(fields=['quantity', 'id'], name='product_quantity_idx'),
+            models.Index(fields=['min_stock_level', 'id'], name='product_min_stock_idx'),
+            models.Index(fields=['created_at', 'id'], name='product_created_idx'),
+            models.Index(fields=['updated_at', 'id'], name='product_updated_idx'),
+            # Only the (few) active products at or below their minimum level
+            models.Index(
+                fields=['name', 'id'],
+                condition=models.Q(is_active=True, quantity__lte=models.F('min_stock_level')),
+                name='product_low_stock_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
+    # Quantity as last read from or written to the database, used to diff
+    # stock changes on save without re-reading the row
+    _loaded_quantity = None
+    # Whether the row was low on stock when last read or written (None if
+    # unknown), so saves that don't cross the minimum skip alert evaluation
+    _loaded_low_stock = None
+    # Version the row must still have for save() to update it: the one read,
+    # or the one a client last saw (expect_version)
+    _loaded_version = None
+    _saving_version = None
+    # Whether the last save() inserted the row rather than updating it
+    _inserted = False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'quantity' in field_names:
+            instance._loaded_quantity = instance.quantity
+            if {'min_stock_level', 'is_active'} <= set(field_names):
+                instance._loaded_low_stock = instance.needs_low_stock_alert()
+        if 'version' in field_names:
+            instance._loaded_version = instance.version
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        refreshed = set(fields) if fields is not None else {
+            field.attname for field in self._meta.concrete_fields
+        } - self.get_deferred_fields()
+        if 'quantity' in refreshed:
+            self._loaded_quantity = self.quantity
+        if 'version' in refreshed:
+            self._loaded_version = self.version
+
+    def mark_quantity_saved(self):
+        self._loaded_quantity = self.quantity
+        self._loaded_version = self.version
+        self._loaded_low_stock = self.needs_low_stock_alert()
+
+    def expect_version(self, version):
+        """Make the next save() fail with VersionConflict unless the row is still at `version`"""
+        self._loaded_version = version
+
     def save(self, *args, **kwargs):
         # Check if this is a stock adjustment request
         create_movement = kwargs.pop('create_movement', True)
         custom_reason = kwargs.pop('stock_reason', None)
 
-        # Track stock movement on quantity change (unless disabled)
-        if create_movement and self.pk:
-            try:
-                old_product = Product.objects.get(pk=self.pk)
-                if old_product.quantity != self.quantity:
-                    quantity_change = self.quantity - old_product.quantity
-                    movement_type = 'IN' if quantity_change > 0 else 'OUT'
-                    StockMovement.objects.create(
-                        product=self,
-                        quantity=abs(quantity_change),
-                        movement_type=movement_type,
-                        reason=custom_reason or 'Quantity updated via admin/form',
-                        reference=f'Stock adjustment - {self.pk}',
-                        performed_by='User'
-                    )
-            except Product.DoesNotExist:
-                pass  # New product, no movement needed
-
-        super().save(*args, **kwargs)
+        # An instance with a pk may be new or stand for an existing row
+        # whatever _state.adding says; which it was is only known once the
+        # save has run, from whether it inserted (see _do_insert)
+        original, expected_version = None, None
+        if self.pk:
+            original, expected_version = self._loaded_quantity, self._loaded_version
+            if original is None or expected_version is None:
+                # Instance was not loaded from the database, fall back to reading it
+                row = Product.objects.filter(pk=self.pk).values_list('quantity', 'version').first()
+                if row is not None:
+                    original = row[0] if original is None else original
+                    expected_version = row[1] if expected_version is None else expected_version
+
+        previous_version = self.version
+        if expected_version is not None:
+            self.version = expected_version + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        self._saving_version = expected_version
+        self._inserted = False
+
+        # Keep the stock levels in step and track the stock movement on
+        # quantity change, in the same transaction
+        try:
+            with transaction.atomic():
+                try:
+                    super().save(*args, **kwargs)
+                finally:
+                    self._saving_version = None
+                # A new product's stock is its opening stock
+                inserted = self._inserted
+                if inserted:
+                    quantity_change = self.quantity
+                else:
+                    quantity_change = self.quantity - original if original is not None else 0
+                if quantity_change:
+                    # Edits of the total are made at the default location
+                    location = Location.default()
+                    StockLevel.add_quantity(self.pk, location.pk, quantity_change)
+                    if create_movement and not inserted:
+                        StockMovement.objects.create(
+                            product=self,
+                            location=location,
+                            quantity=abs(quantity_change),
+                            movement_type='IN' if quantity_change > 0 else 'OUT',
+                            reason=custom_reason or 'Quantity updated via admin/form',
+                            reference=f'Stock adjustment - {self.pk}',
+                            performed_by='User'
+                        )
+        except (VersionConflict, InsufficientStock):
+            self.version = previous_version
+            raise
+        self.mark_quantity_saved()
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Compare-and-swap: only update the row while it is at the expected
+        # version, so a write based on stale data is refused, not applied
+        if self._saving_version is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        updated = super()._do_update(
+            base_qs.filter(version=self._saving_version), using, pk_val, values, update_fields, forced_update
+        )
+        if not updated and base_qs.filter(pk=pk_val).exists():
+            raise VersionConflict(pk_val, self._saving_version)
+        return updated
+
+    def _do_insert(self, manager, using, fields, returning_fields, raw):
+        self._inserted = True
+        return super()._do_insert(manager, using, fields, returning_fields, raw)
 
     def clean(self):
         if self.quantity < 0:
@@ -82,6 +255,9 @@ class Product(models.Model):
     def is_low_stock(self):
         return self.quantity <= self.min_stock_level
 
+    def needs_low_stock_alert(self):
+        return self.is_active and self.is_low_stock()
+
 
 class StockMovement(models.Model):
     MOVEMENT_TYPES = [
@@ -91,6 +267,10 @@ class StockMovement(models.Model):
     ]
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Where the stock moved; empty for movements recorded before locations
+    location = models.ForeignKey(
+        Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='movements'
+    )
     quantity = models.IntegerField()
     movement_type = models.CharField(max_length=3, choices=MOVEMENT_TYPES)
     reason = models.CharField(max_length=200, blank=True)
@@ -100,12 +280,424 @@ class StockMovement(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='movement_time_idx'),
+            models.Index(fields=['product', '-timestamp'], name='movement_product_time_idx'),
+            models.Index(fields=['movement_type', '-timestamp'], name='movement_type_time_idx'),
+        ]
         verbose_name = "Stock Movement"
         verbose_name_plural = "Stock Movements"
 
     def __str__(self):
         return f"{self.movement_type} {self.quantity} x {self.product.name} on {self.timestamp.date()}"
 
+    @staticmethod
+    def net_quantity():
+        """Expression for a movement's effect on stock: OUT removes, IN and ADJ add"""
+        return models.Case(
+            models.When(movement_type='OUT', then=-models.F('quantity')),
+            default=models.F('quantity'),
+            output_field=models.IntegerField(),
+        )
+
+    def save(self, *args, **kwargs):
+        # Receivers of post_save (the outbox) write in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def clean(self):
         if self.movement_type in ['OUT', 'ADJ'] and self.quantity > self.product.quantity and self.movement_type != 'ADJ':
             raise ValidationError('Cannot remove more stock than available')
+
+
+class StockLevel(models.Model):
+    """
+    Stock of a product at one location. Product.quantity is the total over
+    the product's levels and every stock write changes both in the same
+    transaction, so product lists and low-stock checks keep reading the
+    indexed total instead of adding levels up.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_levels')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='stock_levels')
+    quantity = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['product', 'location']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'location'], name='unique_stock_level'),
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name='stock_level_not_negative'),
+        ]
+        indexes = [
+            models.Index(fields=['location', 'product'], name='stock_level_location_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} at {self.location_id}"
+
+    @classmethod
+    def add_quantity(cls, product_id, location_id, delta):
+        """
+        Add `delta` to a product's stock at a location in one statement,
+        creating the level on first stock in. Raises InsufficientStock rather
+        than take the level below zero.
+        """
+        table = connection.ops.quote_name(cls._meta.db_table)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            if delta > 0:
+                cursor.execute(
+                    f'INSERT INTO {table} (product_id, location_id, quantity, updated_at) VALUES (%s, %s, %s, %s) '
+                    f'ON CONFLICT (product_id, location_id) DO UPDATE '
+                    f'SET quantity = {table}.quantity + excluded.quantity, updated_at = excluded.updated_at',
+                    [product_id, location_id, delta, now]
+                )
+                return
+            cursor.execute(
+                f'UPDATE {table} SET quantity = quantity + %s, updated_at = %s '
+                f'WHERE product_id = %s AND location_id = %s AND quantity + %s >= 0',
+                [delta, now, product_id, location_id, delta]
+            )
+            if cursor.rowcount:
+                return
+        available = cls.objects.filter(product_id=product_id, location_id=location_id).values_list(
+            'quantity', flat=True
+        ).first() or 0
+        code = Location.objects.filter(pk=location_id).values_list('code', flat=True).first()
+        raise InsufficientStock(product_id, available, f'Cannot remove more than the stock at {code} ({available})')
+
+
+class ArchivedStockMovement(models.Model):
+    """
+    Stock movements older than the hot window, moved out of the main table by
+    rotate_movement_partitions (see inventory.partitions). Same columns and
+    ids as StockMovement; read-only, and only consulted when a query's date
+    range reaches back that far. The table is created by migration 0010.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    product = models.ForeignKey(
+        Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    location = models.ForeignKey(
+        Location, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+'
+    )
+    quantity = models.IntegerField()
+    movement_type = models.CharField(max_length=3, choices=StockMovement.MOVEMENT_TYPES)
+    reason = models.CharField(max_length=200, blank=True)
+    reference = models.CharField(max_length=100, blank=True)
+    performed_by = models.CharField(max_length=100, blank=True)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'inventory_stockmovement_archive'
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='archived_movement_time_idx'),
+            models.Index(fields=['product', '-timestamp'], name='archived_movement_product_idx'),
+            models.Index(fields=['movement_type', '-timestamp'], name='archived_movement_type_idx'),
+        ]
+
+
+class MovementArchive(models.Model):
+    """
+    One month of stock movements moved out of the database into a compressed
+    file by archive_stock_movements (see inventory.cold_storage).
+    """
+    month = models.DateField(unique=True)  # First day of the month
+    path = models.CharField(max_length=255)  # Relative to MOVEMENT_ARCHIVE_DIR
+    row_count = models.PositiveIntegerField(default=0)
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"Movements of {self.month:%Y-%m} ({self.row_count})"
+
+
+class MovementArchiveBalance(models.Model):
+    """
+    Movement totals of one product in an archived month and its stock at the
+    start and end of it, carried forward so the product's stock history can
+    be followed without reading the file.
+    """
+    archive = models.ForeignKey(MovementArchive, on_delete=models.CASCADE, related_name='balances')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='archived_balances')
+    opening_quantity = models.IntegerField()
+    in_total = models.IntegerField(default=0)
+    out_total = models.IntegerField(default=0)
+    adj_total = models.IntegerField(default=0)
+    closing_quantity = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['archive', 'product'], name='unique_archive_product_balance'),
+        ]
+
+    def __str__(self):
+        return f"{self.product} in {self.archive.month:%Y-%m}: {self.closing_quantity}"
+
+
+class StockSnapshot(models.Model):
+    """Closing stock and movement totals of one product on one day"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='snapshots')
+    date = models.DateField()
+    closing_quantity = models.IntegerField()
+    in_total = models.IntegerField(default=0)
+    out_total = models.IntegerField(default=0)
+    adj_total = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='unique_product_snapshot_date'),
+        ]
+        verbose_name = "Stock Snapshot"
+        verbose_name_plural = "Stock Snapshots"
+
+    def __str__(self):
+        return f"{self.product_id} on {self.date}: {self.closing_quantity}"
+
+    @property
+    def net_change(self):
+        return self.in_total - self.out_total + self.adj_total
+
+
+class ProductForecast(models.Model):
+    """
+    Demand forecast and suggested reorder point of a product, computed from
+    its stock movement history by the compute_reorder_points command.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='forecast')
+    # Mean daily OUT quantity over the moving average window
+    moving_average = models.FloatField()
+    # Exponentially smoothed daily OUT quantity, the demand forecast
+    daily_demand = models.FloatField()
+    # Standard deviation of daily OUT quantity over the history
+    demand_std = models.FloatField()
+    lead_time_days = models.PositiveIntegerField()
+    lead_time_demand = models.FloatField()
+    safety_stock = models.PositiveIntegerField()
+    reorder_point = models.PositiveIntegerField()
+    reorder_quantity = models.PositiveIntegerField()
+    history_days = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Product Forecast"
+        verbose_name_plural = "Product Forecasts"
+
+    def __str__(self):
+        return f"{self.product_id}: reorder at {self.reorder_point}"
+
+
+class PurchaseOrder(models.Model):
+    """
+    An order of stock from a supplier. Drafts are (re)generated from the
+    products below their minimum level by inventory.purchasing; each supplier
+    has at most one draft at a time.
+    """
+    DRAFT = 'draft'
+    ORDERED = 'ordered'
+    RECEIVED = 'received'
+    CANCELLED = 'cancelled'
+    STATUSES = [
+        (DRAFT, 'Draft'),
+        (ORDERED, 'Ordered'),
+        (RECEIVED, 'Received'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='purchase_orders')
+    status = models.CharField(max_length=10, choices=STATUSES, default=DRAFT)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['supplier'], condition=models.Q(status='draft'), name='unique_draft_purchase_order',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='purchase_order_status_idx'),
+        ]
+        verbose_name = "Purchase Order"
+        verbose_name_plural = "Purchase Orders"
+
+    def __str__(self):
+        return f"PO-{self.pk} {self.supplier_id} ({self.status})"
+
+    @property
+    def reference(self):
+        return f'PO-{self.pk:06d}'
+
+
+class PurchaseOrderLine(models.Model):
+    order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='purchase_order_lines')
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Stock situation the quantity was suggested from
+    quantity_on_hand = models.IntegerField()
+    min_stock_level = models.IntegerField()
+    target_level = models.IntegerField()
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='unique_purchase_order_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id}"
+
+
+class LowStockAlert(models.Model):
+    """
+    A period during which an active product was at or below its minimum stock
+    level. Opened and cleared by inventory.alerts as stock and thresholds
+    change, so the current alerts can be listed without scanning products.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='low_stock_alerts')
+    # Stock level and threshold when the alert was triggered
+    quantity = models.IntegerField()
+    min_stock_level = models.IntegerField()
+    triggered_at = models.DateTimeField(default=timezone.now)
+    cleared_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-triggered_at', '-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product'], condition=models.Q(cleared_at__isnull=True),
+                name='unique_open_low_stock_alert',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['-triggered_at', '-id'], name='low_stock_alert_time_idx'),
+            # Listing open alerts reads only the open ones, however long the history
+            models.Index(
+                fields=['-triggered_at', '-id'], condition=models.Q(cleared_at__isnull=True),
+                name='low_stock_alert_open_idx',
+            ),
+        ]
+        verbose_name = "Low Stock Alert"
+        verbose_name_plural = "Low Stock Alerts"
+
+    def __str__(self):
+        return f"{self.product_id} low since {self.triggered_at}"
+
+    @property
+    def is_open(self):
+        return self.cleared_at is None
+
+
+class LowStockAlertEvent(models.Model):
+    """Append-only log of alerts being triggered and cleared, read by the alert feed"""
+    TRIGGERED = 'triggered'
+    CLEARED = 'cleared'
+    EVENT_TYPES = [
+        (TRIGGERED, 'Triggered'),
+        (CLEARED, 'Cleared'),
+    ]
+
+    alert = models.ForeignKey(LowStockAlert, on_delete=models.CASCADE, related_name='events')
+    event_type = models.CharField(max_length=9, choices=EVENT_TYPES)
+    # Stock level and threshold when the event happened
+    quantity = models.IntegerField()
+    min_stock_level = models.IntegerField()
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # The id is the feed cursor (see inventory.cursors)
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Alert {self.alert_id} {self.event_type} at {self.timestamp}"
+
+
+class Tombstone(models.Model):
+    """A deleted product, category or supplier, reported to clients by the sync endpoint"""
+    PRODUCT = 'product'
+    CATEGORY = 'category'
+    SUPPLIER = 'supplier'
+    MODEL_NAMES = [
+        (PRODUCT, 'Product'),
+        (CATEGORY, 'Category'),
+        (SUPPLIER, 'Supplier'),
+    ]
+
+    model_name = models.CharField(max_length=8, choices=MODEL_NAMES)
+    object_id = models.BigIntegerField()
+    # SKU or name, for systems that do not keep our ids
+    key = models.CharField(max_length=100, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            # Sync reads tombstones in (deleted_at, id) order from a watermark
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name} {self.object_id} deleted at {self.deleted_at}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A stock change for downstream systems, written in the same transaction as
+    the change itself and delivered by the publish_outbox command (see
+    inventory.outbox).
+    """
+    MOVEMENT = 'stock.movement'
+    TOPICS = [
+        (MOVEMENT, 'Stock movement'),
+    ]
+
+    topic = models.CharField(max_length=50, choices=TOPICS)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+    published_at = models.DateTimeField(null=True, blank=True)
+    # Failed deliveries so far, and the error of the last one
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        # Events are published in insertion order
+        ordering = ['id']
+        indexes = [
+            # The publisher reads only pending events, however many were published
+            models.Index(fields=['id'], condition=models.Q(published_at__isnull=True), name='outbox_pending_idx'),
+            models.Index(fields=['published_at'], name='outbox_published_idx'),
+        ]
+        verbose_name = "Outbox Event"
+        verbose_name_plural = "Outbox Events"
+
+    def __str__(self):
+        return f"{self.topic} {self.pk} ({'published' if self.published_at else 'pending'})"
+
+
+class ProductSearchEntry(models.Model):
+    """
+    Read-only view of the SQLite FTS5 index over product name, sku and
+    description (created by migration 0005 and kept in sync by triggers).
+    Lets searches join to the index and rank in a single query.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', related_name='search_entry'
+    )
+    document = FullTextField(db_column=FTS_TABLE)
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = FTS_TABLE
@@ -0,0 +1,207 @@
+"""
+Transactional outbox of stock changes for downstream systems.
+
+Every StockMovement gets an OutboxEvent written in the same transaction:
+by the post_save receiver below for movements saved one at a time, and by
+record_movements() from the bulk paths (bulk_adjust_stock, the product
+importer), as bulk_create sends no signals. A change is therefore published
+if and only if it was committed.
+
+The publish_outbox command drains pending events in id order, a batch at a
+time, to a sink (OUTBOX_SINK): an NDJSON file, a webhook or an in-memory
+queue. A batch is marked published only once the sink has accepted it, so
+delivery is at least once: after a crash or a failed batch the events are
+sent again, and consumers deduplicate by event id. A failed batch is
+retried with exponential backoff before anything after it is sent, keeping
+events in order. Published events are deleted after OUTBOX_RETENTION_DAYS.
+"""
+import json
+import os
+import queue
+import random
+import urllib.error
+import urllib.request
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import OutboxEvent, Product, StockMovement
+
+
+class PublishError(Exception):
+    pass
+
+
+def movement_payload(movement, sku):
+    return {
+        'id': movement.pk,
+        'product': movement.product_id,
+        'sku': sku,
+        'location': movement.location_id,
+        'quantity': movement.quantity,
+        'movement_type': movement.movement_type,
+        'net_quantity': -movement.quantity if movement.movement_type == 'OUT' else movement.quantity,
+        'reason': movement.reason,
+        'reference': movement.reference,
+        'performed_by': movement.performed_by,
+        'timestamp': movement.timestamp.isoformat(),
+    }
+
+
+def record_movements(movements, batch_size=500):
+    """Add an outbox event for each of `movements`; call inside the transaction that saved them"""
+    if not movements:
+        return
+    product_field = StockMovement._meta.get_field('product')
+    skus = {
+        movement.product_id: movement.product.sku
+        for movement in movements if product_field.is_cached(movement)
+    }
+    missing = {movement.product_id for movement in movements} - skus.keys()
+    if missing:
+        skus.update(Product.objects.filter(pk__in=missing).values_list('pk', 'sku'))
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(topic=OutboxEvent.MOVEMENT, payload=movement_payload(movement, skus.get(movement.product_id)))
+        for movement in movements
+    ], batch_size=batch_size)
+
+
+@receiver(post_save, sender=StockMovement)
+def movement_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_movements([instance])
+
+
+def envelope(event):
+    """What sinks receive for an event; `id` is the key consumers deduplicate by"""
+    return {
+        'id': event.pk,
+        'topic': event.topic,
+        'created_at': event.created_at.isoformat(),
+        'data': event.payload,
+    }
+
+
+class FileSink:
+    """Appends events as NDJSON lines, synced to disk before the batch counts as published"""
+
+    def __init__(self, path=None):
+        self.path = Path(path or settings.OUTBOX_FILE)
+
+    def publish(self, events):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as file:
+            for event in events:
+                file.write(json.dumps(event, separators=(',', ':')) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class WebhookSink:
+    """POSTs each batch as {"events": [...]}; any 2xx response accepts it"""
+
+    def __init__(self, url=None, timeout=None):
+        self.url = url or settings.OUTBOX_WEBHOOK_URL
+        self.timeout = timeout or settings.OUTBOX_WEBHOOK_TIMEOUT
+        if not self.url:
+            raise ValueError('OUTBOX_WEBHOOK_URL is not set')
+
+    def publish(self, events):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({'events': events}, separators=(',', ':')).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            raise PublishError(f'Webhook responded {e.code}')
+        except (urllib.error.URLError, OSError) as e:
+            raise PublishError(f'Webhook unreachable: {e}')
+
+
+memory_queue = queue.SimpleQueue()
+
+
+class MemorySink:
+    """Puts events on an in-memory queue (the module's memory_queue by default), for tests"""
+
+    def __init__(self, queue=None):
+        self.queue = memory_queue if queue is None else queue
+
+    def publish(self, events):
+        for event in events:
+            self.queue.put(event)
+
+
+SINKS = {
+    'file': FileSink,
+    'webhook': WebhookSink,
+    'memory': MemorySink,
+}
+
+
+def get_sink(name=None):
+    name = name or settings.OUTBOX_SINK
+    if name not in SINKS:
+        raise ValueError(f'Unknown outbox sink "{name}", choose from {", ".join(SINKS)}')
+    return SINKS[name]()
+
+
+def publish_batch(sink, batch_size=None):
+    """
+    Send the oldest pending events to `sink` and mark them published.
+    Returns how many were sent; raises PublishError, recording the failure
+    on the events, if the sink did not accept them.
+    """
+    events = list(
+        OutboxEvent.objects.filter(published_at__isnull=True).order_by('id')[:batch_size or settings.OUTBOX_BATCH_SIZE]
+    )
+    if not events:
+        return 0
+    ids = [event.pk for event in events]
+    try:
+        sink.publish([envelope(event) for event in events])
+    except (PublishError, OSError) as e:
+        OutboxEvent.objects.filter(pk__in=ids).update(attempts=F('attempts') + 1, last_error=str(e)[:1000])
+        raise PublishError(f'Could not publish events {ids[0]}-{ids[-1]}: {e}') from e
+    OutboxEvent.objects.filter(pk__in=ids).update(published_at=timezone.now())
+    return len(events)
+
+
+def drain(sink, batch_size=None):
+    """Publish batches until no events are pending; returns the number published"""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    published = 0
+    while True:
+        sent = publish_batch(sink, batch_size)
+        published += sent
+        if sent < batch_size:
+            return published
+
+
+def backoff(failures):
+    """Seconds to wait after `failures` consecutive failed deliveries, with jitter"""
+    delay = min(settings.OUTBOX_BACKOFF_MAX, settings.OUTBOX_BACKOFF_BASE * 2 ** (failures - 1))
+    return delay * random.uniform(0.5, 1)
+
+
+def purge_published(days=None, batch_size=10000):
+    """Delete events published more than `days` ago; returns the number deleted"""
+    cutoff = timezone.now() - timedelta(days=settings.OUTBOX_RETENTION_DAYS if days is None else days)
+    rows = OutboxEvent.objects.filter(published_at__lt=cutoff).order_by('published_at')
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(rows.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
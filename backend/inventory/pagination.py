@@ -0,0 +1,383 @@
+import base64
+import binascii
+import datetime
+import decimal
+import heapq
+import json
+import operator
+from functools import cmp_to_key, reduce
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite key such as (timestamp, id).
+
+    Unlike OFFSET paging, each page is fetched with a WHERE clause that seeks
+    past the last row of the previous page, so the cost of a page does not
+    depend on how deep the client has scrolled, and rows inserted while a
+    client is paging never shift the pages it has not read yet. The last
+    ordering field must be unique (normally `id`) to make the order total.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    page_bound = None
+    ordering_query_param = 'ordering'
+    # Orderings clients may pick with ?ordering=<name> or -<name>: name -> key
+    # fields. `id` is appended unless the last field is unique already; each
+    # should be backed by an index starting with the same fields.
+    ordering_fields = {}
+    # When set, ?count=true adds the total `count` of rows to the response,
+    # exact up to this many and estimated beyond (see get_count). Clients
+    # need it once, with the first page, rather than with every page.
+    count_limit = None
+    count_query_param = 'count'
+    count = None
+    count_is_estimate = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_count(request):
+            self.count, self.count_is_estimate = self.get_count(queryset)
+        queryset = self.page_queryset(queryset, request, view)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views, fetching the page with the async ORM"""
+        if self.wants_count(request):
+            self.count, self.count_is_estimate = await sync_to_async(self.get_count)(queryset)
+        queryset = self.page_queryset(queryset, request, view)
+        return self.set_page([instance async for instance in queryset])
+
+    def wants_count(self, request):
+        return bool(self.count_limit) and request.query_params.get(self.count_query_param) in ('1', 'true')
+
+    def get_count(self, queryset):
+        """
+        (count, is_estimate) for `queryset`. Counting stops after count_limit
+        rows, so a broad filter over a large table costs no more than that;
+        past it PostgreSQL's planner estimate is used, and other databases
+        report count_limit as a lower bound.
+        """
+        rows = queryset.order_by().values('pk')
+        count = rows[:self.count_limit + 1].count()
+        if count <= self.count_limit:
+            return count, False
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return self.count_limit, True
+        sql, params = rows.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return max(int(plan[0]['Plan']['Plan Rows']), count), True
+
+    def paginate_sources(self, sources, request, view=None):
+        """
+        Page through the union of several sources of rows sharing the same key
+        fields, e.g. a table and its archives. The first source must be a
+        queryset; others may also be objects with a page(paginator) method
+        returning their rows for the page (see page_rows). Each contributes at
+        most a page of rows past the cursor and the page is cut from their merge.
+        """
+        self.page_bound = None
+        rows = []
+        for source in sources:
+            rows = self.add_page(rows, self.page_source(source, request, view))
+        return self.set_page(rows)
+
+    async def apaginate_sources(self, sources, request, view=None):
+        self.page_bound = None
+        rows = []
+        for source in sources:
+            if isinstance(source, QuerySet):
+                page = [instance async for instance in self.page_queryset(source, request, view)]
+            else:
+                page = await sync_to_async(source.page)(self)
+            rows = self.add_page(rows, page)
+        return self.set_page(rows)
+
+    def add_page(self, rows, page):
+        """
+        Merge a source's page into the rows so far. Once they fill the page,
+        page_bound holds the key values of the last row: rows of later sources
+        that come after it cannot make it onto the page, so sources may skip them.
+        """
+        rows = self.merge([rows, page])
+        if len(rows) > self.page_size:
+            self.page_bound = self.row_values(rows[-1])
+        return rows
+
+    def page_source(self, source, request, view=None):
+        if isinstance(source, QuerySet):
+            return list(self.page_queryset(source, request, view))
+        return source.page(self)
+
+    def page_rows(self, rows, values=None):
+        """
+        page_queryset for rows filtered in Python, such as rows read from
+        files: the first page_size + 1 of `rows` past the cursor, in page
+        order. `values` returns a row's key values as a tuple (by default
+        from its attributes). Uses the cursor decoded by page_queryset.
+        """
+        values = values or self.row_values
+        directions = {descending for _, descending in self.seek_keys}
+        if len(directions) == 1:
+            # All keys sort the same way: plain tuple comparisons will do
+            descending = directions.pop()
+            if self.cursor_values is not None:
+                cursor = tuple(self.cursor_values)
+                rows = (row for row in rows if (values(row) < cursor if descending else values(row) > cursor))
+            select = heapq.nlargest if descending else heapq.nsmallest
+            return select(self.page_size + 1, rows, key=values)
+
+        if self.cursor_values is not None:
+            rows = (row for row in rows if self.compare(values(row), self.cursor_values) > 0)
+        return heapq.nsmallest(
+            self.page_size + 1, rows, key=cmp_to_key(lambda a, b: self.compare(values(a), values(b)))
+        )
+
+    def merge(self, pages):
+        """Rows of all pages in page order (keys reversed for a previous page)"""
+        return sorted((row for page in pages for row in page), key=self.sort_key)[:self.page_size + 1]
+
+    def row_values(self, row):
+        return tuple(self.get_value(row, field) for field, _ in self.seek_keys)
+
+    def compare(self, values, other):
+        """Negative when key `values` come before `other` in page order, positive after"""
+        for (_, descending), value, other_value in zip(self.seek_keys, values, other):
+            if value != other_value:
+                after = value < other_value if descending else value > other_value
+                return 1 if after else -1
+        return 0
+
+    @property
+    def sort_key(self):
+        return cmp_to_key(lambda a, b: self.compare(self.row_values(a), self.row_values(b)))
+
+    def page_queryset(self, queryset, request, view=None):
+        """The queryset for the requested page, plus one row to tell if there are more"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_ordering(request, queryset, view)
+
+        values, reverse = self.decode_cursor(request, queryset)
+        self.has_cursor = values is not None
+        self.reverse = reverse
+
+        keys = [(field, not descending) for field, descending in self.keys] if reverse else self.keys
+        self.seek_keys, self.cursor_values = keys, values
+        queryset = queryset.order_by(*[('-' if descending else '') + field for field, descending in keys])
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(keys, values))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        self.has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """Return the ordering as a list of (field, descending) pairs"""
+        requested = request.query_params.get(self.ordering_query_param, '')
+        if requested.lstrip('-') in self.ordering_fields:
+            fields = list(self.ordering_fields[requested.lstrip('-')])
+            last = self.get_model_field(queryset.model, fields[-1])
+            if last is None or not (last.unique or last.primary_key):
+                fields.append('id')
+            return [(field, requested.startswith('-')) for field in fields]
+
+        ordering = self.ordering
+        if 'search_rank' in queryset.query.annotations:
+            # Ranked search results: best match first, id as the tie-breaker
+            ordering = ('-search_rank', 'id')
+        return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+    def seek_filter(self, keys, values):
+        """
+        Build the row-value comparison `(k1, k2, ...) > (v1, v2, ...)`, honouring
+        per-field direction, as an OR of prefixes. The leading bound on the first
+        key is repeated on its own so that an index on it can drive the scan.
+        """
+        def after(field, descending, value):
+            return Q(**{f'{field}__{"lt" if descending else "gt"}': value})
+
+        clauses = []
+        for position, (field, descending) in enumerate(keys):
+            equal = Q(**{key: value for (key, _), value in zip(keys[:position], values)})
+            clauses.append(equal & after(field, descending, values[position]))
+
+        first, descending = keys[0]
+        leading = Q(**{f'{first}__{"lte" if descending else "gte"}': values[0]})
+        return leading & reduce(operator.or_, clauses)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        paginated = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.count is not None:
+            paginated.update(count=self.count, count_is_estimate=self.count_is_estimate)
+        paginated['results'] = data
+        return paginated
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'count_is_estimate': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        has_next = self.has_cursor if self.reverse else self.has_more
+        if not has_next or not self.page:
+            return None
+        return self.build_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        has_previous = self.has_more if self.reverse else self.has_cursor
+        if not has_previous or not self.page:
+            return None
+        return self.build_link(self.page[0], reverse=True)
+
+    def build_link(self, instance, reverse):
+        values = [self.get_value(instance, field) for field, _ in self.keys]
+        payload = {'v': values}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, default=self.encode_value, separators=(',', ':')).encode()
+        ).decode()
+        # Further pages keep the filters and ordering but are not counted again
+        url = remove_query_param(self.base_url, self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            raw_values = payload['v']
+            if len(raw_values) != len(self.keys):
+                raise ValueError
+            values = [
+                self.parse_value(queryset.model, field, value)
+                for (field, _), value in zip(self.keys, raw_values)
+            ]
+        except (TypeError, KeyError, ValueError, ValidationError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, bool(payload.get('r'))
+
+    @staticmethod
+    def get_value(instance, field):
+        for attr in field.split('__'):
+            instance = getattr(instance, attr)
+        return instance
+
+    @staticmethod
+    def encode_value(value):
+        # Full precision on purpose: DjangoJSONEncoder truncates microseconds,
+        # which would let rows sharing a millisecond slip between pages.
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+    @staticmethod
+    def get_model_field(model, field):
+        """The model field a `field` path such as category__name refers to, None for annotations"""
+        parts = field.split('__')
+        try:
+            for part in parts[:-1]:
+                model = model._meta.get_field(part).related_model
+            return model._meta.get_field(parts[-1])
+        except (FieldDoesNotExist, AttributeError):
+            return None
+
+    @classmethod
+    def parse_value(cls, model, field, value):
+        """Convert a JSON cursor value back into the python type of `field`"""
+        model_field = cls.get_model_field(model, field)
+        if model_field is None:
+            return value  # annotation, compared as-is
+        return model_field.to_python(value)
+
+    def to_html(self):
+        return ''
+
+
+class NamePagination(KeysetPagination):
+    ordering = ('name', 'id')
+
+
+class ProductPagination(NamePagination):
+    """Products by name, or by any column of the product list (see the product indexes)"""
+    ordering_fields = {
+        'name': ('name',),
+        'sku': ('sku',),
+        'price': ('price',),
+        'quantity': ('quantity',),
+        'min_stock_level': ('min_stock_level',),
+        'category_name': ('category__name', 'name'),
+        'supplier_name': ('supplier__name', 'name'),
+        'is_active': ('is_active', 'name'),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+    }
+    count_limit = 10000
+
+
+class LookupPagination(NamePagination):
+    """Categories and suppliers are small lookup tables loaded whole by forms"""
+    page_size = 500
+    max_page_size = 1000
+
+
+class StockMovementPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+
+
+class LowStockAlertPagination(KeysetPagination):
+    ordering = ('-triggered_at', '-id')
+
+
+class PurchaseOrderPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,244 @@
+"""
+Time-based storage of stock movements.
+
+Movements are append-only and are almost always read by recent time range,
+so only the last MOVEMENT_HOT_MONTHS months stay in the main ("hot")
+table; older months move to the archive table (ArchivedStockMovement),
+which the API only reads when a date filter reaches back that far.
+
+On PostgreSQL both tables are partitioned by month (migration 0010 converts
+the existing table). Each month is a partition named
+inventory_stockmovement_pYYYY_MM, and rows outside every partition land in
+a default partition. Rotating creates the partitions for the coming months
+and moves old months to the archive by detaching them from the hot table
+and attaching them to the archive one. Only catalog entries change; no rows
+are copied. Queries with a timestamp bound skip the other months entirely.
+
+A partitioned table's primary key has to include the partition key, so on
+PostgreSQL it is (id, timestamp) and the database cannot enforce a unique
+id across the table. Everything that treats a movement id as unique (the
+ORM, event ids, keyset pagination, the archive) relies instead on the id
+sequence being the only source of ids: rows are never inserted with an
+explicit id, except when rotation carries a row to the archive and deletes
+it from the hot table in the same transaction. Each partition also gets a
+unique index on id (id_unique_index_sql(), migration 0017), which catches
+a duplicate within a month.
+
+SQLite has no partitioning, so rotation copies old rows into the archive
+table and deletes them from the hot one in batches.
+
+Months are only archived once rollup_stock_snapshots has covered them, so
+stock_at() and the forecasts, which start from snapshots, never need the
+archived rows.
+"""
+import re
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .filters import start_of_day
+from .models import ArchivedStockMovement, StockMovement, StockSnapshot
+
+
+HOT_TABLE = StockMovement._meta.db_table
+ARCHIVE_TABLE = ArchivedStockMovement._meta.db_table
+PARTITION_NAME = re.compile(rf'^{HOT_TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{HOT_TABLE}_p{month:%Y_%m}'
+
+
+def default_partition_name(parent):
+    return f'{parent}_default'
+
+
+def month_bounds(month):
+    return start_of_day(month), start_of_day(add_months(month, 1))
+
+
+def hot_cutoff(today=None, hot_months=None):
+    """First month kept in the hot table"""
+    hot_months = hot_months or settings.MOVEMENT_HOT_MONTHS
+    return add_months(month_start(today or timezone.localdate()), 1 - hot_months)
+
+
+def latest_archived():
+    """Timestamp of the newest archived movement, None if nothing is archived"""
+    return ArchivedStockMovement.objects.aggregate(latest=Max('timestamp'))['latest']
+
+
+def is_partitioned(table=HOT_TABLE):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s',
+            [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_months(parent):
+    """Months that have a partition under `parent` (PostgreSQL), oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = %s',
+            [parent]
+        )
+        names = [name for name, in cursor.fetchall()]
+    return sorted(
+        date(int(match[1]), int(match[2]), 1)
+        for match in map(PARTITION_NAME.match, names) if match
+    )
+
+
+def id_unique_index_sql(partition):
+    """Unique index on the id of one partition, the closest PostgreSQL gets to a unique id"""
+    qn = connection.ops.quote_name
+    return f'CREATE UNIQUE INDEX IF NOT EXISTS {qn(f"{partition}_id_uniq")} ON {qn(partition)} (id)'
+
+
+def create_partition(cursor, parent, month):
+    """
+    Add the partition for `month` under `parent`. Rows of that month that
+    already landed in the default partition are moved into it first, since
+    attaching fails while the default partition still holds any.
+    """
+    qn = connection.ops.quote_name
+    name, default = qn(partition_name(month)), qn(default_partition_name(parent))
+    start, end = month_bounds(month)
+    cursor.execute(f'CREATE TABLE {name} (LIKE {qn(parent)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(id_unique_index_sql(partition_name(month)))
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {default} WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved',
+        [start, end]
+    )
+    cursor.execute(f'ALTER TABLE {qn(parent)} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', [start, end])
+
+
+def ensure_partitions(ahead=None, today=None):
+    """Create the hot partitions from this month to `ahead` months out; returns the months created"""
+    if not is_partitioned():
+        return []
+    ahead = settings.MOVEMENT_PARTITIONS_AHEAD if ahead is None else ahead
+    this_month = month_start(today or timezone.localdate())
+    existing = set(partition_months(HOT_TABLE))
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(ahead + 1):
+            month = add_months(this_month, offset)
+            if month not in existing:
+                create_partition(cursor, HOT_TABLE, month)
+                created.append(month)
+    return created
+
+
+def drop_partition(parent, month):
+    """Detach and drop the `month` partition of `parent`, if it has one (PostgreSQL); returns whether it did"""
+    if not is_partitioned(parent) or month not in partition_months(parent):
+        return False
+    qn = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {qn(parent)} DETACH PARTITION {qn(partition_name(month))}')
+        cursor.execute(f'DROP TABLE {qn(partition_name(month))}')
+    return True
+
+
+def archivable_cutoff(cutoff):
+    """
+    Archive boundary no later than `cutoff`, held back to the first month not
+    fully covered by stock snapshots, or None when nothing has been rolled up.
+    """
+    rolled_up = StockSnapshot.objects.aggregate(last=Max('date'))['last']
+    if rolled_up is None:
+        return None
+    return min(cutoff, month_start(rolled_up + timedelta(days=1)))
+
+
+def archive_before(cutoff, batch_size=10000):
+    """Move every movement older than the `cutoff` month to the archive; returns the rows moved"""
+    start, _ = month_bounds(cutoff)
+    if is_partitioned():
+        return archive_partitions_before(cutoff, start)
+
+    moved = 0
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(field.column) for field in StockMovement._meta.concrete_fields)
+    while True:
+        with transaction.atomic():
+            ids = list(
+                StockMovement.objects.filter(timestamp__lt=start)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return moved
+            placeholders = ', '.join(['%s'] * len(ids))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {qn(ARCHIVE_TABLE)} ({columns}) '
+                    f'SELECT {columns} FROM {qn(HOT_TABLE)} WHERE id IN ({placeholders})',
+                    ids
+                )
+            StockMovement.objects.filter(id__in=ids)._raw_delete(connection.alias)
+            moved += len(ids)
+
+
+def archive_partitions_before(cutoff, start):
+    qn = connection.ops.quote_name
+    moved = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for month in partition_months(HOT_TABLE):
+            if month >= cutoff:
+                break
+            name = qn(partition_name(month))
+            cursor.execute(f'SELECT count(*) FROM {name}')
+            moved += cursor.fetchone()[0]
+            month_from, month_to = month_bounds(month)
+            cursor.execute(f'ALTER TABLE {qn(HOT_TABLE)} DETACH PARTITION {name}')
+            # The archive has no product foreign key, like ArchivedStockMovement
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+                [partition_name(month)]
+            )
+            for constraint, in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE {name} DROP CONSTRAINT {qn(constraint)}')
+            cursor.execute(
+                f'ALTER TABLE {qn(ARCHIVE_TABLE)} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)',
+                [month_from, month_to]
+            )
+        # Stragglers outside every monthly partition
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {qn(default_partition_name(HOT_TABLE))} '
+            f'WHERE "timestamp" < %s RETURNING *) INSERT INTO {qn(ARCHIVE_TABLE)} SELECT * FROM moved',
+            [start]
+        )
+        moved += cursor.rowcount
+    return moved
+
+
+def rotate(ahead=None, hot_months=None, today=None, batch_size=10000):
+    """
+    Create upcoming partitions and archive the months before the hot window.
+    Returns (partitions created, archive cutoff month or None, rows moved).
+    """
+    created = ensure_partitions(ahead, today)
+    cutoff = archivable_cutoff(hot_cutoff(today, hot_months))
+    if cutoff is None:
+        return created, None, 0
+    return created, cutoff, archive_before(cutoff, batch_size)
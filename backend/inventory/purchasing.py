@@ -0,0 +1,141 @@
+"""
+Purchase order suggestions.
+
+Every active product at or below its minimum stock level is topped up to a
+target level: its forecast reorder point plus reorder quantity when
+compute_reorder_points has run, otherwise PURCHASE_TARGET_FACTOR times its
+minimum level, and always above the minimum. Stock already on order (lines
+of ORDERED purchase orders) counts towards the target. The suggestions for
+the whole catalogue come from one query driven by the low-stock index, and
+are written as one draft purchase order per supplier.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import stock
+from .alerts import LOW_STOCK
+from .models import Product, PurchaseOrder, PurchaseOrderLine
+
+
+def on_order():
+    """Quantity of a product on purchase orders that are placed but not received"""
+    lines = PurchaseOrderLine.objects.filter(
+        product=OuterRef('pk'), order__status=PurchaseOrder.ORDERED
+    ).order_by().values('product').annotate(total=Sum('quantity')).values('total')[:1]
+    return Coalesce(Subquery(lines, output_field=IntegerField()), Value(0))
+
+
+def suggestions(supplier_id=None):
+    """
+    Products to reorder with their suggested quantities, ordered by supplier
+    and name, as dicts. A single query however many products and suppliers.
+    """
+    fallback = F('min_stock_level') * settings.PURCHASE_TARGET_FACTOR
+    products = Product.objects.filter(LOW_STOCK)
+    if supplier_id is not None:
+        products = products.filter(supplier_id=supplier_id)
+    return (
+        products.annotate(
+            on_order=on_order(),
+            target_level=Greatest(
+                Coalesce(F('forecast__reorder_point') + F('forecast__reorder_quantity'), fallback),
+                F('min_stock_level') + 1,
+            ),
+        )
+        .annotate(suggested_quantity=F('target_level') - F('quantity') - F('on_order'))
+        .filter(suggested_quantity__gt=0)
+        .order_by('supplier_id', 'name', 'id')
+        .values(
+            'id', 'sku', 'name', 'supplier_id', 'price', 'quantity', 'min_stock_level',
+            'on_order', 'target_level', 'suggested_quantity',
+        )
+    )
+
+
+def generate_drafts(supplier_id=None):
+    """
+    Replace the draft purchase order of every supplier (or just one) with the
+    current suggestions: drafts are created or have their lines rewritten,
+    and drafts of suppliers with nothing left to order are deleted. Returns
+    {supplier id: draft order}.
+    """
+    by_supplier = {}
+    for row in suggestions(supplier_id):
+        by_supplier.setdefault(row['supplier_id'], []).append(row)
+
+    with transaction.atomic():
+        drafts = PurchaseOrder.objects.select_for_update().filter(status=PurchaseOrder.DRAFT)
+        if supplier_id is not None:
+            drafts = drafts.filter(supplier_id=supplier_id)
+        existing = {order.supplier_id: order for order in drafts}
+
+        stale = [order.pk for pk, order in existing.items() if pk not in by_supplier]
+        PurchaseOrder.objects.filter(pk__in=stale).delete()
+        created = PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(supplier_id=pk, notes='Generated from low stock levels')
+            for pk in by_supplier if pk not in existing
+        ])
+        orders = {pk: order for pk, order in existing.items() if pk in by_supplier}
+        orders.update((order.supplier_id, order) for order in created)
+
+        PurchaseOrderLine.objects.filter(order__in=[order.pk for order in existing.values()]).delete()
+        PurchaseOrderLine.objects.bulk_create([
+            PurchaseOrderLine(
+                order=orders[pk],
+                product_id=row['id'],
+                quantity=row['suggested_quantity'],
+                unit_price=row['price'],
+                quantity_on_hand=row['quantity'],
+                min_stock_level=row['min_stock_level'],
+                target_level=row['target_level'],
+            )
+            for pk, rows in by_supplier.items()
+            for row in rows
+        ], batch_size=1000)
+        PurchaseOrder.objects.filter(pk__in=[order.pk for order in orders.values()]).update(
+            updated_at=timezone.now()
+        )
+    return orders
+
+
+TRANSITIONS = {
+    PurchaseOrder.DRAFT: {PurchaseOrder.ORDERED, PurchaseOrder.CANCELLED},
+    PurchaseOrder.ORDERED: {PurchaseOrder.RECEIVED, PurchaseOrder.CANCELLED},
+}
+
+
+def change_status(order, status, performed_by='Purchasing'):
+    """
+    Move an order to `status`. Receiving books every line into stock as IN
+    movements referencing the order. Raises ValueError for a transition that
+    is not allowed, or when a line cannot be booked; nothing is changed then.
+    """
+    if status not in TRANSITIONS.get(order.status, ()):
+        raise ValueError(f'Cannot change a {order.status} purchase order to {status}')
+
+    with transaction.atomic():
+        # Lock the order and re-check, so it cannot be received twice
+        locked = PurchaseOrder.objects.select_for_update().get(pk=order.pk)
+        if status not in TRANSITIONS.get(locked.status, ()):
+            raise ValueError(f'Cannot change a {locked.status} purchase order to {status}')
+        if status == PurchaseOrder.RECEIVED:
+            lines = [
+                {
+                    'line': index, 'id': product_id, 'delta': quantity,
+                    'reason': 'Purchase order received', 'reference': order.reference,
+                }
+                for index, (product_id, quantity) in enumerate(order.lines.values_list('product_id', 'quantity'))
+            ]
+            applied, results = stock.bulk_adjust_stock(lines, performed_by=performed_by)
+            if lines and not applied:
+                errors = '; '.join(
+                    f'line {result["line"] + 1} (product {result["id"]}): {result["error"]}'
+                    for result in results if result['status'] == 'error'
+                )
+                raise ValueError(f'Cannot receive purchase order {order.reference}: {errors}')
+        order.status = status
+        order.save(update_fields=['status', 'updated_at'])
+    return order
@@ -0,0 +1,161 @@
+import re
+
+from django.db import connection, connections, models
+from django.db.models import Case, F, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Upper
+from rest_framework import filters
+
+
+FTS_TABLE = 'inventory_product_fts'
+
+# bm25 has to score every match, and a two-letter typeahead prefix can match
+# most of the catalogue; SQLite therefore ranks only the newest matches and
+# returns the older ones after them, unranked
+SQLITE_MAX_CANDIDATES = 1000
+
+
+# Keep the FTS5 table in step with inventory_product (see migration 0005)
+SQLITE_TRIGGERS = {
+    'inventory_product_fts_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS inventory_product_fts_insert AFTER INSERT ON inventory_product BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name, sku, description)
+            VALUES (new.id, new.name, new.sku, new.description);
+        END
+    ''',
+    'inventory_product_fts_delete': f'''
+        CREATE TRIGGER IF NOT EXISTS inventory_product_fts_delete AFTER DELETE ON inventory_product BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description)
+            VALUES ('delete', old.id, old.name, old.sku, old.description);
+        END
+    ''',
+    'inventory_product_fts_update': f'''
+        CREATE TRIGGER IF NOT EXISTS inventory_product_fts_update
+        AFTER UPDATE OF name, sku, description ON inventory_product BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description)
+            VALUES ('delete', old.id, old.name, old.sku, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, name, sku, description)
+            VALUES (new.id, new.name, new.sku, new.description);
+        END
+    ''',
+}
+
+
+def restore_sqlite_triggers(using='default', **kwargs):
+    """
+    post_migrate handler. SQLite drops a table's triggers whenever a migration
+    rebuilds it, as most field changes on inventory_product do, which would
+    leave the search index silently stale. Recreate any missing trigger and
+    rebuild the index from the table.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite' or FTS_TABLE not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'inventory_product'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if existing >= set(SQLITE_TRIGGERS):
+            return
+        for name, sql in SQLITE_TRIGGERS.items():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+class FullTextField(models.TextField):
+    """The hidden FTS5 column named after its table, which MATCH queries target"""
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def search_tokens(terms):
+    """Split search terms into word tokens that are safe to embed in FTS syntax"""
+    return [token.lower() for term in terms for token in re.findall(r'\w+', term)]
+
+
+def search_vector():
+    """The document indexed by product_search_idx; queries must use the same expression"""
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector('name', 'sku', 'description', config='simple')
+
+
+def sku_upper():
+    return Upper('sku')
+
+
+def fts5_available():
+    """Whether the FTS5 table exists, remembered per connection"""
+    available = getattr(connection, '_product_fts5_available', None)
+    if available is None:
+        available = FTS_TABLE in connection.introspection.table_names()
+        connection._product_fts5_available = available
+    return available
+
+
+def search_postgresql(queryset, tokens, raw_terms):
+    from django.contrib.postgres.lookups import TrigramSimilar
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+
+    # Every token must match, the last one as a prefix for typeahead
+    query = SearchQuery(
+        ' & '.join(f'{token}:*' if index == len(tokens) - 1 else token for index, token in enumerate(tokens)),
+        search_type='raw', config='simple'
+    )
+    sku_term = ' '.join(raw_terms).upper()
+    return queryset.alias(search_document=search_vector()).annotate(
+        search_rank=SearchRank(search_vector(), query) + TrigramSimilarity(sku_upper(), sku_term),
+    ).filter(
+        Q(search_document=query) | TrigramSimilar(sku_upper(), sku_term)
+    )
+
+
+def search_sqlite(queryset, tokens):
+    from .models import ProductSearchEntry
+
+    # All tokens must match, as prefixes, anywhere in name, sku or description
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    # Lowest rowid among the newest SQLITE_MAX_CANDIDATES matches, found by
+    # walking the doclist backwards without scoring anything
+    oldest_candidate = ProductSearchEntry.objects.filter(document__match=match).order_by('-product').values(
+        'product'
+    )[SQLITE_MAX_CANDIDATES - 1:SQLITE_MAX_CANDIDATES]
+    # bm25 is lower-is-better; negate it so search_rank sorts like PostgreSQL's.
+    # It is always negative, so the unranked older matches at 0 sort last, and
+    # CASE only evaluates it for the candidates.
+    return queryset.filter(search_entry__document__match=match).annotate(search_rank=Case(
+        When(pk__gte=Coalesce(Subquery(oldest_candidate), 0), then=-F('search_entry__rank')),
+        default=Value(0.0),
+        output_field=models.FloatField(),
+    ))
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Ranked full-text product search with prefix matching.
+
+    PostgreSQL uses a GIN-indexed tsvector over name, sku and description plus a
+    trigram index for fuzzy SKU matches; SQLite uses an FTS5 table kept in sync
+    by triggers. The queryset is annotated with `search_rank` (higher is better)
+    which the paginator orders by. Other databases, or a database that has not
+    been migrated yet, fall back to DRF's icontains search over search_fields.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        tokens = search_tokens(terms)
+        if not tokens:
+            return super().filter_queryset(request, queryset, view)
+
+        if connection.vendor == 'postgresql':
+            return search_postgresql(queryset, tokens, terms)
+        if connection.vendor == 'sqlite' and fts5_available():
+            return search_sqlite(queryset, tokens)
+        return super().filter_queryset(request, queryset, view)
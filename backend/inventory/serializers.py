@@ -1,5 +1,11 @@
+from decimal import Decimal
+
 from rest_framework import serializers
-from .models import Category, Supplier, Product, StockMovement
+from .images import rendition_url
+from .models import (
+    Category, Supplier, Location, Product, ProductForecast, StockLevel, StockMovement, LowStockAlert,
+    LowStockAlertEvent, PurchaseOrder, PurchaseOrderLine, Tombstone
+)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -11,22 +17,73 @@ class CategorySerializer(serializers.ModelSerializer):
 class SupplierSerializer(serializers.ModelSerializer):
     class Meta:
         model = Supplier
-        fields = ['id', 'name', 'contact_person', 'email', 'phone', 'address', 'created_at', 'updated_at']
+        fields = [
+            'id', 'name', 'contact_person', 'email', 'phone', 'address', 'lead_time_days',
+            'created_at', 'updated_at'
+        ]
+
+
+class LocationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Location
+        fields = ['id', 'code', 'name', 'address', 'is_active', 'created_at', 'updated_at']
+
+
+class StockLevelSerializer(serializers.ModelSerializer):
+    location_code = serializers.CharField(source='location.code', read_only=True)
+    location_name = serializers.CharField(source='location.name', read_only=True)
+
+    class Meta:
+        model = StockLevel
+        fields = ['location', 'location_code', 'location_name', 'quantity', 'updated_at']
+
+
+class ProductForecastSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductForecast
+        fields = [
+            'moving_average', 'daily_demand', 'demand_std', 'lead_time_days', 'lead_time_demand',
+            'safety_stock', 'reorder_point', 'reorder_quantity', 'history_days', 'computed_at'
+        ]
 
 
 class ProductSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     supplier_name = serializers.CharField(source='supplier.name', read_only=True)
     is_low_stock = serializers.BooleanField(read_only=True)
+    image_thumb = serializers.SerializerMethodField()
+    image_medium = serializers.SerializerMethodField()
+    forecast = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'sku', 'description', 'price', 'quantity', 'min_stock_level',
-            'category', 'category_name', 'supplier', 'supplier_name', 'image', 'is_active',
-            'created_at', 'updated_at', 'is_low_stock'
+            'category', 'category_name', 'supplier', 'supplier_name', 'image',
+            'image_thumb', 'image_medium', 'is_active',
+            'version', 'created_at', 'updated_at', 'is_low_stock', 'forecast'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['version', 'created_at', 'updated_at']
+
+    def rendition(self, obj, size_name):
+        url = rendition_url(obj, size_name)
+        request = self.context.get('request')
+        if url and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_image_thumb(self, obj):
+        return self.rendition(obj, 'thumb')
+
+    def get_image_medium(self, obj):
+        return self.rendition(obj, 'medium')
+
+    def get_forecast(self, obj):
+        # Suggested reorder point and quantity, once compute_reorder_points has run
+        try:
+            return ProductForecastSerializer(obj.forecast).data
+        except ProductForecast.DoesNotExist:
+            return None
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
@@ -34,8 +91,9 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             'name', 'sku', 'description', 'price', 'quantity', 'min_stock_level',
-            'category', 'supplier', 'image', 'is_active'
+            'category', 'supplier', 'image', 'is_active', 'version'
         ]
+        read_only_fields = ['version']
 
 
 class StockMovementSerializer(serializers.ModelSerializer):
@@ -44,7 +102,7 @@ class StockMovementSerializer(serializers.ModelSerializer):
     class Meta:
         model = StockMovement
         fields = [
-            'id', 'product', 'product_name', 'quantity', 'movement_type', 'reason',
+            'id', 'product', 'product_name', 'location', 'quantity', 'movement_type', 'reason',
             'reference', 'performed_by', 'timestamp'
         ]
         read_only_fields = ['timestamp']
@@ -54,3 +112,101 @@ class StockMovementSerializer(serializers.ModelSerializer):
         if value <= 0:
             raise serializers.ValidationError("Quantity must be positive")
         return value
+
+
+class BulkStockAdjustmentLineSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    sku = serializers.CharField(required=False, max_length=50)
+    adjustment_type = serializers.ChoiceField(choices=['add', 'subtract'])
+    quantity = serializers.IntegerField(min_value=1)
+    # Location id; the default location when missing
+    location = serializers.IntegerField(required=False)
+    reason = serializers.CharField(required=False, allow_blank=True, max_length=200, default='')
+    reference = serializers.CharField(required=False, allow_blank=True, max_length=100, default='')
+
+    def validate(self, data):
+        if data.get('id') is None and not data.get('sku'):
+            raise serializers.ValidationError("Either id or sku is required")
+        data['delta'] = data['quantity'] if data['adjustment_type'] == 'add' else -data['quantity']
+        return data
+
+
+class StockTransferSerializer(serializers.Serializer):
+    from_location = serializers.PrimaryKeyRelatedField(queryset=Location.objects.all())
+    to_location = serializers.PrimaryKeyRelatedField(queryset=Location.objects.all())
+    quantity = serializers.IntegerField(min_value=1)
+    reason = serializers.CharField(required=False, allow_blank=True, max_length=200, default='')
+    reference = serializers.CharField(required=False, allow_blank=True, max_length=100, default='')
+
+    def validate(self, data):
+        if data['from_location'] == data['to_location']:
+            raise serializers.ValidationError("from_location and to_location must differ")
+        return data
+
+
+class LowStockAlertSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    product_sku = serializers.CharField(source='product.sku', read_only=True)
+    current_quantity = serializers.IntegerField(source='product.quantity', read_only=True)
+    current_min_stock_level = serializers.IntegerField(source='product.min_stock_level', read_only=True)
+
+    class Meta:
+        model = LowStockAlert
+        fields = [
+            'id', 'product', 'product_name', 'product_sku', 'quantity', 'min_stock_level',
+            'current_quantity', 'current_min_stock_level', 'triggered_at', 'cleared_at', 'is_open'
+        ]
+
+
+class LowStockAlertEventSerializer(serializers.ModelSerializer):
+    product = serializers.IntegerField(source='alert.product_id', read_only=True)
+    product_name = serializers.CharField(source='alert.product.name', read_only=True)
+    product_sku = serializers.CharField(source='alert.product.sku', read_only=True)
+
+    class Meta:
+        model = LowStockAlertEvent
+        fields = [
+            'id', 'alert', 'event_type', 'product', 'product_name', 'product_sku',
+            'quantity', 'min_stock_level', 'timestamp'
+        ]
+
+
+class PurchaseOrderLineSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    product_sku = serializers.CharField(source='product.sku', read_only=True)
+
+    class Meta:
+        model = PurchaseOrderLine
+        fields = [
+            'id', 'product', 'product_name', 'product_sku', 'quantity', 'unit_price',
+            'quantity_on_hand', 'min_stock_level', 'target_level'
+        ]
+
+
+class PurchaseOrderSerializer(serializers.ModelSerializer):
+    supplier_name = serializers.CharField(source='supplier.name', read_only=True)
+    lines = PurchaseOrderLineSerializer(many=True, read_only=True)
+    total_quantity = serializers.SerializerMethodField()
+    total_cost = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PurchaseOrder
+        fields = [
+            'id', 'reference', 'supplier', 'supplier_name', 'status', 'notes', 'lines',
+            'total_quantity', 'total_cost', 'created_at', 'updated_at'
+        ]
+
+    def get_total_quantity(self, obj):
+        return sum(line.quantity for line in obj.lines.all())
+
+    def get_total_cost(self, obj):
+        return str(sum((line.quantity * line.unit_price for line in obj.lines.all()), Decimal('0.00')))
+
+
+class TombstoneSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source='model_name', read_only=True)
+    id = serializers.IntegerField(source='object_id', read_only=True)
+
+    class Meta:
+        model = Tombstone
+        fields = ['type', 'id', 'key', 'deleted_at']
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import IntegerField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .filters import start_of_day
+from .models import Product, StockMovement, StockSnapshot
+
+
+def daily_totals(movements):
+    """Per product and day IN/OUT/ADJ sums for a movement queryset"""
+    return (
+        movements.annotate(day=TruncDate('timestamp'))
+        .values('product_id', 'day')
+        .annotate(
+            in_total=Coalesce(Sum('quantity', filter=Q(movement_type='IN')), 0),
+            out_total=Coalesce(Sum('quantity', filter=Q(movement_type='OUT')), 0),
+            adj_total=Coalesce(Sum('quantity', filter=Q(movement_type='ADJ')), 0),
+        )
+        .order_by('product_id', 'day')
+    )
+
+
+def net_movements(product_id, start=None, end=None):
+    """Net stock change of a product from movements in [start, end)"""
+    movements = StockMovement.objects.filter(product_id=product_id)
+    if start is not None:
+        movements = movements.filter(timestamp__gte=start)
+    if end is not None:
+        movements = movements.filter(timestamp__lt=end)
+    return movements.aggregate(net=Coalesce(Sum(StockMovement.net_quantity()), 0))['net']
+
+
+def opening_balances(product_ids, start):
+    """
+    Stock of each product at `start`, in one query. Products that already have
+    snapshots carry forward their latest closing quantity; the others are
+    derived backwards from the live quantity minus everything moved since.
+    """
+    latest_closing = StockSnapshot.objects.filter(
+        product=OuterRef('pk'), date__lt=timezone.localdate(start)
+    ).order_by('-date').values('closing_quantity')[:1]
+    moved_since = StockMovement.objects.filter(
+        product=OuterRef('pk'), timestamp__gte=start
+    ).order_by().values('product').annotate(net=Sum(StockMovement.net_quantity())).values('net')[:1]
+
+    rows = Product.objects.filter(pk__in=product_ids).annotate(
+        latest_closing=Subquery(latest_closing, output_field=IntegerField()),
+        moved_since=Coalesce(Subquery(moved_since, output_field=IntegerField()), Value(0)),
+    ).values_list('pk', 'latest_closing', 'quantity', 'moved_since')
+    return {
+        pk: closing if closing is not None else quantity - moved
+        for pk, closing, quantity, moved in rows
+    }
+
+
+def rollup(until=None, chunk_size=1000):
+    """
+    Write StockSnapshot rows for every product and day with movements, from the
+    day after the latest existing snapshot up to and including `until`
+    (yesterday by default). Days without movements get no row; their closing
+    quantity is the previous snapshot's. Re-running over the same days is safe.
+    Returns (first_day, last_day, snapshots_written).
+    """
+    until = until or timezone.localdate() - timedelta(days=1)
+    latest = StockSnapshot.objects.aggregate(latest=Max('date'))['latest']
+    if latest is not None:
+        first_day = latest + timedelta(days=1)
+    else:
+        earliest = StockMovement.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+        if earliest is None:
+            return None, until, 0
+        first_day = timezone.localdate(earliest)
+    if first_day > until:
+        return first_day, until, 0
+
+    start, end = start_of_day(first_day), start_of_day(until + timedelta(days=1))
+    window = StockMovement.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    product_ids = sorted(set(window.values_list('product_id', flat=True).distinct()))
+
+    written = 0
+    for offset in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[offset:offset + chunk_size]
+        with transaction.atomic():
+            balances = opening_balances(chunk, start)
+            snapshots = []
+            for row in daily_totals(window.filter(product_id__in=chunk)):
+                balances[row['product_id']] += row['in_total'] - row['out_total'] + row['adj_total']
+                snapshots.append(StockSnapshot(
+                    product_id=row['product_id'],
+                    date=row['day'],
+                    closing_quantity=balances[row['product_id']],
+                    in_total=row['in_total'],
+                    out_total=row['out_total'],
+                    adj_total=row['adj_total'],
+                ))
+            StockSnapshot.objects.bulk_create(
+                snapshots,
+                update_conflicts=True,
+                unique_fields=['product', 'date'],
+                update_fields=['closing_quantity', 'in_total', 'out_total', 'adj_total'],
+            )
+            written += len(snapshots)
+    return first_day, until, written
+
+
+def stock_at(product, on_date):
+    """
+    Closing stock of `product` on `on_date`: the nearest snapshot on or before
+    that day plus the movements between the two, so the work is bounded by the
+    days since the last rollup rather than the product's whole history.
+    Returns (quantity, basis) where basis is the snapshot used, if any.
+    """
+    end = start_of_day(on_date + timedelta(days=1))
+    snapshot = product.snapshots.filter(date__lte=on_date).order_by('-date').first()
+    if snapshot is not None:
+        since = start_of_day(snapshot.date + timedelta(days=1))
+        return snapshot.closing_quantity + net_movements(product.pk, since, end), snapshot
+
+    # Nothing on or before the day: every rolled-up movement is later, so step
+    # back from the first later snapshot, or from the live quantity if none.
+    later = product.snapshots.filter(date__gt=on_date).order_by('date').first()
+    if later is not None:
+        return later.closing_quantity - later.net_change, later
+    return product.quantity - net_movements(product.pk, start=end), None
@@ -0,0 +1,277 @@
+import uuid
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from . import alerts, outbox
+from .caching import invalidate_models
+from .models import InsufficientStock, Location, Product, StockLevel, StockMovement, VersionConflict
+
+
+def _supports_update_returning():
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def apply_quantity_delta(product_id, delta, now, expected_version=None):
+    """
+    Add `delta` to a product's quantity in a single guarded UPDATE and return
+    the new (quantity, min_stock_level, is_active, version), or None if the
+    product is missing, the change would make the quantity negative or, when
+    `expected_version` is given, the product is at another version. The
+    increment happens in the database, so concurrent adjusters cannot
+    overwrite each other's changes.
+    """
+    if _supports_update_returning():
+        table = connection.ops.quote_name(Product._meta.db_table)
+        sql = (
+            f'UPDATE {table} SET quantity = quantity + %s, version = version + 1, updated_at = %s '
+            f'WHERE id = %s AND quantity + %s >= 0'
+        )
+        params = [delta, connection.ops.adapt_datetimefield_value(now), product_id, delta]
+        if expected_version is not None:
+            sql += ' AND version = %s'
+            params.append(expected_version)
+        with connection.cursor() as cursor:
+            cursor.execute(sql + ' RETURNING quantity, min_stock_level, is_active, version', params)
+            row = cursor.fetchone()
+        return (row[0], row[1], bool(row[2]), row[3]) if row else None
+
+    rows = Product.objects.filter(pk=product_id, quantity__gte=-delta)
+    if expected_version is not None:
+        rows = rows.filter(version=expected_version)
+    if not rows.update(quantity=F('quantity') + delta, version=F('version') + 1, updated_at=now):
+        return None
+    return Product.objects.filter(pk=product_id).values_list(
+        'quantity', 'min_stock_level', 'is_active', 'version'
+    ).get()
+
+
+def adjust_stock(product, delta, reason='', reference='', performed_by='User', movement_type=None,
+                 expected_version=None, location=None):
+    """
+    Change a product's stock at `location` (the default location when None)
+    by `delta` and log the matching StockMovement in the same transaction:
+    one UPDATE of the product's total, one of its stock level and one INSERT.
+    `product` is updated in place with the new quantity and version and the
+    created movement is returned. With `expected_version`, raises
+    VersionConflict instead if the product was changed since that version.
+    """
+    if not delta:
+        raise ValueError('delta must be non-zero')
+
+    location = location or Location.default()
+    now = timezone.now()
+    with transaction.atomic():
+        state = apply_quantity_delta(product.pk, delta, now, expected_version)
+        if state is None:
+            current = Product.objects.filter(pk=product.pk).values_list('quantity', 'version').first()
+            if current is None:
+                raise Product.DoesNotExist(f'Product {product.pk} does not exist')
+            available, version = current
+            if expected_version is not None and version != expected_version:
+                raise VersionConflict(product.pk, expected_version)
+            raise InsufficientStock(product, available)
+        StockLevel.add_quantity(product.pk, location.pk, delta)
+
+        movement = StockMovement.objects.create(
+            product=product,
+            location=location,
+            quantity=abs(delta),
+            movement_type=movement_type or ('IN' if delta > 0 else 'OUT'),
+            reason=reason,
+            reference=reference or f'Stock adjustment - {product.pk}',
+            performed_by=performed_by,
+        )
+        invalidate_models(Product)
+        alerts.quantity_changed(product.pk, delta, *state[:3])
+
+    product.quantity, product.min_stock_level, product.is_active, product.version = state
+    product.updated_at = now
+    product.mark_quantity_saved()
+    return movement
+
+
+def transfer_stock(product, source, destination, quantity, reason='', reference='', performed_by='User',
+                   expected_version=None):
+    """
+    Move `quantity` of a product from one location to another in one
+    transaction, logged as an OUT at `source` and an IN at `destination`
+    sharing a reference. The product's total is unchanged, but its version is
+    bumped. Returns the (out, in) movements.
+    """
+    if quantity <= 0:
+        raise ValueError('quantity must be greater than 0')
+    if source.pk == destination.pk:
+        raise ValueError('Cannot transfer stock to the location it is at')
+
+    reference = reference or f'TRF-{uuid.uuid4().hex[:12].upper()}'
+    now = timezone.now()
+    with transaction.atomic():
+        state = apply_quantity_delta(product.pk, 0, now, expected_version)
+        if state is None:
+            if not Product.objects.filter(pk=product.pk).exists():
+                raise Product.DoesNotExist(f'Product {product.pk} does not exist')
+            raise VersionConflict(product.pk, expected_version)
+        StockLevel.add_quantity(product.pk, source.pk, -quantity)
+        StockLevel.add_quantity(product.pk, destination.pk, quantity)
+
+        movements = tuple(
+            StockMovement.objects.create(
+                product=product,
+                location=location,
+                quantity=quantity,
+                movement_type=movement_type,
+                reason=reason or f'Transfer {source.code} to {destination.code}',
+                reference=reference,
+                performed_by=performed_by,
+            )
+            for location, movement_type in ((source, 'OUT'), (destination, 'IN'))
+        )
+        invalidate_models(Product)
+
+    product.quantity, product.min_stock_level, product.is_active, product.version = state
+    product.updated_at = now
+    product.mark_quantity_saved()
+    return movements
+
+
+def bulk_adjust_stock(lines, atomic=True, performed_by='User', batch_size=500):
+    """
+    Apply many stock changes in one transaction using set-based writes.
+
+    `lines` is a sequence of dicts with `line` (caller's index), `id` or `sku`,
+    `delta`, and optional `location` (id, the default location when missing)
+    and `reason`/`reference`. Lines are checked in order against a running
+    balance per product and per stock level; a line that cannot be applied
+    is reported with an error. In atomic mode any error aborts the whole
+    batch, otherwise only the failing lines are skipped. Returns
+    (applied, results) where results has one entry per input line, in input
+    order.
+    """
+    lines = list(lines)
+    ids = {line['id'] for line in lines if line.get('id') is not None}
+    skus = {line['sku'] for line in lines if line.get('id') is None and line.get('sku')}
+    locations = Location.objects.in_bulk({line['location'] for line in lines if line.get('location') is not None})
+    default_location = Location.default()
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Lock the affected rows, in primary key order to avoid deadlocks
+        products = list(
+            Product.objects.select_for_update()
+            .filter(Q(pk__in=ids) | Q(sku__in=skus))
+            .order_by('pk')
+            .only('id', 'sku', 'quantity')
+        )
+        by_id = {product.pk: product for product in products}
+        by_sku = {product.sku: product for product in products}
+        balances = {product.pk: product.quantity for product in products}
+        # (product id, location id) -> [level id, quantity]
+        levels = {
+            (product_id, location_id): [pk, quantity]
+            for pk, product_id, location_id, quantity in StockLevel.objects.filter(product__in=products)
+            .values_list('pk', 'product_id', 'location_id', 'quantity')
+        }
+
+        results, accepted = [], []
+        for line in lines:
+            product = by_id.get(line.get('id')) if line.get('id') is not None else by_sku.get(line.get('sku'))
+            location = default_location if line.get('location') is None else locations.get(line['location'])
+            result = {'line': line['line'], 'id': line.get('id'), 'sku': line.get('sku')}
+            level = levels.setdefault((product.pk, location.pk), [None, 0]) if product and location else None
+            if product is None:
+                result.update(status='error', error='Product not found')
+            elif location is None:
+                result.update(id=product.pk, sku=product.sku, status='error', error='Location not found')
+            elif balances[product.pk] + line['delta'] < 0:
+                result.update(
+                    id=product.pk, sku=product.sku, status='error',
+                    error=f'Cannot remove more than current stock ({balances[product.pk]})'
+                )
+            elif level[1] + line['delta'] < 0:
+                result.update(
+                    id=product.pk, sku=product.sku, status='error',
+                    error=f'Cannot remove more than the stock at {location.code} ({level[1]})'
+                )
+            else:
+                balances[product.pk] += line['delta']
+                level[1] += line['delta']
+                result.update(
+                    id=product.pk, sku=product.sku, status='ok', location=location.pk, quantity=balances[product.pk]
+                )
+                accepted.append((line, product, location, result))
+            results.append(result)
+
+        failed = any(result['status'] == 'error' for result in results)
+        if not accepted or (atomic and failed):
+            if atomic and failed:
+                for *_, result in accepted:
+                    result.update(status='skipped')
+                    result.pop('quantity')
+            return False, results
+
+        deltas, level_deltas = {}, {}
+        for line, product, location, _ in accepted:
+            deltas[product.pk] = deltas.get(product.pk, 0) + line['delta']
+            key = (product.pk, location.pk)
+            level_deltas[key] = level_deltas.get(key, 0) + line['delta']
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        level_deltas = {key: delta for key, delta in level_deltas.items() if delta}
+
+        pks = list(deltas)
+        for start in range(0, len(pks), batch_size):
+            chunk = pks[start:start + batch_size]
+            Product.objects.filter(pk__in=chunk).update(
+                quantity=F('quantity') + Case(
+                    *[When(pk=pk, then=Value(deltas[pk])) for pk in chunk],
+                    output_field=IntegerField()
+                ),
+                version=F('version') + 1,
+                updated_at=now,
+            )
+        # Safety net for backends without row locks (SQLite): never commit a negative balance
+        if Product.objects.filter(pk__in=pks, quantity__lt=0).exists():
+            raise InsufficientStock(None, None, 'Stock changed concurrently, retry the batch')
+        existing = [(levels[key][0], delta) for key, delta in level_deltas.items() if levels[key][0] is not None]
+        try:
+            for start in range(0, len(existing), batch_size):
+                chunk = existing[start:start + batch_size]
+                StockLevel.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                    quantity=F('quantity') + Case(
+                        *[When(pk=pk, then=Value(delta)) for pk, delta in chunk],
+                        output_field=IntegerField()
+                    ),
+                    updated_at=now,
+                )
+        except IntegrityError:
+            raise InsufficientStock(None, None, 'Stock changed concurrently, retry the batch')
+        # Only stock in can reach a location the product has no level at yet
+        for (product_id, location_id), delta in level_deltas.items():
+            if levels[product_id, location_id][0] is None:
+                StockLevel.add_quantity(product_id, location_id, delta)
+        invalidate_models(Product)
+        alerts.evaluate(pks, batch_size=batch_size)
+
+        movements = StockMovement.objects.bulk_create([
+            StockMovement(
+                product=product,
+                location=location,
+                quantity=abs(line['delta']),
+                movement_type='IN' if line['delta'] > 0 else 'OUT',
+                reason=line.get('reason', ''),
+                reference=line.get('reference') or f'Stock adjustment - {product.pk}',
+                performed_by=performed_by,
+            )
+            for line, product, location, _ in accepted
+        ], batch_size=batch_size)
+        # bulk_create sends no save signals
+        outbox.record_movements(movements, batch_size=batch_size)
+
+    for movement, (*_, result) in zip(movements, accepted):
+        result['movement'] = movement.pk
+    return True, results
@@ -0,0 +1,332 @@
+"""
+Server-sent event streams.
+
+/api/stream/stock/ pushes every new StockMovement to live dashboards and
+warehouse screens, each followed by the current stock of its product. It
+is an async view (inventory.async_views), served by the ASGI application,
+so an idle connection holds no thread.
+
+Connections do not query the database themselves. One StockBroadcaster per
+process polls for movements after the newest it has seen (woken at once
+when this process commits one, otherwise every STOCK_STREAM_POLL_INTERVAL
+seconds), renders each batch into event text once, keeps the last
+STOCK_STREAM_BUFFER movements and wakes the subscribed streams, which copy
+the text out of that buffer. A stream that reconnects with a Last-Event-ID
+older than the buffer catches up from the database first.
+
+Under WSGI (runserver) an async generator would be read to the end before
+anything is sent, so there each connection gets sync_stock_events(), which
+polls the database itself.
+
+Movement ids are the event ids. Like the low-stock alert feed, the stream
+reads them through inventory.cursors, which holds back movements after a
+gap in the ids until the gap fills or times out, as transactions do not
+always commit in id order.
+
+The low-stock alert feed (/api/alerts/low-stock/events/ with Accept:
+text/event-stream) is an async generator too, alert_events(), so ASGI
+servers send its events as they happen instead of buffering the stream;
+WSGI servers, which would read an async generator to the end first, get
+sync_alert_events().
+CSV exports stay sync views; stream_csv() hands ASGI servers their rows
+through iterate_in_thread() for the same reason.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from . import alerts, cursors
+from .models import StockMovement
+from .serializers import LowStockAlertEventSerializer, StockMovementSerializer
+
+
+logger = logging.getLogger(__name__)
+
+CATCH_UP_BATCH = 500
+
+
+def server_sent_event(event_id, event, data):
+    """One event; without an id the client's last event id stays as it was"""
+    id_line = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{id_line}event: {event}\ndata: {JSONRenderer().render(data).decode()}\n\n'
+
+
+def is_asgi(request):
+    """Whether `request` (a Django or DRF request) is being served by the ASGI handler"""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def iterate_in_thread(iterator):
+    """
+    Async iterator over a sync one, each item produced through sync_to_async,
+    so ASGI servers can stream a body whose rows come from the ORM instead of
+    collecting all of it first.
+    """
+    iterator = iter(iterator)
+    done = object()
+    try:
+        while (item := await sync_to_async(next)(iterator, done)) is not done:
+            yield item
+    finally:
+        if hasattr(iterator, 'close'):
+            await sync_to_async(iterator.close)()
+
+
+def stream_events(generator):
+    response = StreamingHttpResponse(generator, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Don't let nginx hold events back in its buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def last_movement_id():
+    return cursors.latest_id(StockMovement.objects.all())
+
+
+def movements_after(last_id, limit=CATCH_UP_BATCH):
+    return cursors.rows_after(StockMovement.objects.select_related('product'), last_id, limit)
+
+
+def render(movements):
+    """
+    [(movement id, event text)]: a `movement` event per movement, the last
+    one of each product in the batch followed by a `stock` event with the
+    product's quantity as read with the batch.
+    """
+    last_of_product = {movement.product_id: movement.pk for movement in movements}
+    entries = []
+    for movement in movements:
+        text = server_sent_event(movement.pk, 'movement', StockMovementSerializer(movement).data)
+        if last_of_product[movement.product_id] == movement.pk:
+            product = movement.product
+            text += server_sent_event(None, 'stock', {
+                'product': product.pk,
+                'quantity': product.quantity,
+                'min_stock_level': product.min_stock_level,
+                'is_low_stock': product.is_low_stock(),
+            })
+        entries.append((movement.pk, text))
+    return entries
+
+
+class Subscription:
+    def __init__(self, loop):
+        self.loop = loop
+        self.ready = asyncio.Event()
+
+    def wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        except RuntimeError:
+            pass  # the stream's event loop has closed
+
+
+class StockBroadcaster:
+    """Polls for new movements on behalf of every stock stream in this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.subscribers = set()
+        self.thread = None
+        # Rendered events, and the id after which the buffer is complete
+        self.entries = deque()
+        self.covered_from = None
+        self.last_id = None
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers.add(subscription)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='stock-broadcaster', daemon=True)
+                self.thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+        # Let the thread notice it has nobody left to poll for
+        self.wakeup.set()
+
+    def notify(self):
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            with self.lock:
+                idle = not self.subscribers
+                if idle:
+                    # Start afresh with the next subscriber rather than
+                    # rendering everything since the last one left
+                    self.thread = self.last_id = self.covered_from = None
+                    self.entries.clear()
+            if idle:
+                connections.close_all()
+                return
+            self.wakeup.clear()
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('Could not read new stock movements')
+            finally:
+                close_old_connections()
+            self.wakeup.wait(settings.STOCK_STREAM_POLL_INTERVAL)
+
+    def poll(self):
+        if self.last_id is None:
+            self.last_id = self.covered_from = last_movement_id()
+            return
+        while True:
+            movements = movements_after(self.last_id)
+            if not movements:
+                return
+            entries = render(movements)
+            with self.lock:
+                self.entries.extend(entries)
+                while len(self.entries) > settings.STOCK_STREAM_BUFFER:
+                    self.covered_from = self.entries.popleft()[0]
+                self.last_id = entries[-1][0]
+                subscribers = list(self.subscribers)
+            for subscription in subscribers:
+                subscription.wake()
+            if len(movements) < CATCH_UP_BATCH:
+                return
+
+    def buffered_after(self, last_id):
+        """Buffered entries after `last_id`, or None when the buffer does not reach back that far"""
+        with self.lock:
+            if self.covered_from is None or last_id < self.covered_from:
+                return None
+            return [entry for entry in self.entries if entry[0] > last_id]
+
+
+broadcaster = StockBroadcaster()
+
+
+@receiver(post_save, sender=StockMovement)
+def movement_saved(sender, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(broadcaster.notify)
+
+
+async def stock_events(last_id=None, broadcaster=broadcaster):
+    """
+    Event stream text for movements after `last_id` (from now on when None).
+    Ends after STOCK_STREAM_SECONDS; EventSource reconnects by itself,
+    sending Last-Event-ID.
+    """
+    subscription = broadcaster.subscribe()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.STOCK_STREAM_SECONDS
+    try:
+        yield 'retry: 3000\n\n'
+        if last_id is None:
+            last_id = await sync_to_async(last_movement_id)()
+        while (remaining := deadline - loop.time()) > 0:
+            subscription.ready.clear()
+            entries = broadcaster.buffered_after(last_id)
+            if entries is None:
+                # Too far behind the buffer (or it is still empty): read the database
+                entries = await sync_to_async(lambda: render(movements_after(last_id)))()
+            if entries:
+                last_id = entries[-1][0]
+                yield ''.join(text for _, text in entries)
+                continue
+            try:
+                await asyncio.wait_for(
+                    subscription.ready.wait(), min(remaining, settings.STOCK_STREAM_HEARTBEAT)
+                )
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+def sync_stock_events(last_id=None):
+    """
+    stock_events() for WSGI servers, such as runserver, which can only
+    stream a sync iterator. Reads the database itself every
+    STOCK_STREAM_POLL_INTERVAL seconds instead of sharing the broadcaster,
+    and holds a worker thread while open.
+    """
+    deadline = time.monotonic() + settings.STOCK_STREAM_SECONDS
+    heartbeat_at = time.monotonic() + settings.STOCK_STREAM_HEARTBEAT
+    yield 'retry: 3000\n\n'
+    if last_id is None:
+        last_id = last_movement_id()
+    while (remaining := deadline - time.monotonic()) > 0:
+        entries = render(movements_after(last_id))
+        if entries:
+            last_id = entries[-1][0]
+            heartbeat_at = time.monotonic() + settings.STOCK_STREAM_HEARTBEAT
+            yield ''.join(text for _, text in entries)
+            continue
+        if time.monotonic() >= heartbeat_at:
+            heartbeat_at = time.monotonic() + settings.STOCK_STREAM_HEARTBEAT
+            yield ': keep-alive\n\n'
+        time.sleep(max(0, min(remaining, settings.STOCK_STREAM_POLL_INTERVAL, heartbeat_at - time.monotonic())))
+
+
+def render_alert_events(last_id):
+    """[(event id, event text)] for alert events after `last_id`"""
+    return [
+        (event.pk, server_sent_event(event.pk, event.event_type, LowStockAlertEventSerializer(event).data))
+        for event in alerts.events_after(last_id)
+    ]
+
+
+def sync_alert_events(last_id):
+    """
+    alert_events() for WSGI servers, which can only stream a sync iterator.
+    Holds a worker thread while open, waking as soon as this process commits
+    new events.
+    """
+    deadline = time.monotonic() + settings.LOW_STOCK_FEED_STREAM_SECONDS
+    yield 'retry: 3000\n\n'
+    while (remaining := deadline - time.monotonic()) > 0:
+        events = alerts.wait_for_events(last_id, min(remaining, settings.LOW_STOCK_FEED_HEARTBEAT))
+        if not events:
+            yield ': keep-alive\n\n'
+            continue
+        yield ''.join(
+            server_sent_event(event.pk, event.event_type, LowStockAlertEventSerializer(event).data)
+            for event in events
+        )
+        last_id = events[-1].pk
+
+
+async def alert_events(last_id):
+    """
+    Event stream text for low-stock alert events after `last_id`, checking
+    for new ones every LOW_STOCK_FEED_POLL_INTERVAL seconds. Ends after
+    LOW_STOCK_FEED_STREAM_SECONDS so it doesn't hold a connection forever;
+    EventSource reconnects on its own, sending Last-Event-ID.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.LOW_STOCK_FEED_STREAM_SECONDS
+    heartbeat_at = loop.time() + settings.LOW_STOCK_FEED_HEARTBEAT
+    yield 'retry: 3000\n\n'
+    while (remaining := deadline - loop.time()) > 0:
+        entries = await sync_to_async(render_alert_events)(last_id)
+        if entries:
+            last_id = entries[-1][0]
+            heartbeat_at = loop.time() + settings.LOW_STOCK_FEED_HEARTBEAT
+            yield ''.join(text for _, text in entries)
+            continue
+        if loop.time() >= heartbeat_at:
+            heartbeat_at = loop.time() + settings.LOW_STOCK_FEED_HEARTBEAT
+            yield ': keep-alive\n\n'
+        await asyncio.sleep(min(remaining, settings.LOW_STOCK_FEED_POLL_INTERVAL, heartbeat_at - loop.time()))
@@ -0,0 +1,122 @@
+"""
+Incremental sync of the catalogue and stock movements.
+
+/api/sync/?since=<token> returns what changed after a watermark: products,
+categories and suppliers by updated_at, stock movements by timestamp, and
+deletions as Tombstone rows (recorded by the post_delete receiver below).
+Each collection is read in (time, id) order from its own position, at most
+`limit` rows at a time, and the opaque token encodes all the positions, so
+a poll costs O(changes) however large the catalogue is. Without a token
+everything is returned, page by page.
+
+Rows are stamped before their transaction commits, so one may become
+visible only after a poll has read past its time. Once a collection is
+caught up, its position is therefore held back to SYNC_OVERLAP_SECONDS ago:
+changes in that window are sent again, and clients apply every row as an
+upsert by id. Movements moved to the archive or cold storage are not
+deletions and get no tombstones.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Category, Product, StockMovement, Supplier, Tombstone
+
+
+# Collection name -> (queryset, time field)
+COLLECTIONS = {
+    'products': (Product.objects.select_related('category', 'supplier', 'forecast'), 'updated_at'),
+    'categories': (Category.objects.all(), 'updated_at'),
+    'suppliers': (Supplier.objects.all(), 'updated_at'),
+    'movements': (StockMovement.objects.select_related('product'), 'timestamp'),
+    'deleted': (Tombstone.objects.all(), 'deleted_at'),
+}
+
+TOMBSTONE_MODELS = {
+    Product: (Tombstone.PRODUCT, 'sku'),
+    Category: (Tombstone.CATEGORY, 'name'),
+    Supplier: (Tombstone.SUPPLIER, 'name'),
+}
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+@receiver(post_delete)
+def record_deletion(sender, instance, **kwargs):
+    if sender in TOMBSTONE_MODELS:
+        model_name, key = TOMBSTONE_MODELS[sender]
+        Tombstone.objects.create(model_name=model_name, object_id=instance.pk, key=getattr(instance, key))
+
+
+def encode_token(positions):
+    payload = {
+        name: [moment.isoformat(), pk]
+        for name, (moment, pk) in positions.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_token(token):
+    """{collection: (time, id)} from a token; collections it does not name start from the beginning"""
+    if not token:
+        return {}
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        positions = {}
+        for name, (moment, pk) in payload.items():
+            if name not in COLLECTIONS:
+                raise ValueError(name)
+            moment = datetime.fromisoformat(moment)
+            if timezone.is_naive(moment):
+                raise ValueError(moment)
+            positions[name] = (moment, int(pk))
+    except (TypeError, ValueError, AttributeError, binascii.Error, UnicodeDecodeError):
+        raise InvalidToken('Invalid sync token')
+    return positions
+
+
+def read_after(queryset, field, position, limit):
+    """Up to limit + 1 rows after `position` in (field, id) order"""
+    rows = queryset.order_by(field, 'id')
+    if position is not None:
+        moment, pk = position
+        # The leading bound on its own lets the (field, id) index drive the scan
+        rows = rows.filter(**{f'{field}__gte': moment}).filter(
+            Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk})
+        )
+    return list(rows[:limit + 1])
+
+
+def changes(token=None, limit=500):
+    """
+    Rows changed after the positions in `token`, as
+    ({collection: [instances]}, next token, whether any collection has more).
+    """
+    positions = decode_token(token)
+    settled = (timezone.now() - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS), 0)
+    results, has_more = {}, False
+    for name, (queryset, field) in COLLECTIONS.items():
+        position = positions.get(name)
+        rows = read_after(queryset, field, position, limit)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            has_more = True
+            position = (getattr(rows[-1], field), rows[-1].pk)
+        else:
+            if rows:
+                position = (getattr(rows[-1], field), rows[-1].pk)
+            # Caught up: rows stamped since `settled` may still be committing
+            if position is None or position > settled:
+                position = settled
+        positions[name] = position
+        results[name] = rows
+    return results, encode_token(positions), has_more
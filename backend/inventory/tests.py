@@ -1,9 +1,93 @@
+import base64
+import csv
+import io
 import json
-from django.test import TestCase
+import asyncio
+import math
+import os
+import queue
+import tempfile
+import threading
+import time
+import urllib.error
+import warnings
+from datetime import date, timedelta
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_finished, request_started
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Category, Product, Supplier, StockMovement
+from . import (
+    alerts, cold_storage, forecasting, images, middleware, outbox, partitions, purchasing, search, snapshots, stock,
+    streams
+)
+from .models import (
+    Category, Product, Supplier, StockMovement, ArchivedStockMovement, StockSnapshot, LowStockAlert,
+    LowStockAlertEvent, ProductForecast, PurchaseOrder, MovementArchive, MovementArchiveBalance, VersionConflict,
+    OutboxEvent, Location, StockLevel
+)
+
+
+async def asgi_get(path, query_string='', headers=(), until=None, timeout=10):
+    """
+    GET `path` through Django's ASGI handler, as the ASGI server would, and
+    read the response body until `until(body)` is true or it ends. Returns
+    (status, headers, body text, seconds to the first body bytes, warnings).
+    """
+    # Like the test client, keep the test's connection open across the request
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query_string.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost'), *headers], 'client': ('127.0.0.1', 1234),
+        'server': ('localhost', 80),
+    }
+    disconnected = asyncio.Event()
+    messages = asyncio.Queue()
+
+    async def receive():
+        if not receive.started:
+            receive.started = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+    receive.started = False
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        task = asyncio.create_task(ASGIHandler()(scope, receive, messages.put))
+        try:
+            start = await asyncio.wait_for(messages.get(), timeout)
+            body, first_byte = b'', None
+            while True:
+                message = await asyncio.wait_for(messages.get(), timeout)
+                if message.get('body') and first_byte is None:
+                    first_byte = loop.time() - started
+                body += message.get('body', b'')
+                if not message.get('more_body') or (until and until(body.decode())):
+                    break
+        finally:
+            disconnected.set()
+            try:
+                await asyncio.wait_for(task, timeout)
+            except asyncio.TimeoutError:
+                pass
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+    return start['status'], dict(start['headers']), body.decode(), first_byte, [str(w.message) for w in caught]
 
 
 class ModelTests(TestCase):
@@ -225,14 +309,14 @@ class APITests(APITestCase):
         Product.objects.create(**product_data)
 
         url = reverse('product-export-csv')
-        response = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT='text/csv')
 
         # Check response
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response['Content-Type'], 'text/csv')
 
         # Check that content includes expected product data
-        csv_content = response.content.decode('utf-8')
+        csv_content = b''.join(response.streaming_content).decode('utf-8')
         self.assertIn('API Test Product', csv_content)
         self.assertIn('APITEST001', csv_content)
 
@@ -241,3 +325,2402 @@ class APITests(APITestCase):
         url = reverse('stockmovement-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class DashboardSummaryTests(APITestCase):
+    """Test the server-side dashboard aggregation endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.product = Product.objects.create(
+            name="Stocked Product", sku="DASH001", price=10, quantity=20,
+            min_stock_level=5, category=self.category, supplier=self.supplier
+        )
+        self.low_product = Product.objects.create(
+            name="Low Product", sku="DASH002", price=2.5, quantity=2,
+            min_stock_level=10, category=self.category, supplier=self.supplier
+        )
+        Product.objects.create(
+            name="Inactive Product", sku="DASH003", price=100, quantity=0,
+            min_stock_level=10, category=self.category, supplier=self.supplier,
+            is_active=False
+        )
+
+    def test_summary_product_metrics(self):
+        """Test catalogue metrics are aggregated over active products"""
+        response = self.client.get(reverse('dashboard-summary'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        products = response.data['products']
+        self.assertEqual(products['total_products'], 3)
+        self.assertEqual(products['active_products'], 2)
+        self.assertEqual(products['low_stock_count'], 1)
+        self.assertEqual(float(products['inventory_value']), 205.0)
+        self.assertEqual([p['sku'] for p in response.data['low_stock']], ['DASH002'])
+        self.assertEqual(response.data['stock_by_category'][0]['total_quantity'], 22)
+
+    def test_summary_movement_totals(self):
+        """Test movement totals per type within the requested window"""
+        self.product.quantity = 25
+        self.product.save()
+        self.product.quantity = 22
+        self.product.save()
+
+        response = self.client.get(reverse('dashboard-summary'), {'days': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        movements = response.data['movements']
+        self.assertEqual(movements['count'], 2)
+        self.assertEqual(movements['totals'], {'IN': 5, 'OUT': 3, 'ADJ': 0})
+        self.assertEqual(len(movements['daily']), 1)
+        self.assertEqual(movements['daily'][0]['IN'], 5)
+
+    def test_summary_invalid_window(self):
+        """Test that an invalid window is rejected"""
+        response = self.client.get(reverse('dashboard-summary'), {'days': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('dashboard-summary'), {'days': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_summary_includes_archived_months(self):
+        """Test that movements moved to the archive table and to month files still count within the window"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(MOVEMENT_ARCHIVE_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        StockMovement.objects.all().delete()
+        today = timezone.localdate()
+        now = timezone.now()
+        for days_ago, movement_type in ((400, 'IN'), (300, 'IN'), (200, 'OUT'), (120, 'IN'), (1, 'ADJ')):
+            movement = StockMovement.objects.create(
+                product=self.product, quantity=days_ago, movement_type=movement_type
+            )
+            StockMovement.objects.filter(pk=movement.pk).update(timestamp=now - timedelta(days=days_ago))
+        snapshots.rollup()
+        partitions.rotate(hot_months=3, today=today)
+        cold_storage.archive_before(cold_storage.cold_cutoff(today, months=8))
+        self.assertTrue(MovementArchive.objects.exists())
+        self.assertTrue(ArchivedStockMovement.objects.exists())
+
+        expected_daily = {
+            (today - timedelta(days=days_ago)).isoformat(): (movement_type, days_ago)
+            for days_ago, movement_type in ((300, 'IN'), (200, 'OUT'), (120, 'IN'), (1, 'ADJ'))
+        }
+        for url in (reverse('dashboard-summary'), '/api/async/dashboard/summary/'):
+            data = self.client.get(url, {'days': 365}).json()
+            movements = data['movements']
+            self.assertEqual(movements['count'], 4)
+            self.assertEqual(movements['totals'], {'IN': 420, 'OUT': 200, 'ADJ': 1})
+            daily = {
+                day['date']: next((code, day[code]) for code in ('IN', 'OUT', 'ADJ') if day[code])
+                for day in movements['daily'] if day['IN'] or day['OUT'] or day['ADJ']
+            }
+            self.assertEqual(daily, expected_daily)
+
+
+class KeysetPaginationTests(APITestCase):
+    """Test cursor pagination on the list endpoints"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.product = Product.objects.create(
+            name="Paged Product", sku="PAGE001", price=1, quantity=0,
+            category=self.category, supplier=self.supplier
+        )
+        for _ in range(7):
+            StockMovement.objects.create(product=self.product, quantity=1, movement_type='IN')
+        # Give most rows the same timestamp so the id tie-breaker is exercised
+        StockMovement.objects.exclude(pk=StockMovement.objects.first().pk).update(
+            timestamp=StockMovement.objects.earliest('timestamp').timestamp
+        )
+
+    def collect_pages(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+
+    def test_stock_movements_walk_all_pages(self):
+        """Test that following next links visits every row once in order"""
+        ids, _ = self.collect_pages(reverse('stockmovement-list'), {'page_size': 3})
+        expected = list(
+            StockMovement.objects.order_by('-timestamp', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        """Test that the previous link of page two is page one"""
+        url = reverse('stockmovement-list')
+        first = self.client.get(url, {'page_size': 3})
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']]
+        )
+
+    def test_pages_stable_under_inserts(self):
+        """Test that rows inserted while paging do not shift later pages"""
+        url = reverse('stockmovement-list')
+        first = self.client.get(url, {'page_size': 3})
+        StockMovement.objects.create(product=self.product, quantity=1, movement_type='OUT')
+        second = self.client.get(first.data['next'])
+        seen = {row['id'] for row in first.data['results']}
+        self.assertFalse(seen & {row['id'] for row in second.data['results']})
+        self.assertEqual(len(second.data['results']), 3)
+
+    def test_products_ordered_by_name(self):
+        """Test that product pages follow (name, id) ordering"""
+        for index in range(4):
+            Product.objects.create(
+                name=f"Item {4 - index}", sku=f"ITEM{index}", price=1,
+                category=self.category, supplier=self.supplier
+            )
+        ids, _ = self.collect_pages(reverse('product-list'), {'page_size': 2})
+        self.assertEqual(ids, list(Product.objects.order_by('name', 'id').values_list('id', flat=True)))
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = self.client.get(reverse('stockmovement-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class StockAdjustmentTests(APITestCase):
+    """Test the single-statement stock adjustment path"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.product = Product.objects.create(
+            name="Adjusted Product", sku="ADJ001", price=5, quantity=10,
+            category=self.category, supplier=self.supplier
+        )
+
+    def test_adjust_stock_issues_updates_and_inserts(self):
+        """Test that an adjustment does not re-read the product row, only writing the total, level, movement and event"""
+        product = Product.objects.get(pk=self.product.pk)
+        location = Location.default()
+        with CaptureQueriesContext(connection) as ctx:
+            stock.adjust_stock(product, -4, reason='Picked', location=location)
+
+        statements = [q['sql'].split()[0].upper() for q in ctx.captured_queries]
+        statements = [s for s in statements if s in ('SELECT', 'UPDATE', 'INSERT')]
+        self.assertEqual(statements, ['UPDATE', 'UPDATE', 'INSERT', 'INSERT'])
+        self.assertEqual(product.quantity, 6)
+        self.assertEqual(Product.objects.get(pk=product.pk).quantity, 6)
+
+        movement = StockMovement.objects.get()
+        self.assertEqual((movement.movement_type, movement.quantity, movement.reason), ('OUT', 4, 'Picked'))
+
+    def test_stale_instances_do_not_lose_updates(self):
+        """Test that adjustments through stale copies both apply"""
+        first = Product.objects.get(pk=self.product.pk)
+        second = Product.objects.get(pk=self.product.pk)
+        stock.adjust_stock(first, 5)
+        stock.adjust_stock(second, 3)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).quantity, 18)
+
+    def test_adjust_stock_rejects_negative_result(self):
+        """Test that stock cannot go below zero"""
+        stale = Product.objects.get(pk=self.product.pk)
+        stock.adjust_stock(self.product, -8)
+        with self.assertRaises(stock.InsufficientStock):
+            stock.adjust_stock(stale, -5)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).quantity, 2)
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+    def test_save_diffs_against_loaded_quantity(self):
+        """Test that save() logs a movement without re-reading the row"""
+        product = Product.objects.get(pk=self.product.pk)
+        product.quantity = 7
+        with CaptureQueriesContext(connection) as ctx:
+            product.save()
+        self.assertFalse([
+            q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'FROM "inventory_product"' in q['sql']
+        ])
+        movement = StockMovement.objects.get()
+        self.assertEqual((movement.movement_type, movement.quantity), ('OUT', 3))
+
+    def test_adjust_stock_api(self):
+        """Test the adjust_stock endpoint"""
+        url = reverse('product-adjust-stock', args=[self.product.id])
+        response = self.client.post(url, {'adjustment_type': 'add', 'quantity': 5, 'reason': 'Delivery'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['product']['quantity'], 15)
+
+        response = self.client.post(url, {'adjustment_type': 'subtract', 'quantity': 50}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkStockAdjustmentTests(APITestCase):
+    """Test the bulk stock adjustment endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.first = Product.objects.create(
+            name="First", sku="BULK001", price=1, quantity=10,
+            category=self.category, supplier=self.supplier
+        )
+        self.second = Product.objects.create(
+            name="Second", sku="BULK002", price=1, quantity=3,
+            category=self.category, supplier=self.supplier
+        )
+        self.url = reverse('product-bulk-adjust-stock')
+
+    def test_bulk_adjust_applies_all_lines(self):
+        """Test that valid lines are applied with one movement each"""
+        lines = [
+            {'sku': 'BULK001', 'adjustment_type': 'add', 'quantity': 5, 'reference': 'PO-1'},
+            {'id': self.second.id, 'adjustment_type': 'subtract', 'quantity': 3},
+            {'sku': 'BULK001', 'adjustment_type': 'subtract', 'quantity': 15},
+        ]
+        response = self.client.post(self.url, {'lines': lines}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['applied'], 3)
+        self.assertEqual([r['quantity'] for r in response.data['results']], [15, 0, 0])
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.quantity, self.second.quantity), (0, 0))
+        self.assertEqual(StockMovement.objects.count(), 3)
+        self.assertTrue(StockMovement.objects.filter(reference='PO-1', movement_type='IN').exists())
+
+    def test_bulk_adjust_atomic_rejects_whole_batch(self):
+        """Test that one bad line aborts an all-or-nothing batch"""
+        lines = [
+            {'sku': 'BULK001', 'adjustment_type': 'add', 'quantity': 5},
+            {'sku': 'BULK002', 'adjustment_type': 'subtract', 'quantity': 4},
+            {'sku': 'MISSING', 'adjustment_type': 'add', 'quantity': 1},
+        ]
+        response = self.client.post(self.url, lines, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']], ['skipped', 'error', 'error']
+        )
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.quantity, 10)
+        self.assertEqual(StockMovement.objects.count(), 0)
+
+    def test_bulk_adjust_partial_success(self):
+        """Test that partial mode applies valid lines and reports the rest"""
+        lines = [
+            {'sku': 'BULK001', 'adjustment_type': 'add', 'quantity': 5},
+            {'sku': 'BULK002', 'adjustment_type': 'subtract', 'quantity': 4},
+            {'adjustment_type': 'add', 'quantity': 1},
+        ]
+        response = self.client.post(self.url, {'lines': lines, 'atomic': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['applied'], response.data['failed']), (1, 2))
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.quantity, self.second.quantity), (15, 3))
+
+
+class StreamingExportTests(APITestCase):
+    """Test the streaming CSV exports"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.widget = Product.objects.create(
+            name="Widget", sku="EXP001", price=1, quantity=5,
+            category=self.category, supplier=self.supplier
+        )
+        Product.objects.create(
+            name="Gadget", sku="EXP002", price=1, quantity=5,
+            category=self.category, supplier=self.supplier, is_active=False
+        )
+
+    def read_csv(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_product_export_honours_filters(self):
+        """Test that the export applies the same filters as the list"""
+        rows = self.read_csv(self.client.get(reverse('product-export-csv'), {'is_active': 'true'}))
+        self.assertEqual([row[0] for row in rows[1:]], ['EXP001'])
+
+        rows = self.read_csv(self.client.get(reverse('product-export-csv'), {'search': 'gadg'}))
+        self.assertEqual([row[0] for row in rows[1:]], ['EXP002'])
+
+    def test_stock_movement_export_date_range(self):
+        """Test exporting movement history within a date range"""
+        stock.adjust_stock(self.widget, 3, reason='Delivery')
+        old = StockMovement.objects.create(product=self.widget, quantity=1, movement_type='OUT')
+        StockMovement.objects.filter(pk=old.pk).update(timestamp=timezone.now() - timedelta(days=40))
+
+        today = timezone.localdate()
+        rows = self.read_csv(self.client.get(
+            reverse('stockmovement-export-csv'),
+            {'date_from': (today - timedelta(days=7)).isoformat(), 'date_to': today.isoformat()}
+        ))
+        self.assertEqual(rows[0][0], 'ID')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][2:6], ['EXP001', 'Widget', 'IN', '3'])
+
+    async def test_exports_under_asgi_stream_without_buffering(self):
+        """Test that ASGI servers are given an async iterator, so the exports are not read into memory first"""
+        await sync_to_async(stock.adjust_stock)(self.widget, 3, reason='Delivery')
+        for path, expected in [
+            ('/api/products/export_csv/', 'EXP001'),
+            ('/api/stock-movements/export_csv/', 'EXP001,Widget,IN,3'),
+        ]:
+            status_code, headers, body, _, caught = await asgi_get(path, headers=[(b'accept', b'text/csv')])
+            self.assertEqual(status_code, status.HTTP_200_OK)
+            self.assertEqual(headers[b'Content-Type'], b'text/csv')
+            self.assertIn(expected, body)
+            self.assertFalse([message for message in caught if 'synchronous iterators' in message])
+
+
+class ImportTests(APITestCase):
+    """Test the bulk import pipeline"""
+
+    csv_data = (
+        "SKU,Name,Price,Quantity,Min Stock Level,Category,Supplier,Active\n"
+        "IMP001,Imported One,9.99,10,2,Imported Category,Imported Supplier,Yes\n"
+        "IMP002,Imported Two,abc,5,1,Imported Category,Imported Supplier,Yes\n"
+        "IMP003,Imported Three,1.50,0,0,Other Category,Imported Supplier,No\n"
+    )
+
+    def test_import_command_upserts_and_records_opening_stock(self):
+        """Test importing a CSV twice creates, then updates, with movements"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(self.csv_data)
+        self.addCleanup(os.remove, handle.name)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_products', handle.name, '--chunk-size', '2', stdout=out, stderr=err)
+        self.assertIn('Created: 2, Updated: 0, Failed: 1', out.getvalue())
+        self.assertIn('Row 2 [IMP002]: price must be a number', err.getvalue())
+
+        product = Product.objects.get(sku='IMP001')
+        self.assertEqual(product.category.name, 'Imported Category')
+        self.assertFalse(Product.objects.get(sku='IMP003').is_active)
+        self.assertEqual(Category.objects.count(), 2)
+        opening = StockMovement.objects.get(product=product)
+        self.assertEqual((opening.movement_type, opening.quantity, opening.reason), ('IN', 10, 'Opening stock'))
+
+        with open(handle.name, 'w') as rewrite:
+            rewrite.write(self.csv_data.replace('IMP001,Imported One,9.99,10', 'IMP001,Renamed,9.99,4'))
+        call_command('import_products', handle.name, stdout=io.StringIO(), stderr=io.StringIO())
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.quantity), ('Renamed', 4))
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertTrue(StockMovement.objects.filter(product=product, movement_type='OUT', quantity=6).exists())
+
+    def test_import_endpoint_json(self):
+        """Test uploading a JSON array through the API"""
+        records = [
+            {'sku': 'JSON001', 'name': 'Json Product', 'price': '3.00', 'quantity': 2,
+             'category': 'Json Category', 'supplier': 'Json Supplier'},
+            {'sku': 'JSON002', 'name': 'Missing price', 'category': 'Json Category', 'supplier': 'Json Supplier'},
+        ]
+        upload = SimpleUploadedFile('products.json', json.dumps(records).encode(), content_type='application/json')
+        response = self.client.post(reverse('product-import-file'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertTrue(Product.objects.filter(sku='JSON001', quantity=2).exists())
+
+    def test_import_endpoint_rejects_malformed_csv(self):
+        """Test that a CSV the reader cannot parse is a 400, not a server error"""
+        data = b'sku,name,price\nBAD001,"' + b'x' * (csv.field_size_limit() + 1) + b'",1.00\n'
+        upload = SimpleUploadedFile('products.csv', data, content_type='text/csv')
+        response = self.client.post(reverse('product-import-file'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('field larger than field limit', response.data['error'])
+        self.assertFalse(Product.objects.filter(sku='BAD001').exists())
+
+    def test_import_categories(self):
+        """Test importing categories keyed on name"""
+        Category.objects.create(name='Existing', description='old')
+        upload = SimpleUploadedFile(
+            'categories.csv', b'name,description\nExisting,new\nFresh,brand new\n', content_type='text/csv'
+        )
+        response = self.client.post(reverse('category-import-file'), {'file': upload}, format='multipart')
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual(Category.objects.get(name='Existing').description, 'new')
+
+
+class StockSnapshotTests(APITestCase):
+    """Test daily stock snapshots and historical stock lookups"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.product = Product.objects.create(
+            name="History Product", sku="HIST001", price=1, quantity=10,
+            category=self.category, supplier=self.supplier
+        )
+        self.today = timezone.localdate()
+        self.move(5, days_ago=5)
+        self.move(-4, days_ago=3)
+        self.move(2, days_ago=0)
+
+    def move(self, delta, days_ago):
+        movement = stock.adjust_stock(self.product, delta)
+        StockMovement.objects.filter(pk=movement.pk).update(
+            timestamp=timezone.now() - timedelta(days=days_ago)
+        )
+
+    def stock_on(self, days_ago):
+        url = reverse('product-stock-at', args=[self.product.id])
+        response = self.client.get(url, {'date': (self.today - timedelta(days=days_ago)).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['quantity']
+
+    def test_rollup_writes_snapshots_for_movement_days(self):
+        """Test that the rollup is sparse, correct and incremental"""
+        out = io.StringIO()
+        call_command('rollup_stock_snapshots', stdout=out)
+        self.assertIn('Wrote 2 snapshots', out.getvalue())
+        snapshots = list(StockSnapshot.objects.order_by('date').values_list('closing_quantity', 'in_total', 'out_total'))
+        self.assertEqual(snapshots, [(15, 5, 0), (11, 0, 4)])
+
+        out = io.StringIO()
+        call_command('rollup_stock_snapshots', stdout=out)
+        self.assertIn('already up to date', out.getvalue())
+
+        self.move(-1, days_ago=1)
+        call_command('rollup_stock_snapshots', stdout=io.StringIO())
+        latest = StockSnapshot.objects.latest('date')
+        self.assertEqual((latest.date, latest.closing_quantity), (self.today - timedelta(days=1), 10))
+
+    def test_stock_at_matches_history(self):
+        """Test historical lookups before and after rolling up"""
+        expected = {6: 10, 5: 15, 4: 15, 3: 11, 0: 13}
+        for days_ago, quantity in expected.items():
+            self.assertEqual(self.stock_on(days_ago), quantity)
+
+        call_command('rollup_stock_snapshots', stdout=io.StringIO())
+        for days_ago, quantity in expected.items():
+            self.assertEqual(self.stock_on(days_ago), quantity)
+
+    def test_stock_at_requires_date(self):
+        """Test that a missing or malformed date is rejected"""
+        url = reverse('product-stock-at', args=[self.product.id])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'date': '31/01/2025'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductSearchTests(APITestCase):
+    """Test the full-text product search"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        for sku, name, description in [
+            ('KB-USB-003', 'USB Keyboard', 'Mechanical keyboard with backlit keys'),
+            ('MSE-BT-002', 'Bluetooth Mouse', 'Wireless mouse, pairs with any keyboard'),
+            ('LAM-DESK-005', 'Desk Lamp', 'Adjustable LED lamp with USB charging port'),
+        ]:
+            Product.objects.create(
+                name=name, sku=sku, description=description, price=1,
+                category=self.category, supplier=self.supplier
+            )
+
+    def search(self, term):
+        response = self.client.get(reverse('product-list'), {'search': term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['sku'] for row in response.data['results']]
+
+    def test_search_ranks_best_match_first(self):
+        """Test that a name match outranks a description match"""
+        self.assertEqual(self.search('keyboard'), ['KB-USB-003', 'MSE-BT-002'])
+
+    def test_search_prefix_for_typeahead(self):
+        """Test that partial words match as prefixes, across fields"""
+        self.assertEqual(self.search('keyb'), ['KB-USB-003', 'MSE-BT-002'])
+        self.assertEqual(self.search('lam'), ['LAM-DESK-005'])
+        self.assertEqual(self.search('usb char'), ['LAM-DESK-005'])
+        self.assertEqual(self.search('zzz'), [])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        """Test that the index stays in sync with product changes"""
+        product = Product.objects.get(sku='LAM-DESK-005')
+        product.name = 'Floor Light'
+        product.description = ''
+        product.save()
+        self.assertEqual(self.search('lamp'), [])
+        self.assertEqual(self.search('floor'), ['LAM-DESK-005'])
+
+        product.delete()
+        self.assertEqual(self.search('floor'), [])
+
+    def test_search_results_paginate(self):
+        """Test that ranked results can be paged through with cursors"""
+        response = self.client.get(reverse('product-list'), {'search': 'keyboard', 'page_size': 1})
+        self.assertEqual(response.data['results'][0]['sku'], 'KB-USB-003')
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['sku'] for row in response.data['results']], ['MSE-BT-002'])
+        self.assertIsNone(response.data['next'])
+
+    def test_sqlite_search_ranks_newest_candidates(self):
+        """Test that SQLite only ranks the newest matches of a broad search, returning older ones after them"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        for number in range(3):
+            Product.objects.create(
+                name=f'Keyboard Cover {number}', sku=f'KBC-00{number}', price=1,
+                category=self.category, supplier=self.supplier
+            )
+        with mock.patch.object(search, 'SQLITE_MAX_CANDIDATES', 2):
+            skus = self.search('keyboard')
+            self.assertEqual(sorted(skus[:2]), ['KBC-001', 'KBC-002'])
+            self.assertEqual(sorted(skus[2:]), ['KB-USB-003', 'KBC-000', 'MSE-BT-002'])
+
+            # The oldest match is still reachable when paging through
+            response = self.client.get(reverse('product-list'), {'search': 'keyboard', 'page_size': 2})
+            found = []
+            while True:
+                found += [row['sku'] for row in response.data['results']]
+                if not response.data['next']:
+                    break
+                response = self.client.get(response.data['next'])
+            self.assertEqual(sorted(found), sorted(skus))
+            self.assertIn('KB-USB-003', found)
+
+    def test_sqlite_triggers_restored_after_migrate(self):
+        """Test that triggers lost to a table rebuild are recreated"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER inventory_product_fts_insert')
+        search.restore_sqlite_triggers()
+        Product.objects.create(
+            name='Stapler', sku='STP-001', price=1, category=self.category, supplier=self.supplier
+        )
+        self.assertEqual(self.search('stapler'), ['STP-001'])
+
+
+class ResponseCacheTests(APITestCase):
+    """Test the cached list/detail responses and their invalidation"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.category = Category.objects.create(name="Cached Category")
+        self.supplier = Supplier.objects.create(name="Cached Supplier")
+        self.product = Product.objects.create(
+            name="Cached Product", sku="CACHE001", price=5, quantity=10,
+            category=self.category, supplier=self.supplier
+        )
+
+    def test_repeated_list_is_served_from_cache(self):
+        """Test that a repeated list request runs no queries"""
+        url = reverse('category-list')
+        first = self.client.get(url)
+        self.assertEqual(first['X-Cache'], 'miss')
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(url)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(second['X-Cache'], 'hit')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_query_params_are_cached_separately(self):
+        """Test that different filters do not share an entry"""
+        Category.objects.create(name="Other Category")
+        url = reverse('category-list')
+        self.assertEqual(len(self.client.get(url).data['results']), 2)
+        response = self.client.get(url, {'search': 'other'})
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Other Category'])
+
+    def test_if_none_match_returns_not_modified(self):
+        """Test that an unchanged list returns 304 without a body"""
+        url = reverse('supplier-list')
+        etag = self.client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_if_none_match_star_needs_a_current_representation(self):
+        """Test that If-None-Match: * answers 304 for an existing object only, missing ones still 404"""
+        url = reverse('product-detail', args=[self.product.pk])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], self.client.get(url)['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, status.HTTP_304_NOT_MODIFIED)
+
+        missing = reverse('product-detail', args=[self.product.pk + 1000])
+        response = self.client.get(missing, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_writes_invalidate_cached_lists(self):
+        """Test that creating through the API changes the list and its ETag"""
+        url = reverse('category-list')
+        etag = self.client.get(url)['ETag']
+        self.client.post(url, {'name': 'New Category'}, format='json')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_related_changes_invalidate_products(self):
+        """Test that renaming a category refreshes cached product responses"""
+        url = reverse('product-detail', args=[self.product.pk])
+        self.client.get(url)
+        self.category.name = "Renamed Category"
+        self.category.save()
+        self.assertEqual(self.client.get(url).data['category_name'], "Renamed Category")
+
+    def test_stock_changes_invalidate_products(self):
+        """Test that writes which bypass save signals still invalidate"""
+        url = reverse('product-detail', args=[self.product.pk])
+        self.client.get(url)
+        self.client.post(
+            reverse('product-adjust-stock', args=[self.product.pk]),
+            {'adjustment_type': 'subtract', 'quantity': 3}, format='json'
+        )
+        self.assertEqual(self.client.get(url).data['quantity'], 7)
+
+        stock.bulk_adjust_stock([{'line': 0, 'id': self.product.pk, 'delta': 5}])
+        self.assertEqual(self.client.get(url).data['quantity'], 12)
+
+
+class ProductImageRenditionTests(APITestCase):
+    """Test the resized copies generated for product images"""
+
+    def setUp(self):
+        """Set up test data"""
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media_root.name, PRODUCT_IMAGE_WORKERS=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+
+    def upload(self, name='photo.png', size=(1200, 800)):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_upload_generates_renditions(self):
+        """Test that uploading through the API produces thumb and medium images"""
+        from PIL import Image
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('product-list'), {
+                'name': 'Photo Product', 'sku': 'IMG001', 'price': '5.00',
+                'category': self.category.id, 'supplier': self.supplier.id,
+                'image': self.upload(),
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        product = Product.objects.get(sku='IMG001')
+        self.assertEqual(product.image_renditions['source'], product.image.name)
+        with product.image.storage.open(product.image_renditions['thumb']) as f:
+            self.assertEqual(Image.open(f).size, (100, 67))
+        with product.image.storage.open(product.image_renditions['medium']) as f:
+            self.assertEqual(Image.open(f).size, (600, 400))
+
+        data = self.client.get(reverse('product-detail', args=[product.pk])).data
+        self.assertTrue(data['image_thumb'].endswith('/media/products/photo.thumb.webp'))
+        self.assertTrue(data['image_medium'].endswith('/media/products/photo.medium.webp'))
+
+    def test_renditions_bump_version(self):
+        """Test that recording renditions changes the version and so the ETag"""
+        product = Product.objects.create(
+            name='Versioned', sku='IMG003', price=1, image=self.upload('versioned.png'),
+            category=self.category, supplier=self.supplier
+        )
+        version = Product.objects.get(pk=product.pk).version
+        url = reverse('product-detail', args=[product.pk])
+        etag = self.client.get(url)['ETag']
+
+        images.save_renditions(product.pk, images.generate_renditions(product.image.name))
+        self.assertEqual(Product.objects.get(pk=product.pk).version, version + 1)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_original_is_served_until_renditions_exist(self):
+        """Test that the serializer falls back to the original image"""
+        product = Product.objects.create(
+            name='Pending', sku='IMG002', price=1, image=self.upload('pending.png'),
+            category=self.category, supplier=self.supplier
+        )
+        data = self.client.get(reverse('product-detail', args=[product.pk])).data
+        self.assertEqual(data['image_thumb'], data['image'])
+        self.assertEqual(data['image_medium'], data['image'])
+
+    def test_backfill_command(self):
+        """Test that the command renders images that have no renditions yet"""
+        for index in range(3):
+            Product.objects.create(
+                name=f'Old {index}', sku=f'OLD{index}', price=1, image=self.upload(f'old{index}.png'),
+                category=self.category, supplier=self.supplier
+            )
+        Product.objects.create(name='No image', sku='NOIMG', price=1, category=self.category, supplier=self.supplier)
+
+        out = io.StringIO()
+        call_command('generate_image_renditions', workers=2, stdout=out)
+        self.assertIn('Generated renditions for 3 images', out.getvalue())
+        for product in Product.objects.exclude(image=''):
+            self.assertEqual(product.image_renditions['source'], product.image.name)
+            self.assertTrue(product.image.storage.exists(product.image_renditions['thumb']))
+
+        out = io.StringIO()
+        call_command('generate_image_renditions', stdout=out)
+        self.assertIn('already have renditions', out.getvalue())
+
+
+class LoadDataTests(TestCase):
+    """Test the synthetic load data generator"""
+
+    def test_generate_load_data_appends(self):
+        """Test that repeated runs add rows with fresh names, SKUs and past timestamps"""
+        out = io.StringIO()
+        call_command(
+            'generate_load_data', categories=3, suppliers=2, products=50, movements=200,
+            batch_size=20, seed=1, stdout=out
+        )
+        self.assertIn('Added 3 categories, 2 suppliers, 50 products and 200 movements', out.getvalue())
+        call_command('generate_load_data', categories=1, suppliers=0, products=25, movements=0, stdout=out)
+
+        self.assertEqual(Category.objects.count(), 4)
+        self.assertEqual(Supplier.objects.count(), 2)
+        self.assertEqual(Product.objects.count(), 75)
+        self.assertEqual(Product.objects.values('sku').distinct().count(), 75)
+        self.assertEqual(StockMovement.objects.exclude(reason='Opening stock').count(), 200)
+
+        now = timezone.now()
+        timestamps = StockMovement.objects.values_list('timestamp', flat=True)
+        self.assertTrue(all(now - timedelta(days=366) < ts <= now for ts in timestamps))
+        self.assertGreater(len(set(timestamps)), 100)
+
+    def test_generated_stock_matches_movements(self):
+        """Test that product quantities and stock levels are the net of the generated movements"""
+        call_command(
+            'generate_load_data', categories=2, suppliers=2, products=10, movements=300,
+            batch_size=40, seed=3, stdout=io.StringIO()
+        )
+        net = dict(
+            StockMovement.objects.values('product').annotate(net=Sum(StockMovement.net_quantity()))
+            .values_list('product', 'net')
+        )
+        levels = dict(
+            StockLevel.objects.filter(location=Location.default()).values_list('product', 'quantity')
+        )
+        for product in Product.objects.all():
+            self.assertGreaterEqual(product.quantity, 0)
+            self.assertEqual(product.quantity, net.get(product.pk, 0))
+            self.assertEqual(product.quantity, levels.get(product.pk, 0))
+        self.assertEqual(StockMovement.objects.filter(location__isnull=True).count(), 0)
+
+    def test_products_need_lookups(self):
+        """Test that products cannot be generated without categories and suppliers"""
+        with self.assertRaises(CommandError):
+            call_command('generate_load_data', categories=0, suppliers=0, products=5, movements=0)
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0, REQUEST_METRICS_DUPLICATE_THRESHOLD=3)
+class QueryMetricsMiddlewareTests(APITestCase):
+    """Test the per-request query instrumentation"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        middleware.registry.reset()
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        for index in range(4):
+            Product.objects.create(
+                name=f"Product {index}", sku=f"MET{index:03d}", price=1,
+                category=self.category, supplier=self.supplier
+            )
+
+    def timings(self, response):
+        return dict(
+            entry.split(';', 1) for entry in response['Server-Timing'].split(', ')
+        )
+
+    def test_server_timing_header(self):
+        """Test that sampled requests report SQL, render and total time"""
+        response = self.client.get(reverse('product-list'))
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'app', 'render', 'total'})
+        self.assertIn('desc="1 queries"', timings['db'])
+
+    def test_duplicate_queries_are_flagged(self):
+        """Test that an N+1 query pattern is detected"""
+        from .views import ProductViewSet
+        with mock.patch.object(ProductViewSet, 'queryset', Product.objects.all()), \
+                self.assertLogs('inventory.middleware', 'WARNING'):
+            response = self.client.get(reverse('product-list'))
+        self.assertIn('dup', self.timings(response))
+
+        metrics = self.client.get('/api/_metrics/').content.decode()
+        self.assertIn(
+            'http_requests_with_duplicate_queries_total{method="GET",route="product-list",status="200"} 1',
+            metrics
+        )
+
+    def test_metrics_endpoint(self):
+        """Test the Prometheus histograms per route"""
+        self.client.get(reverse('product-list'))
+        self.client.get(reverse('product-list'))
+        self.client.get(reverse('product-detail', args=[Product.objects.first().pk]))
+
+        response = self.client.get('/api/_metrics/')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        metrics = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', metrics)
+        self.assertIn('http_request_queries_count{method="GET",route="product-list",status="200"} 2', metrics)
+        self.assertIn('http_request_queries_bucket{method="GET",route="product-detail",status="200",le="1"} 1', metrics)
+        self.assertNotIn('route="metrics"', metrics)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0.0)
+    def test_sampling_off(self):
+        """Test that unsampled requests are left alone"""
+        response = self.client.get(reverse('product-list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('route="product-list"', self.client.get('/api/_metrics/').content.decode())
+
+
+class AsyncEndpointTests(APITestCase):
+    """Test that the async read endpoints match their DRF counterparts"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.category = Category.objects.create(name="Test Category")
+        self.other = Category.objects.create(name="Other Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        for index in range(5):
+            Product.objects.create(
+                name=f"Async Product {index}", sku=f"ASY{index:03d}", price='2.50', quantity=index,
+                min_stock_level=2, category=self.category if index % 2 else self.other, supplier=self.supplier
+            )
+        for product in Product.objects.all():
+            StockMovement.objects.create(product=product, quantity=3, movement_type='IN')
+        StockMovement.objects.create(product=product, quantity=1, movement_type='OUT')
+
+    async def test_product_list_matches_sync(self):
+        """Test filtering, search and paging on the async product list"""
+        for params in [{}, {'category': self.category.pk}, {'search': 'async'}, {'is_active': 'false'}]:
+            expected = (await self.async_client.get('/api/products/', params)).json()
+            response = await self.async_client.get('/api/async/products/', params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()['results'], expected['results'])
+
+        first = (await self.async_client.get('/api/async/products/', {'page_size': 3})).json()
+        self.assertIn('/api/async/products/', first['next'])
+        second = (await self.async_client.get(first['next'])).json()
+        self.assertEqual(
+            [row['sku'] for row in first['results'] + second['results']],
+            [f'ASY{index:03d}' for index in range(5)]
+        )
+        self.assertIsNone(second['next'])
+
+    async def test_invalid_filters(self):
+        """Test that filter validation errors and bad cursors are reported"""
+        response = await self.async_client.get('/api/async/products/', {'category': 999999})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('category', response.json())
+        response = await self.async_client.get('/api/async/stock-movements/', {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_product_detail(self):
+        """Test the async product detail and its 404"""
+        product = await Product.objects.aget(sku='ASY001')
+        expected = (await self.async_client.get(f'/api/products/{product.pk}/')).json()
+        response = await self.async_client.get(f'/api/async/products/{product.pk}/')
+        self.assertEqual(response.json(), expected)
+        response = await self.async_client.get('/api/async/products/999999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_stock_movement_list(self):
+        """Test the async movement list with a filter"""
+        params = {'movement_type': 'IN'}
+        expected = (await self.async_client.get('/api/stock-movements/', params)).json()
+        response = await self.async_client.get('/api/async/stock-movements/', params)
+        self.assertEqual(response.json()['results'], expected['results'])
+        self.assertEqual(len(expected['results']), 5)
+
+    async def test_dashboard_summary(self):
+        """Test the async dashboard summary and its validation"""
+        expected = (await self.async_client.get('/api/dashboard/summary/')).json()
+        data = (await self.async_client.get('/api/async/dashboard/summary/')).json()
+        for key in ('products', 'low_stock', 'stock_by_category', 'movements'):
+            self.assertEqual(data[key], expected[key])
+        response = await self.async_client.get('/api/async/dashboard/summary/', {'days': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'error': 'days must be between 1 and 365'})
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0)
+    async def test_async_requests_are_instrumented(self):
+        """Test that the metrics middleware sees queries run by the async ORM"""
+        response = await self.async_client.get('/api/async/products/')
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+
+class QuietBroadcaster(streams.StockBroadcaster):
+    """A broadcaster whose polling thread does nothing, polled by the test instead"""
+
+    def run(self):
+        pass
+
+
+class StockStreamTests(APITestCase):
+    """Test the server-sent event stream of stock movements"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.product = Product.objects.create(
+            name="Streamed Product", sku="STR001", price='1.00', quantity=10, min_stock_level=5,
+            category=self.category, supplier=self.supplier
+        )
+        self.first = StockMovement.objects.create(product=self.product, quantity=4, movement_type='IN')
+
+    def add_movements(self, count):
+        movements = []
+        for _ in range(count):
+            movements.append(stock.adjust_stock(self.product, -1))
+        return movements
+
+    def test_render(self):
+        """Test that each product's last movement in a batch is followed by its stock"""
+        movements = self.add_movements(2)
+        entries = streams.render(streams.movements_after(self.first.pk))
+        self.assertEqual([pk for pk, _ in entries], [movement.pk for movement in movements])
+        self.assertEqual(entries[0][1].count('event: '), 1)
+        self.assertTrue(entries[0][1].startswith(f'id: {movements[0].pk}\nevent: movement\n'))
+        movement_event, stock_event = entries[1][1].strip().split('\n\n')
+        self.assertIn(f'id: {movements[1].pk}', movement_event)
+        self.assertNotIn('id: ', stock_event)
+        self.assertEqual(json.loads(stock_event.split('data: ')[1]), {
+            'product': self.product.pk, 'quantity': 8, 'min_stock_level': 5, 'is_low_stock': False,
+        })
+
+    def test_movements_committed_out_of_order_are_not_skipped(self):
+        """Test that movements after a recent gap in the ids wait for it to fill or time out"""
+        first, late, last = self.add_movements(3)
+        # `late` has its id but its transaction has not committed yet
+        StockMovement.objects.filter(pk=late.pk).delete()
+        self.assertEqual([movement.pk for movement in streams.movements_after(self.first.pk)], [first.pk])
+        self.assertEqual(streams.last_movement_id(), first.pk)
+
+        StockMovement.objects.bulk_create([late])
+        self.assertEqual(
+            [movement.pk for movement in streams.movements_after(first.pk)], [late.pk, last.pk]
+        )
+
+        # A gap that never fills, such as a rolled back transaction's, is passed once it is old
+        StockMovement.objects.filter(pk=late.pk).delete()
+        self.assertEqual(streams.movements_after(first.pk), [])
+        with override_settings(EVENT_ID_GAP_TIMEOUT=0):
+            self.assertEqual([movement.pk for movement in streams.movements_after(first.pk)], [last.pk])
+            self.assertEqual(streams.last_movement_id(), last.pk)
+
+    @override_settings(STOCK_STREAM_BUFFER=3)
+    def test_broadcaster_buffer(self):
+        """Test that polling buffers new movements and forgets the oldest"""
+        broadcaster = QuietBroadcaster()
+        self.assertIsNone(broadcaster.buffered_after(self.first.pk))
+        broadcaster.poll()
+        self.assertEqual(broadcaster.buffered_after(self.first.pk), [])
+        movements = self.add_movements(4)
+        broadcaster.poll()
+        self.assertEqual(broadcaster.last_id, movements[-1].pk)
+        # The first new movement fell out of the buffer
+        self.assertIsNone(broadcaster.buffered_after(self.first.pk))
+        entries = broadcaster.buffered_after(movements[0].pk)
+        self.assertEqual([pk for pk, _ in entries], [movement.pk for movement in movements[1:]])
+        self.assertEqual(broadcaster.buffered_after(movements[-1].pk), [])
+
+    async def read_stream(self, events):
+        chunks = []
+        async for chunk in events:
+            chunks.append(chunk)
+            if chunk.startswith(': keep-alive'):
+                break
+        await events.aclose()
+        return chunks
+
+    @override_settings(STOCK_STREAM_HEARTBEAT=0.01)
+    async def test_resume_from_database(self):
+        """Test that a stream behind the buffer catches up from the database, then keeps alive"""
+        movements = await sync_to_async(self.add_movements)(2)
+        broadcaster = QuietBroadcaster()
+        chunks = await self.read_stream(streams.stock_events(self.first.pk, broadcaster=broadcaster))
+        self.assertEqual(chunks[0], 'retry: 3000\n\n')
+        self.assertEqual(chunks[-1], ': keep-alive\n\n')
+        body = ''.join(chunks[1:-1])
+        self.assertEqual(body.count('event: movement'), 2)
+        self.assertEqual(body.count('event: stock'), 1)
+        self.assertIn(f'id: {movements[-1].pk}\n', body)
+        self.assertFalse(broadcaster.subscribers)
+
+    @override_settings(STOCK_STREAM_HEARTBEAT=0.01)
+    async def test_stream_from_buffer(self):
+        """Test that a stream reads what the broadcaster buffered and starts from now by default"""
+        broadcaster = QuietBroadcaster()
+        await sync_to_async(broadcaster.poll)()
+        events = streams.stock_events(broadcaster=broadcaster)
+        self.assertEqual(await anext(events), 'retry: 3000\n\n')
+        self.assertEqual(await anext(events), ': keep-alive\n\n')
+        movements = await sync_to_async(self.add_movements)(1)
+        await sync_to_async(broadcaster.poll)()
+        with mock.patch.object(streams, 'movements_after', side_effect=AssertionError):
+            chunk = await anext(events)
+        self.assertTrue(chunk.startswith(f'id: {movements[0].pk}\nevent: movement\n'))
+        await events.aclose()
+        self.assertFalse(broadcaster.subscribers)
+
+    async def test_endpoint(self):
+        """Test the stream's headers and the validation of its starting point"""
+        response = await self.async_client.get('/api/stream/stock/', {'after': self.first.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        response = await self.async_client.get('/api/stream/stock/', {'after': 'latest'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'error': 'after must be a movement id'})
+        response = await self.async_client.get('/api/stream/stock/', headers={'Last-Event-ID': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(STOCK_STREAM_SECONDS=0.3, STOCK_STREAM_HEARTBEAT=0.1, STOCK_STREAM_POLL_INTERVAL=0.05)
+    def test_endpoint_under_wsgi(self):
+        """Test that WSGI servers get a sync stream that polls the database itself"""
+        movements = self.add_movements(2)
+        response = self.client.get('/api/stream/stock/', {'after': self.first.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.is_async)
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), b'retry: 3000\n\n')
+        body = next(chunks).decode()
+        self.assertEqual(body.count('event: movement'), 2)
+        self.assertIn(f'id: {movements[-1].pk}\n', body)
+        self.assertIn(b': keep-alive', b''.join(chunks))
+
+
+class LowStockAlertTests(APITestCase):
+    """Test the incrementally maintained low-stock alerts and their feed"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.product = Product.objects.create(
+            name="Widget", sku="ALERT001", price='5.00', quantity=10, min_stock_level=3,
+            category=self.category, supplier=self.supplier
+        )
+
+    def adjust(self, adjustment_type, quantity):
+        return self.client.post(
+            f'/api/products/{self.product.pk}/adjust_stock/',
+            {'adjustment_type': adjustment_type, 'quantity': quantity}, format='json'
+        )
+
+    def test_adjustment_crossing_minimum_triggers_and_clears(self):
+        """Test that alerts open and close only when stock crosses the minimum"""
+        self.assertFalse(LowStockAlert.objects.exists())
+        self.adjust('subtract', 7)
+        alert = LowStockAlert.objects.get()
+        self.assertTrue(alert.is_open)
+        self.assertEqual((alert.quantity, alert.min_stock_level), (3, 3))
+
+        self.adjust('subtract', 1)
+        self.assertEqual(LowStockAlert.objects.count(), 1)
+
+        self.adjust('add', 5)
+        alert.refresh_from_db()
+        self.assertIsNotNone(alert.cleared_at)
+        self.assertEqual(
+            list(LowStockAlertEvent.objects.values_list('event_type', 'quantity')),
+            [('triggered', 3), ('cleared', 7)]
+        )
+
+    def test_adjustment_without_crossing_skips_evaluation(self):
+        """Test that stock changes away from the minimum don't query alerts"""
+        with CaptureQueriesContext(connection) as ctx:
+            stock.adjust_stock(self.product, -2)
+        self.assertFalse(any('lowstockalert' in query['sql'] for query in ctx.captured_queries))
+
+    def test_threshold_and_active_changes(self):
+        """Test that editing the minimum level or deactivating re-evaluates"""
+        response = self.client.patch(
+            f'/api/products/{self.product.pk}/', {'min_stock_level': 10}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(LowStockAlert.objects.filter(product=self.product, cleared_at=None).exists())
+
+        self.client.patch(f'/api/products/{self.product.pk}/', {'is_active': False}, format='json')
+        self.assertFalse(LowStockAlert.objects.filter(cleared_at=None).exists())
+
+        new = Product.objects.create(
+            name="Empty", sku="ALERT002", price='1.00', quantity=0, min_stock_level=0,
+            category=self.category, supplier=self.supplier
+        )
+        self.assertTrue(LowStockAlert.objects.filter(product=new, cleared_at=None).exists())
+
+    def test_bulk_paths_evaluate_touched_products(self):
+        """Test bulk adjustments and imports keep alerts current"""
+        applied, _ = stock.bulk_adjust_stock([{'line': 0, 'id': self.product.pk, 'delta': -9}])
+        self.assertTrue(applied)
+        self.assertTrue(LowStockAlert.objects.filter(product=self.product, cleared_at=None).exists())
+
+        upload = SimpleUploadedFile(
+            'products.csv',
+            b'sku,name,price,quantity,min_stock_level,category,supplier\n'
+            b'ALERT001,Widget,5.00,50,3,Test Category,Test Supplier\n'
+            b'ALERT003,Gadget,5.00,1,5,Test Category,Test Supplier\n'
+        )
+        response = self.client.post('/api/products/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(LowStockAlert.objects.filter(cleared_at=None).values_list('product__sku', flat=True)),
+            ['ALERT003']
+        )
+
+    def test_refresh_command_reconciles(self):
+        """Test that writes bypassing the app are picked up by refresh_low_stock_alerts"""
+        Product.objects.filter(pk=self.product.pk).update(quantity=0)
+        self.assertFalse(LowStockAlert.objects.exists())
+        call_command('refresh_low_stock_alerts', stdout=io.StringIO())
+        self.assertTrue(LowStockAlert.objects.filter(product=self.product, cleared_at=None).exists())
+        self.assertEqual(alerts.evaluate(), (0, 0))
+
+    def test_list_endpoint(self):
+        """Test listing open and cleared alerts"""
+        self.adjust('subtract', 8)
+        self.adjust('add', 8)
+        self.adjust('subtract', 9)
+
+        response = self.client.get('/api/alerts/low-stock/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        result = response.data['results'][0]
+        self.assertEqual((result['product_sku'], result['current_quantity'], result['is_open']), ('ALERT001', 1, True))
+
+        response = self.client.get('/api/alerts/low-stock/', {'state': 'cleared'})
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get('/api/alerts/low-stock/', {'state': 'all'})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get('/api/alerts/low-stock/', {'state': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_event_feed_waits_for_gaps(self):
+        """Test that alert events after a recent gap in the ids are held back until it fills"""
+        self.adjust('subtract', 8)
+        self.adjust('add', 8)
+        self.adjust('subtract', 8)
+        triggered, cleared, again = LowStockAlertEvent.objects.order_by('id')
+        LowStockAlertEvent.objects.filter(pk=cleared.pk).delete()
+        self.assertEqual(alerts.events_after(0), [triggered])
+        self.assertEqual(alerts.last_event_id(), triggered.pk)
+        LowStockAlertEvent.objects.bulk_create([cleared])
+        self.assertEqual(alerts.events_after(triggered.pk), [cleared, again])
+
+    def test_event_long_poll(self):
+        """Test reading the event feed with a cursor"""
+        response = self.client.get('/api/alerts/low-stock/events/', {'timeout': 0})
+        self.assertEqual(response.data, {'events': [], 'last_id': 0})
+
+        self.adjust('subtract', 8)
+        self.adjust('add', 8)
+        response = self.client.get('/api/alerts/low-stock/events/', {'after': 0, 'timeout': 0})
+        events = response.data['events']
+        self.assertEqual([event['event_type'] for event in events], ['triggered', 'cleared'])
+        self.assertEqual(events[0]['product_sku'], 'ALERT001')
+        self.assertEqual(response.data['last_id'], events[-1]['id'])
+
+        response = self.client.get(
+            '/api/alerts/low-stock/events/', {'after': response.data['last_id'], 'timeout': 0}
+        )
+        self.assertEqual(response.data['events'], [])
+        response = self.client.get('/api/alerts/low-stock/events/', {'timeout': 120})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(LOW_STOCK_FEED_STREAM_SECONDS=0.3, LOW_STOCK_FEED_HEARTBEAT=0.1, LOW_STOCK_FEED_POLL_INTERVAL=0.05)
+    async def test_event_stream(self):
+        """Test the server-sent events feed resumes from Last-Event-ID"""
+        await sync_to_async(self.adjust)('subtract', 8)
+        await sync_to_async(self.adjust)('add', 8)
+        first = await LowStockAlertEvent.objects.order_by('id').afirst()
+
+        status_code, headers, body, _, _ = await asgi_get(
+            '/api/alerts/low-stock/events/',
+            headers=[(b'accept', b'text/event-stream'), (b'last-event-id', str(first.pk).encode())]
+        )
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(headers[b'Content-Type'], b'text/event-stream')
+        self.assertNotIn('event: triggered', body)
+        self.assertIn(f'id: {first.pk + 1}\nevent: cleared\ndata: {{', body)
+        self.assertIn(': keep-alive', body)
+
+    @override_settings(LOW_STOCK_FEED_STREAM_SECONDS=0.3, LOW_STOCK_FEED_HEARTBEAT=0.1, LOW_STOCK_FEED_POLL_INTERVAL=0.05)
+    def test_event_stream_under_wsgi(self):
+        """Test that WSGI servers get a sync event stream they can send as it is produced"""
+        self.adjust('subtract', 8)
+        response = self.client.get(
+            '/api/alerts/low-stock/events/', {'after': 0}, HTTP_ACCEPT='text/event-stream'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.is_async)
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), b'retry: 3000\n\n')
+        self.assertIn(b'event: triggered', next(chunks))
+        self.assertIn(b': keep-alive', b''.join(chunks))
+
+    @override_settings(LOW_STOCK_FEED_STREAM_SECONDS=30)
+    async def test_event_stream_under_asgi_is_not_buffered(self):
+        """Test that the first event reaches an ASGI client long before the stream's window closes"""
+        await sync_to_async(self.adjust)('subtract', 8)
+        status_code, _, body, first_byte, caught = await asgi_get(
+            '/api/alerts/low-stock/events/', query_string='after=0',
+            headers=[(b'accept', b'text/event-stream')], until=lambda body: 'event: triggered' in body
+        )
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertIn('event: triggered', body)
+        self.assertLess(first_byte, 5)
+        self.assertFalse([message for message in caught if 'synchronous iterators' in message])
+
+
+class ForecastTests(APITestCase):
+    """Test demand forecasting and reorder point suggestions"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier", lead_time_days=4)
+        self.steady = Product.objects.create(
+            name="Steady", sku="FC001", price='1.00', quantity=100, min_stock_level=0,
+            category=self.category, supplier=self.supplier
+        )
+        self.idle = Product.objects.create(
+            name="Idle", sku="FC002", price='1.00', quantity=100, min_stock_level=0,
+            category=self.category, supplier=self.supplier
+        )
+        # Three units out every day for the last 30 days, plus a receipt that is not demand
+        now = timezone.now()
+        for day in range(1, 31):
+            movement = StockMovement.objects.create(product=self.steady, quantity=3, movement_type='OUT')
+            StockMovement.objects.filter(pk=movement.pk).update(timestamp=now - timedelta(days=day))
+        StockMovement.objects.create(product=self.steady, quantity=50, movement_type='IN')
+
+    def test_smoothing_weights_match_recursive_smoothing(self):
+        """Test the closed form exponential smoothing against the recurrence"""
+        series = [4.0, 0.0, 2.0, 7.0, 1.0]
+        level = series[0]
+        for value in series[1:]:
+            level = 0.3 * value + 0.7 * level
+        weights = forecasting.smoothing_weights(len(series), 0.3)
+        self.assertAlmostEqual(float(weights.sum()), 1.0)
+        self.assertAlmostEqual(float(weights @ forecasting.np.array(series)), level)
+
+    def test_compute_reorder_points(self):
+        """Test the stored forecast for steady and idle products"""
+        count = forecasting.compute_reorder_points(history_days=30, window=7)
+        self.assertEqual(count, 2)
+
+        steady = ProductForecast.objects.get(product=self.steady)
+        self.assertAlmostEqual(steady.moving_average, 3.0)
+        self.assertAlmostEqual(steady.daily_demand, 3.0)
+        self.assertAlmostEqual(steady.demand_std, 0.0)
+        self.assertEqual(steady.lead_time_days, 4)
+        self.assertAlmostEqual(steady.lead_time_demand, 12.0)
+        self.assertEqual((steady.safety_stock, steady.reorder_point), (0, 12))
+        self.assertEqual(steady.reorder_quantity, 90)
+
+        idle = ProductForecast.objects.get(product=self.idle)
+        self.assertEqual((idle.daily_demand, idle.reorder_point, idle.reorder_quantity), (0.0, 0, 0))
+
+    def test_variable_demand_gets_safety_stock(self):
+        """Test that safety stock grows with demand variability and lead time"""
+        movement = StockMovement.objects.create(product=self.idle, quantity=30, movement_type='OUT')
+        StockMovement.objects.filter(pk=movement.pk).update(timestamp=timezone.now() - timedelta(days=2))
+        forecasting.compute_reorder_points(history_days=30)
+        idle = ProductForecast.objects.get(product=self.idle)
+        self.assertGreater(idle.demand_std, 0)
+        self.assertGreater(idle.safety_stock, 0)
+        self.assertEqual(idle.reorder_point, math.ceil(idle.lead_time_demand + idle.safety_stock))
+
+    def test_snapshots_and_movements_agree(self):
+        """Test that reading rolled up snapshots gives the same forecast as raw movements"""
+        forecasting.compute_reorder_points(history_days=30)
+        expected = list(ProductForecast.objects.order_by('pk').values('daily_demand', 'demand_std', 'reorder_point'))
+        snapshots.rollup()
+        self.assertTrue(StockSnapshot.objects.exists())
+        forecasting.compute_reorder_points(history_days=30)
+        self.assertEqual(
+            list(ProductForecast.objects.order_by('pk').values('daily_demand', 'demand_std', 'reorder_point')),
+            expected
+        )
+
+    def test_apply_updates_min_stock_level(self):
+        """Test --apply copies reorder points into min_stock_level and re-evaluates alerts"""
+        self.steady.quantity = 5
+        self.steady.save(create_movement=False)
+        call_command('compute_reorder_points', '--history-days', '30', '--apply', stdout=io.StringIO())
+        self.steady.refresh_from_db()
+        self.assertEqual(self.steady.min_stock_level, 12)
+        self.assertTrue(LowStockAlert.objects.filter(product=self.steady, cleared_at=None).exists())
+
+        with self.assertRaises(CommandError):
+            call_command('compute_reorder_points', '--alpha', '1.5', stdout=io.StringIO())
+
+    def test_product_api_exposes_forecast(self):
+        """Test the forecast is nested in product responses"""
+        response = self.client.get(f'/api/products/{self.steady.pk}/')
+        self.assertIsNone(response.data['forecast'])
+
+        forecasting.compute_reorder_points(history_days=30)
+        response = self.client.get(f'/api/products/{self.steady.pk}/')
+        self.assertEqual(response.data['forecast']['reorder_point'], 12)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.data['results'][0]['forecast']['reorder_quantity'], 0)
+
+
+class PurchaseSuggestionTests(APITestCase):
+    """Test grouping low-stock products into draft purchase orders"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.acme = Supplier.objects.create(name="Acme")
+        self.globex = Supplier.objects.create(name="Globex")
+
+        def product(sku, supplier, quantity, min_stock_level, **kwargs):
+            return Product.objects.create(
+                name=f"Product {sku}", sku=sku, price='2.50', quantity=quantity, min_stock_level=min_stock_level,
+                category=self.category, supplier=supplier, **kwargs
+            )
+
+        self.bolts = product('PO001', self.acme, 2, 10)
+        self.nuts = product('PO002', self.acme, 5, 5)
+        self.plenty = product('PO003', self.acme, 50, 10)
+        self.inactive = product('PO004', self.acme, 0, 10, is_active=False)
+        self.gears = product('PO005', self.globex, 0, 4)
+
+    def test_suggestions_in_one_query(self):
+        """Test target levels and quantities for the whole catalogue in a single query"""
+        ProductForecast.objects.create(
+            product=self.nuts, moving_average=1, daily_demand=1, demand_std=0, lead_time_days=7,
+            lead_time_demand=7, safety_stock=0, reorder_point=7, reorder_quantity=30, history_days=90,
+            computed_at=timezone.now()
+        )
+        with self.assertNumQueries(1):
+            rows = list(purchasing.suggestions())
+        self.assertEqual(
+            [(row['sku'], row['target_level'], row['suggested_quantity']) for row in rows],
+            [('PO001', 20, 18), ('PO002', 37, 32), ('PO005', 8, 8)]
+        )
+
+    def test_generate_drafts_is_idempotent(self):
+        """Test one draft per supplier, rewritten on every run"""
+        call_command('generate_purchase_suggestions', stdout=io.StringIO())
+        call_command('generate_purchase_suggestions', stdout=io.StringIO())
+        drafts = PurchaseOrder.objects.filter(status=PurchaseOrder.DRAFT)
+        self.assertEqual(sorted(drafts.values_list('supplier__name', flat=True)), ['Acme', 'Globex'])
+        acme = drafts.get(supplier=self.acme)
+        self.assertEqual(list(acme.lines.values_list('product__sku', 'quantity')), [('PO001', 18), ('PO002', 5)])
+
+        # Restocked: Globex has nothing left to order, so its draft goes away
+        stock.adjust_stock(self.gears, 10)
+        purchasing.generate_drafts()
+        self.assertFalse(PurchaseOrder.objects.filter(supplier=self.globex).exists())
+        self.assertTrue(PurchaseOrder.objects.filter(pk=acme.pk).exists())
+
+    def test_supplier_endpoint(self):
+        """Test reading and drafting suggestions for one supplier"""
+        url = f'/api/suppliers/{self.acme.pk}/reorder_suggestions/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([line['sku'] for line in response.data['lines']], ['PO001', 'PO002'])
+        self.assertEqual((response.data['total_quantity'], response.data['total_cost']), (23, '57.50'))
+
+        response = self.client.post(url)
+        order = response.data['order']
+        self.assertEqual((order['status'], order['supplier_name'], order['total_quantity']), ('draft', 'Acme', 23))
+        self.assertFalse(PurchaseOrder.objects.filter(supplier=self.globex).exists())
+
+        self.assertEqual(self.client.post(f'/api/suppliers/{self.globex.pk}/reorder_suggestions/').status_code, 200)
+        response = self.client.get('/api/suppliers/999999/reorder_suggestions/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_order_lifecycle(self):
+        """Test submitting and receiving an order, and on-order stock counting towards targets"""
+        order = purchasing.generate_drafts(self.acme.pk)[self.acme.pk]
+        response = self.client.post(f'/api/purchase-orders/{order.pk}/submit/')
+        self.assertEqual(response.data['status'], 'ordered')
+
+        # Ordered quantities cover the shortfall, so no new draft
+        self.assertEqual(purchasing.generate_drafts(self.acme.pk), {})
+
+        response = self.client.post(f'/api/purchase-orders/{order.pk}/receive/')
+        self.assertEqual(response.data['status'], 'received')
+        self.bolts.refresh_from_db()
+        self.assertEqual(self.bolts.quantity, 20)
+        movement = StockMovement.objects.filter(product=self.bolts).first()
+        self.assertEqual((movement.movement_type, movement.quantity), ('IN', 18))
+        self.assertEqual(movement.reference, order.reference)
+        self.assertFalse(LowStockAlert.objects.filter(product=self.bolts, cleared_at=None).exists())
+
+        response = self.client.post(f'/api/purchase-orders/{order.pk}/receive/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+        response = self.client.get('/api/purchase-orders/', {'status': 'received'})
+        self.assertEqual([result['id'] for result in response.data['results']], [order.pk])
+
+    def test_receive_fails_when_a_line_cannot_be_booked(self):
+        """Test that receiving is refused, and nothing booked, if any line's product is gone"""
+        order = purchasing.generate_drafts(self.acme.pk)[self.acme.pk]
+        purchasing.change_status(order, PurchaseOrder.ORDERED)
+        bulk_adjust_stock = stock.bulk_adjust_stock
+
+        def delete_then_adjust(lines, **kwargs):
+            # The product is deleted between reading the order's lines and booking them
+            Product.objects.filter(pk=self.nuts.pk).delete()
+            return bulk_adjust_stock(lines, **kwargs)
+
+        with mock.patch.object(stock, 'bulk_adjust_stock', delete_then_adjust):
+            response = self.client.post(f'/api/purchase-orders/{order.pk}/receive/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(f'(product {self.nuts.pk}): Product not found', response.data['error'])
+        order.refresh_from_db()
+        self.assertEqual(order.status, PurchaseOrder.ORDERED)
+        self.bolts.refresh_from_db()
+        self.assertEqual(self.bolts.quantity, 2)
+        self.assertFalse(StockMovement.objects.filter(reference=order.reference).exists())
+
+
+class MovementPartitionTests(APITestCase):
+    """Test archiving old stock movement months and reading them back"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.product = Product.objects.create(
+            name="Logged", sku="AR001", price='1.00', quantity=100,
+            category=self.category, supplier=self.supplier
+        )
+        self.today = timezone.localdate()
+        now = timezone.now()
+        for days_ago in (400, 300, 200, 120, 30, 0):
+            movement = StockMovement.objects.create(
+                product=self.product, quantity=days_ago or 1, movement_type='IN', reference=f'R{days_ago}'
+            )
+            StockMovement.objects.filter(pk=movement.pk).update(timestamp=now - timedelta(days=days_ago))
+        self.cutoff = partitions.hot_cutoff(self.today, hot_months=3)
+        self.old_ids = set(
+            StockMovement.objects.filter(timestamp__lt=partitions.start_of_day(self.cutoff))
+            .values_list('id', flat=True)
+        )
+
+    def test_add_months(self):
+        """Test month arithmetic across year boundaries"""
+        self.assertEqual(partitions.add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(partitions.add_months(date(2025, 1, 1), -1), date(2024, 12, 1))
+        self.assertEqual(partitions.partition_name(date(2025, 3, 1)), 'inventory_stockmovement_p2025_03')
+
+    def test_partitions_index_ids_uniquely(self):
+        """Test that every movement partition has a unique index on id, as the primary key cannot enforce it"""
+        if connection.vendor != 'postgresql':
+            self.skipTest('PostgreSQL only')
+        partitions.ensure_partitions(ahead=1, today=self.today)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname, EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = c.relname || '_id_uniq') "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass",
+                [partitions.HOT_TABLE]
+            )
+            indexed = dict(cursor.fetchall())
+        self.assertIn(partitions.partition_name(self.today.replace(day=1)), indexed)
+        self.assertTrue(all(indexed.values()))
+
+    def test_rotation_waits_for_snapshots(self):
+        """Test that months not rolled up into snapshots are never archived"""
+        out = io.StringIO()
+        call_command('rotate_movement_partitions', '--hot-months', '3', stdout=out)
+        self.assertIn('Nothing archived', out.getvalue())
+        self.assertFalse(ArchivedStockMovement.objects.exists())
+
+        # Rolled up only through 250 days ago: later months have to stay
+        snapshots.rollup(until=self.today - timedelta(days=250))
+        partitions.rotate(hot_months=3, today=self.today)
+        rolled_up = StockSnapshot.objects.latest('date').date
+        boundary = partitions.start_of_day(partitions.month_start(rolled_up + timedelta(days=1)))
+        archived = set(ArchivedStockMovement.objects.values_list('id', flat=True))
+        self.assertTrue(archived)
+        self.assertLess(archived, self.old_ids)
+        self.assertFalse(ArchivedStockMovement.objects.filter(timestamp__gte=boundary).exists())
+        self.assertFalse(StockMovement.objects.filter(timestamp__lt=boundary).exists())
+
+    def test_rotation_moves_old_months(self):
+        """Test that rows before the hot window move to the archive with their ids"""
+        snapshots.rollup()
+        stock_before = snapshots.stock_at(self.product, self.today - timedelta(days=150))[0]
+        out = io.StringIO()
+        call_command('rotate_movement_partitions', '--hot-months', '3', '--batch-size', '1', stdout=out)
+        self.assertIn(f'Archived {len(self.old_ids)} movements', out.getvalue())
+
+        self.assertEqual(set(ArchivedStockMovement.objects.values_list('id', flat=True)), self.old_ids)
+        self.assertFalse(StockMovement.objects.filter(pk__in=self.old_ids).exists())
+        self.assertEqual(StockMovement.objects.count(), 6 - len(self.old_ids))
+        self.assertEqual(snapshots.stock_at(self.product, self.today - timedelta(days=150))[0], stock_before)
+
+        # Nothing left to move
+        self.assertEqual(partitions.rotate(hot_months=3, today=self.today)[2], 0)
+
+    def test_list_reads_archive_when_date_range_reaches_it(self):
+        """Test that recent reads skip the archive and older date ranges page through both"""
+        snapshots.rollup()
+        partitions.rotate(hot_months=3, today=self.today)
+        url = reverse('stockmovement-list')
+        expected = list(
+            StockMovement.objects.order_by('-timestamp', '-id').values_list('id', flat=True)
+        ) + list(ArchivedStockMovement.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 6 - len(self.old_ids))
+
+        date_from = (self.today - timedelta(days=500)).isoformat()
+        response = self.client.get(url, {'date_from': date_from})
+        self.assertEqual([row['id'] for row in response.data['results']], expected)
+        self.assertEqual(response.data['results'][-1]['product_name'], 'Logged')
+
+        ids = []
+        response = self.client.get(url, {'date_from': date_from, 'page_size': 2})
+        while True:
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            last_page = response
+            response = self.client.get(response.data['next'])
+        self.assertEqual(ids, expected)
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual(previous.data['results'], last_page.data['results'])
+
+        # Filters apply to archived rows too
+        response = self.client.get(url, {'date_from': date_from, 'search': 'R300'})
+        self.assertEqual([row['reference'] for row in response.data['results']], ['R300'])
+
+    def test_export_and_async_list_include_archive(self):
+        """Test that the CSV export and the async list also reach archived months"""
+        snapshots.rollup()
+        partitions.rotate(hot_months=3, today=self.today)
+        date_from = (self.today - timedelta(days=500)).isoformat()
+
+        response = self.client.get(reverse('stockmovement-export-csv'), {'date_from': date_from})
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 7)
+
+        response = self.client.get('/api/async/stock-movements/', {'date_from': date_from})
+        self.assertEqual(len(response.json()['results']), 6)
+
+
+class ColdArchiveTests(APITestCase):
+    """Test archiving old stock movements to compressed files"""
+
+    def setUp(self):
+        """Set up test data"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(MOVEMENT_ARCHIVE_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.product = Product.objects.create(
+            name="Logged", sku="CA001", price='1.00', quantity=100,
+            category=self.category, supplier=self.supplier
+        )
+        self.other = Product.objects.create(
+            name="Other", sku="CA002", price='1.00', quantity=100,
+            category=self.category, supplier=self.supplier
+        )
+        self.today = timezone.localdate()
+        now = timezone.now()
+        for days_ago, product, movement_type in (
+            (400, self.product, 'IN'), (395, self.other, 'OUT'), (300, self.product, 'OUT'),
+            (200, self.product, 'ADJ'), (30, self.product, 'IN'), (0, self.product, 'IN'),
+        ):
+            movement = StockMovement.objects.create(
+                product=product, quantity=days_ago or 1, movement_type=movement_type, reference=f'R{days_ago}'
+            )
+            StockMovement.objects.filter(pk=movement.pk).update(timestamp=now - timedelta(days=days_ago))
+        snapshots.rollup()
+        self.expected = list(StockMovement.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        # Main table for the last 8 months, the archive table for the months before
+        partitions.rotate(hot_months=8, today=self.today)
+        self.cutoff = cold_storage.cold_cutoff(self.today, months=11)
+
+    def archive(self):
+        return cold_storage.archive_before(self.cutoff)
+
+    def database_ids(self):
+        return set(StockMovement.objects.values_list('id', flat=True)) | set(
+            ArchivedStockMovement.objects.values_list('id', flat=True)
+        )
+
+    def test_archive_moves_months_to_files(self):
+        """Test that old months leave the database for files with balances recorded"""
+        stock_before = snapshots.stock_at(self.product, self.today - timedelta(days=390))[0]
+        out = io.StringIO()
+        call_command('archive_stock_movements', '--months', '11', stdout=out)
+        self.assertIn('Archived 2 movements', out.getvalue())
+
+        archives = list(MovementArchive.objects.order_by('month'))
+        self.assertEqual(sum(archive.row_count for archive in archives), 2)
+        archived_ids = {row[0] for archive in archives for row in cold_storage.read_rows(archive.path)}
+        self.assertEqual(archived_ids | self.database_ids(), set(self.expected))
+        self.assertFalse(archived_ids & self.database_ids())
+
+        balance = MovementArchiveBalance.objects.get(product=self.product)
+        self.assertEqual((balance.in_total, balance.out_total, balance.adj_total), (400, 0, 0))
+        self.assertEqual(balance.closing_quantity - balance.opening_quantity, 400)
+        self.assertEqual(MovementArchiveBalance.objects.get(product=self.other).out_total, 395)
+        self.assertEqual(snapshots.stock_at(self.product, self.today - timedelta(days=390))[0], stock_before)
+
+        # Repeating is a no-op
+        self.assertEqual(self.archive(), ([], 0))
+
+    def test_interrupted_archive_resumes(self):
+        """Test that rows left behind by an interrupted run are removed without duplicates"""
+        self.archive()
+        archive = MovementArchive.objects.get(balances__product=self.product)
+        row = next(cold_storage.read_rows(archive.path))
+        ArchivedStockMovement.objects.bulk_create(
+            [ArchivedStockMovement(**dict(zip(cold_storage.COLUMNS, row)))]
+        )
+        row_count = archive.row_count
+        cold_storage.archive_month(archive.month)
+        archive.refresh_from_db()
+        self.assertEqual(archive.row_count, row_count)
+        self.assertEqual(len(list(cold_storage.read_rows(archive.path))), row_count)
+        self.assertFalse(ArchivedStockMovement.objects.filter(pk=row[0]).exists())
+
+    def test_archive_refuses_rows_that_disagree_with_snapshots(self):
+        """Test that nothing is archived when movements changed after the rollup"""
+        StockSnapshot.objects.filter(product=self.other).update(out_total=1)
+        with self.assertRaises(CommandError):
+            call_command('archive_stock_movements', '--months', '11', stdout=io.StringIO())
+        self.assertTrue(ArchivedStockMovement.objects.filter(reference='R395').exists())
+        self.assertFalse(MovementArchive.objects.filter(balances__product=self.other).exists())
+
+    def test_list_reads_archived_files(self):
+        """Test that date filters reaching archived months page through all three tiers"""
+        self.archive()
+        url = reverse('stockmovement-list')
+        date_from = (self.today - timedelta(days=500)).isoformat()
+
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 3)
+
+        response = self.client.get(url, {'date_from': date_from})
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected)
+        self.assertEqual(response.data['results'][-1]['product_name'], 'Logged')
+
+        ids = []
+        response = self.client.get(url, {'date_from': date_from, 'page_size': 2})
+        while True:
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            last_page = response
+            response = self.client.get(response.data['next'])
+        self.assertEqual(ids, self.expected)
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual(previous.data['results'], last_page.data['results'])
+
+        for params, references in (
+            ({'product': self.other.pk}, ['R395']),
+            ({'movement_type': 'IN', 'date_to': (self.today - timedelta(days=350)).isoformat()}, ['R400']),
+            ({'search': 'r39'}, ['R395']),
+        ):
+            response = self.client.get(url, {'date_from': date_from, **params})
+            self.assertEqual([row['reference'] for row in response.data['results']], references)
+
+    def test_export_and_async_list_read_archived_files(self):
+        """Test that the CSV export and the async list also read archived files"""
+        self.archive()
+        date_from = (self.today - timedelta(days=500)).isoformat()
+
+        response = self.client.get(reverse('stockmovement-export-csv'), {'date_from': date_from})
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([int(row[0]) for row in rows[1:]], self.expected)
+        self.assertEqual(rows[-1][2:4], ['CA001', 'Logged'])
+
+        response = self.client.get('/api/async/stock-movements/', {'date_from': date_from})
+        self.assertEqual([row['id'] for row in response.json()['results']], self.expected)
+
+
+class ProductVersionTests(APITestCase):
+    """Test optimistic concurrency control on product writes"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.category = Category.objects.create(name="Versioned Category")
+        self.supplier = Supplier.objects.create(name="Versioned Supplier")
+        self.product = Product.objects.create(
+            name="Versioned Product", sku="VER001", price=5, quantity=10,
+            category=self.category, supplier=self.supplier
+        )
+        self.url = reverse('product-detail', args=[self.product.pk])
+
+    def payload(self, **changes):
+        return {
+            'name': 'Versioned Product', 'sku': 'VER001', 'price': '5.00', 'quantity': 10,
+            'min_stock_level': 10, 'category': self.category.pk, 'supplier': self.supplier.pk,
+            **changes
+        }
+
+    def test_every_write_bumps_the_version(self):
+        """Test that saves, adjustments and bulk adjustments increment the version"""
+        self.assertEqual(self.product.version, 1)
+        self.product.name = 'Renamed'
+        self.product.save()
+        self.assertEqual(self.product.version, 2)
+        stock.adjust_stock(self.product, 5)
+        self.assertEqual(self.product.version, 3)
+        stock.bulk_adjust_stock([{'line': 1, 'id': self.product.pk, 'delta': -2}])
+        self.assertEqual(Product.objects.get(pk=self.product.pk).version, 4)
+
+    def test_stale_instance_save_conflicts(self):
+        """Test that saving a copy read before another write raises VersionConflict"""
+        stale = Product.objects.get(pk=self.product.pk)
+        fresh = Product.objects.get(pk=self.product.pk)
+        fresh.price = 7
+        fresh.save()
+        stale.name = 'Lost update'
+        with self.assertRaises(VersionConflict):
+            stale.save()
+        self.assertEqual(stale.version, 1)
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual((product.name, product.price, product.version), ('Versioned Product', 7, 2))
+
+        stale.refresh_from_db()
+        stale.name = 'Applied'
+        stale.save()
+        self.assertEqual(Product.objects.get(pk=self.product.pk).name, 'Applied')
+
+    def test_unsaved_instance_for_existing_row_is_an_update(self):
+        """Test that a product built with an existing pk diffs its stock and bumps the version"""
+        product = Product(
+            pk=self.product.pk, name='Rebuilt', sku='VER001', price=5, quantity=14,
+            category=self.category, supplier=self.supplier, created_at=self.product.created_at
+        )
+        product.save()
+        self.assertEqual(product.version, 2)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).quantity, 14)
+        self.assertEqual(StockLevel.objects.get(product=self.product).quantity, 14)
+        movement = StockMovement.objects.get(product=self.product)
+        self.assertEqual((movement.movement_type, movement.quantity), ('IN', 4))
+
+        new = Product(
+            pk=self.product.pk + 100, name='New', sku='VER002', price=5, quantity=3,
+            category=self.category, supplier=self.supplier
+        )
+        new.save()
+        self.assertEqual(StockLevel.objects.get(product=new).quantity, 3)
+        self.assertFalse(StockMovement.objects.filter(product=new).exists())
+
+    def test_detail_etag_carries_the_version(self):
+        """Test that the detail ETag names the version and still answers If-None-Match"""
+        response = self.client.get(self.url)
+        self.assertTrue(response['ETag'].startswith('"v1-'))
+        self.assertEqual(response.data['version'], 1)
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_put_with_current_if_match_succeeds(self):
+        """Test that a write against the current ETag applies and returns the new one"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.put(self.url, self.payload(name='Renamed'), format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+        self.assertTrue(response['ETag'].startswith('"v2-'))
+        self.assertEqual(Product.objects.get(pk=self.product.pk).name, 'Renamed')
+
+    def test_stale_if_match_gets_409_with_current_state(self):
+        """Test that a write against an old ETag is refused with the current product"""
+        etag = self.client.get(self.url)['ETag']
+        self.client.patch(self.url, {'price': '6.00'}, format='json')
+
+        response = self.client.patch(self.url, {'name': 'Lost update'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn('error', response.data)
+        self.assertEqual(response.data['current']['version'], 2)
+        self.assertEqual(response.data['current']['price'], '6.00')
+        self.assertTrue(response['ETag'].startswith('"v2-'))
+        self.assertEqual(Product.objects.get(pk=self.product.pk).name, 'Versioned Product')
+
+    def test_body_version_and_adjust_stock_are_checked(self):
+        """Test that a stale version in the body, or on adjust_stock, conflicts too"""
+        response = self.client.put(self.url, self.payload(name='Renamed', version=1), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.put(self.url, self.payload(name='Lost update', version=1), format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        url = reverse('product-adjust-stock', args=[self.product.pk])
+        response = self.client.post(url, {'adjustment_type': 'add', 'quantity': 5}, format='json', HTTP_IF_MATCH='"v1-x"')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = self.client.post(url, {'adjustment_type': 'add', 'quantity': 5, 'version': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['product']['version'], 3)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).quantity, 15)
+
+
+class ConcurrentAdjustmentTests(TransactionTestCase):
+    """Test that concurrent writers neither lose nor double-apply stock changes"""
+
+    workers = 8
+    rounds = 25
+
+    def retry(self, attempt):
+        """
+        Run `attempt` until SQLite lets it through: the shared in-memory test
+        database fails statements on a locked table (or on the locked search
+        index table) instead of waiting, and the failed transaction has been
+        rolled back entirely.
+        """
+        while True:
+            try:
+                return attempt()
+            except OperationalError as error:
+                if 'locked' not in str(error) and 'vtable constructor failed' not in str(error):
+                    raise
+                time.sleep(0.001)
+
+    def run_workers(self, target):
+        errors = []
+
+        def run(index):
+            try:
+                target(index)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_quantity_equals_sum_of_movements(self):
+        """Test atomic adjustments and compare-and-swap saves racing on one product"""
+        category = Category.objects.create(name="Contended Category")
+        supplier = Supplier.objects.create(name="Contended Supplier")
+        product = Product.objects.create(
+            name="Contended Product", sku="RACE001", price=1, quantity=100,
+            category=category, supplier=supplier
+        )
+        conflicts = []
+
+        def adjust(delta):
+            stock.adjust_stock(Product.objects.get(pk=product.pk), delta)
+
+        def read_modify_write():
+            copy = Product.objects.get(pk=product.pk)
+            copy.quantity += 2
+            try:
+                copy.save()
+            except VersionConflict:
+                conflicts.append(copy.pk)
+                return False
+            return True
+
+        def adjuster(index):
+            for step in range(self.rounds):
+                if index % 2:
+                    self.retry(lambda: adjust(1 if step % 3 else -1) or True)
+                else:
+                    # A lost compare-and-swap is retried from a fresh read
+                    while not self.retry(read_modify_write):
+                        pass
+
+        self.run_workers(adjuster)
+
+        product.refresh_from_db()
+        net = sum(
+            movement.quantity if movement.movement_type == 'IN' else -movement.quantity
+            for movement in StockMovement.objects.filter(product=product)
+        )
+        self.assertEqual(StockMovement.objects.filter(product=product).count(), self.workers * self.rounds)
+        self.assertEqual(product.quantity, 100 + net)
+        self.assertEqual(product.version, 1 + self.workers * self.rounds)
+
+
+class ProductListTests(APITestCase):
+    """Test server-side ordering, filtering and counting of the product list"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.url = reverse('product-list')
+        self.categories = [Category.objects.create(name=name) for name in ("Tools", "Parts")]
+        self.supplier = Supplier.objects.create(name="List Supplier")
+        # Repeated prices and quantities exercise the id tie-breaker
+        for index in range(9):
+            Product.objects.create(
+                name=f"Item {index}", sku=f"LIST{8 - index:03d}", price=10 + index % 3,
+                quantity=index % 4, min_stock_level=2, is_active=index != 4,
+                category=self.categories[index % 2], supplier=self.supplier
+            )
+
+    def collect(self, params):
+        ids = []
+        response = self.client.get(self.url, {'page_size': 2, **params})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_ordering_pages_through_every_column(self):
+        """Test that each sortable column pages in order, both ways"""
+        for ordering, fields in (
+            ('price', ['price', 'id']),
+            ('-quantity', ['-quantity', '-id']),
+            ('sku', ['sku']),
+            ('-category_name', ['-category__name', '-name', '-id']),
+            ('is_active', ['is_active', 'name', 'id']),
+            ('-updated_at', ['-updated_at', '-id']),
+        ):
+            expected = list(Product.objects.order_by(*fields).values_list('id', flat=True))
+            self.assertEqual(self.collect({'ordering': ordering}), expected, ordering)
+
+    def test_unknown_ordering_falls_back_to_name(self):
+        """Test that an ordering outside the sortable columns is ignored"""
+        expected = list(Product.objects.order_by('name', 'id').values_list('id', flat=True))
+        self.assertEqual(self.collect({'ordering': 'description'}), expected)
+
+    def test_range_filters(self):
+        """Test the price, quantity, low-stock and date filters"""
+        def ids(**params):
+            return set(self.collect(params))
+
+        self.assertEqual(
+            ids(price_min=11, price_max=11.5),
+            set(Product.objects.filter(price=11).values_list('id', flat=True))
+        )
+        self.assertEqual(
+            ids(quantity_min=1, quantity_max=2, ordering='quantity'),
+            set(Product.objects.filter(quantity__in=[1, 2]).values_list('id', flat=True))
+        )
+        low = set(Product.objects.filter(is_active=True, quantity__lte=2).values_list('id', flat=True))
+        self.assertEqual(ids(low_stock='true'), low)
+        self.assertEqual(ids(low_stock='false'), set(Product.objects.values_list('id', flat=True)) - low)
+
+        today = timezone.localdate()
+        self.assertEqual(len(ids(created_from=today.isoformat(), updated_to=today.isoformat())), 9)
+        self.assertEqual(ids(created_to=(today - timedelta(days=1)).isoformat()), set())
+        response = self.client.get(self.url, {'price_min': 'cheap'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_count_on_request(self):
+        """Test that ?count=true adds the filtered total, which next links do not repeat"""
+        response = self.client.get(self.url, {'page_size': 2, 'count': 'true', 'category': self.categories[0].pk})
+        self.assertEqual((response.data['count'], response.data['count_is_estimate']), (5, False))
+        self.assertNotIn('count=', response.data['next'])
+        self.assertNotIn('count', self.client.get(response.data['next']).data)
+        self.assertNotIn('count', self.client.get(self.url).data)
+
+    def test_count_is_capped(self):
+        """Test that counting stops at the limit and reports an estimate"""
+        from .pagination import ProductPagination
+        with mock.patch.object(ProductPagination, 'count_limit', 4):
+            response = self.client.get(self.url, {'count': 'true'})
+        self.assertEqual((response.data['count'], response.data['count_is_estimate']), (4, True))
+        self.assertEqual(len(response.data['results']), 9)
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class SyncTests(APITestCase):
+    """Test the incremental sync endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.url = reverse('sync')
+        self.category = Category.objects.create(name="Sync Category")
+        self.supplier = Supplier.objects.create(name="Sync Supplier")
+        self.products = [
+            Product.objects.create(
+                name=f"Synced {index}", sku=f"SYNC{index:03d}", price=1, quantity=index,
+                category=self.category, supplier=self.supplier
+            )
+            for index in range(5)
+        ]
+
+    def poll(self, since=None, **params):
+        response = self.client.get(self.url, {**({'since': since} if since else {}), **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def ids(self, data, collection):
+        return [row['id'] for row in data[collection]]
+
+    def test_full_sync_pages_through_everything(self):
+        """Test that polling without a token returns every row, a page at a time"""
+        products, movements, token = [], [], None
+        while True:
+            data = self.poll(token, limit=2)
+            products += self.ids(data, 'products')
+            movements += self.ids(data, 'movements')
+            token = data['next']
+            if not data['has_more']:
+                break
+        self.assertEqual(products, [product.pk for product in self.products])
+        self.assertEqual(sorted(movements), list(StockMovement.objects.order_by('id').values_list('id', flat=True)))
+
+        data = self.poll(token)
+        self.assertEqual([data[name] for name in ('products', 'categories', 'suppliers', 'movements', 'deleted')],
+                         [[]] * 5)
+
+    def test_poll_returns_only_changes_and_deletions(self):
+        """Test that a poll after changes returns just the changed rows and tombstones"""
+        token = self.poll()['next']
+        product = self.products[2]
+        stock.adjust_stock(product, 3)
+        self.supplier.phone = '555'
+        self.supplier.save()
+        other = Category.objects.create(name="Doomed Category")
+        deleted_pk = self.products[4].pk
+        self.products[4].delete()
+
+        with self.assertNumQueries(5):
+            data = self.poll(token)
+        self.assertEqual(self.ids(data, 'products'), [product.pk])
+        self.assertEqual(data['products'][0]['quantity'], 5)
+        self.assertEqual(self.ids(data, 'suppliers'), [self.supplier.pk])
+        self.assertEqual(self.ids(data, 'categories'), [other.pk])
+        self.assertEqual(len(data['movements']), 1)
+        self.assertEqual(
+            [(row['type'], row['id'], row['key']) for row in data['deleted']], [('product', deleted_pk, 'SYNC004')]
+        )
+
+        other.delete()
+        data = self.poll(data['next'])
+        self.assertEqual(self.ids(data, 'categories'), [])
+        self.assertEqual([(row['type'], row['key']) for row in data['deleted']], [('category', 'Doomed Category')])
+
+    @override_settings(SYNC_OVERLAP_SECONDS=3600)
+    def test_recent_changes_are_sent_again(self):
+        """Test that changes inside the overlap window are repeated, for late commits"""
+        token = self.poll()['next']
+        self.assertEqual(len(self.poll(token)['products']), 5)
+
+    def test_invalid_parameters(self):
+        """Test that malformed tokens and limits are rejected"""
+        unknown = base64.urlsafe_b64encode(b'{"widgets":["2025-01-01T00:00:00+00:00",1]}').decode()
+        for params in ({'since': 'not-a-token'}, {'since': unknown}, {'limit': 'many'}, {'limit': 0}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('error', response.data)
+
+
+class FailingSink:
+    def publish(self, events):
+        raise outbox.PublishError('Downstream unavailable')
+
+
+class OutboxTests(APITestCase):
+    """Test the transactional outbox of stock movements and its publisher"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.product = Product.objects.create(
+            name="Outbox Product", sku="OUT001", price=5, quantity=10,
+            category=self.category, supplier=self.supplier
+        )
+
+    def test_every_movement_gets_an_event(self):
+        """Test that single, form and bulk stock changes all write outbox events"""
+        stock.adjust_stock(self.product, -4, reason='Picked')
+        self.product.quantity = 20
+        self.product.save()
+        stock.bulk_adjust_stock([{'line': 0, 'sku': 'OUT001', 'delta': 5}])
+        response = self.client.post('/api/stock-movements/', {
+            'product': self.product.pk, 'quantity': 1, 'movement_type': 'ADJ', 'reason': 'Count'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        movements = list(StockMovement.objects.order_by('id'))
+        events = list(OutboxEvent.objects.all())
+        self.assertEqual([event.payload['id'] for event in events], [movement.pk for movement in movements])
+        self.assertEqual([event.payload['net_quantity'] for event in events], [-4, 14, 5, 1])
+        self.assertTrue(all(event.topic == OutboxEvent.MOVEMENT and event.published_at is None for event in events))
+        self.assertEqual(events[0].payload['sku'], 'OUT001')
+        self.assertEqual(events[0].payload['reason'], 'Picked')
+        self.assertEqual(events[2].payload['product'], self.product.pk)
+
+    def test_rolled_back_movements_get_no_event(self):
+        """Test that events are written in the same transaction as their movement"""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                stock.adjust_stock(self.product, 3)
+                raise RuntimeError
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_publish_in_batches(self):
+        """Test that pending events are published in order, a batch at a time, then purged"""
+        for _ in range(5):
+            stock.adjust_stock(self.product, 1)
+        sink = outbox.MemorySink(queue.SimpleQueue())
+        self.assertEqual(outbox.publish_batch(sink, batch_size=2), 2)
+        self.assertEqual(outbox.drain(sink, batch_size=2), 3)
+        self.assertEqual(outbox.drain(sink, batch_size=2), 0)
+        published = [sink.queue.get_nowait() for _ in range(5)]
+        self.assertTrue(sink.queue.empty())
+        ids = list(OutboxEvent.objects.values_list('id', flat=True))
+        self.assertEqual([event['id'] for event in published], ids)
+        self.assertEqual(published[0]['topic'], 'stock.movement')
+        self.assertEqual(published[0]['data']['quantity'], 1)
+        self.assertFalse(OutboxEvent.objects.filter(published_at__isnull=True).exists())
+
+        self.assertEqual(outbox.purge_published(), 0)
+        OutboxEvent.objects.filter(pk__in=ids[:3]).update(published_at=timezone.now() - timedelta(days=8))
+        self.assertEqual(outbox.purge_published(), 3)
+        self.assertEqual(list(OutboxEvent.objects.values_list('id', flat=True)), ids[3:])
+
+    def test_failed_delivery_is_retried(self):
+        """Test that a failed batch stays pending with its error and is sent again"""
+        stock.adjust_stock(self.product, 1)
+        with self.assertRaises(outbox.PublishError):
+            outbox.drain(FailingSink())
+        event = OutboxEvent.objects.get()
+        self.assertIsNone(event.published_at)
+        self.assertEqual((event.attempts, event.last_error), (1, 'Downstream unavailable'))
+
+        sink = outbox.MemorySink(queue.SimpleQueue())
+        self.assertEqual(outbox.drain(sink), 1)
+        self.assertEqual(sink.queue.get_nowait()['id'], event.pk)
+
+    @override_settings(OUTBOX_BACKOFF_BASE=2, OUTBOX_BACKOFF_MAX=60)
+    def test_backoff(self):
+        """Test that retry delays double up to the maximum"""
+        for failures, delay in [(1, 2), (3, 8), (10, 60)]:
+            self.assertTrue(delay / 2 <= outbox.backoff(failures) <= delay)
+
+    def test_webhook_errors(self):
+        """Test that webhook failures are reported as publish errors"""
+        sink = outbox.WebhookSink('http://downstream.invalid/events', timeout=1)
+        with mock.patch('urllib.request.urlopen', side_effect=urllib.error.URLError('refused')):
+            with self.assertRaisesMessage(outbox.PublishError, 'Webhook unreachable'):
+                sink.publish([{'id': 1}])
+
+    def test_command_publishes_to_file(self):
+        """Test publish_outbox --once appending NDJSON to the outbox file"""
+        stock.adjust_stock(self.product, -2)
+        stock.adjust_stock(self.product, 3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'outbox', 'events.ndjson')
+            with override_settings(OUTBOX_FILE=path):
+                call_command('publish_outbox', '--once', '--sink', 'file', stdout=io.StringIO())
+                call_command('publish_outbox', '--once', '--sink', 'file', stdout=io.StringIO())
+            with open(path) as file:
+                events = [json.loads(line) for line in file]
+        self.assertEqual([event['data']['net_quantity'] for event in events], [-2, 3])
+
+        stock.adjust_stock(self.product, 1)
+        with mock.patch.object(outbox, 'get_sink', return_value=FailingSink()):
+            with self.assertRaisesMessage(CommandError, 'Downstream unavailable'):
+                call_command('publish_outbox', '--once', stdout=io.StringIO())
+
+
+class StockLocationTests(APITestCase):
+    """Test stock held at several locations and the totals kept on products"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.category = Category.objects.create(name="Test Category")
+        self.supplier = Supplier.objects.create(name="Test Supplier")
+        self.main = Location.default()
+        self.north = Location.objects.create(code='NORTH', name='North warehouse')
+        self.product = Product.objects.create(
+            name="Located Product", sku="LOC001", price=5, quantity=10, min_stock_level=2,
+            category=self.category, supplier=self.supplier
+        )
+
+    def levels(self, product=None):
+        """{location code: quantity}, checked to add up to the product's quantity"""
+        product = Product.objects.get(pk=(product or self.product).pk)
+        levels = dict(
+            StockLevel.objects.filter(product=product, quantity__gt=0).values_list('location__code', 'quantity')
+        )
+        self.assertEqual(sum(levels.values()), product.quantity)
+        return levels
+
+    def test_stock_starts_at_default_location(self):
+        """Test that opening stock and quantity edits are made at the default location"""
+        self.assertEqual(self.levels(), {'MAIN': 10})
+        self.product.quantity = 14
+        self.product.save()
+        self.assertEqual(self.levels(), {'MAIN': 14})
+        self.assertEqual(StockMovement.objects.get().location, self.main)
+
+    def test_adjust_at_location(self):
+        """Test that adjustments change the level at their location and the total together"""
+        movement = stock.adjust_stock(self.product, 5, location=self.north)
+        self.assertEqual(movement.location, self.north)
+        self.assertEqual(self.product.quantity, 15)
+        self.assertEqual(self.levels(), {'MAIN': 10, 'NORTH': 5})
+
+        stock.adjust_stock(self.product, -3, location=self.north)
+        with self.assertRaisesMessage(stock.InsufficientStock, 'Cannot remove more than the stock at NORTH (2)'):
+            stock.adjust_stock(self.product, -4, location=self.north)
+        self.assertEqual(self.levels(), {'MAIN': 10, 'NORTH': 2})
+
+    def test_transfer(self):
+        """Test that a transfer moves stock between levels as an OUT and IN pair"""
+        version = Product.objects.get(pk=self.product.pk).version
+        out_movement, in_movement = stock.transfer_stock(self.product, self.main, self.north, 4)
+        self.assertEqual(self.levels(), {'MAIN': 6, 'NORTH': 4})
+        self.assertEqual(self.product.version, version + 1)
+        self.assertEqual(
+            [(m.location, m.movement_type, m.quantity) for m in (out_movement, in_movement)],
+            [(self.main, 'OUT', 4), (self.north, 'IN', 4)]
+        )
+        self.assertEqual(out_movement.reference, in_movement.reference)
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+        with self.assertRaises(stock.InsufficientStock):
+            stock.transfer_stock(self.product, self.north, self.main, 5)
+        self.assertEqual(self.levels(), {'MAIN': 6, 'NORTH': 4})
+        self.assertEqual(StockMovement.objects.count(), 2)
+
+    def test_transfer_api(self):
+        """Test the transfer and stock level endpoints"""
+        url = reverse('product-transfer', args=[self.product.pk])
+        response = self.client.post(url, {'from_location': self.main.pk, 'to_location': self.north.pk, 'quantity': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['product']['quantity'], 10)
+        self.assertEqual([m['location'] for m in response.data['movements']], [self.main.pk, self.north.pk])
+
+        response = self.client.get(reverse('product-stock-levels', args=[self.product.pk]))
+        self.assertEqual(
+            [(level['location_code'], level['quantity']) for level in response.data['levels']],
+            [('MAIN', 7), ('NORTH', 3)]
+        )
+
+        response = self.client.post(url, {'from_location': self.north.pk, 'to_location': self.north.pk, 'quantity': 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {'from_location': self.north.pk, 'to_location': self.main.pk, 'quantity': 9})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': 'Cannot remove more than the stock at NORTH (3)'})
+
+    def test_adjust_stock_api_location(self):
+        """Test adjusting stock at a location through the API"""
+        url = reverse('product-adjust-stock', args=[self.product.pk])
+        response = self.client.post(url, {'adjustment_type': 'add', 'quantity': 2, 'location': self.north.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.levels(), {'MAIN': 10, 'NORTH': 2})
+        response = self.client.post(url, {'adjustment_type': 'add', 'quantity': 2, 'location': 999999})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_total_edit_cannot_take_stock_held_elsewhere(self):
+        """Test that lowering the total below the stock at other locations is refused"""
+        stock.transfer_stock(self.product, self.main, self.north, 8)
+        url = reverse('product-detail', args=[self.product.pk])
+        response = self.client.patch(url, {'quantity': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': 'Cannot remove more than the stock at MAIN (2)'})
+        self.assertEqual(self.levels(), {'MAIN': 2, 'NORTH': 8})
+        response = self.client.patch(url, {'quantity': 9}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.levels(), {'MAIN': 1, 'NORTH': 8})
+
+    def test_bulk_adjust_at_locations(self):
+        """Test bulk adjustments checked against the level at each line's location"""
+        other = Product.objects.create(
+            name="Other Product", sku="LOC002", price=5, quantity=0, category=self.category, supplier=self.supplier
+        )
+        applied, results = stock.bulk_adjust_stock([
+            {'line': 0, 'sku': 'LOC001', 'delta': 5, 'location': self.north.pk},
+            {'line': 1, 'sku': 'LOC001', 'delta': -2, 'location': self.north.pk},
+            {'line': 2, 'sku': 'LOC001', 'delta': -1},
+            {'line': 3, 'sku': 'LOC002', 'delta': 4, 'location': self.north.pk},
+        ])
+        self.assertTrue(applied)
+        self.assertEqual(self.levels(), {'MAIN': 9, 'NORTH': 3})
+        self.assertEqual(self.levels(other), {'NORTH': 4})
+        self.assertEqual(
+            list(StockMovement.objects.order_by('id').values_list('location__code', flat=True)),
+            ['NORTH', 'NORTH', 'MAIN', 'NORTH']
+        )
+
+        applied, results = stock.bulk_adjust_stock([
+            {'line': 0, 'sku': 'LOC001', 'delta': -4, 'location': self.north.pk},
+            {'line': 1, 'sku': 'LOC001', 'delta': 1, 'location': 999999},
+        ], atomic=False)
+        self.assertFalse(applied)
+        self.assertEqual(results[0]['error'], 'Cannot remove more than the stock at NORTH (3)')
+        self.assertEqual(results[1]['error'], 'Location not found')
+        self.assertEqual(self.levels(), {'MAIN': 9, 'NORTH': 3})
+
+    def test_import_sets_default_location(self):
+        """Test that imported totals are made up at the default location"""
+        stock.transfer_stock(self.product, self.main, self.north, 6)
+        records = [
+            {'sku': 'LOC001', 'name': 'Located Product', 'price': '5.00', 'quantity': 8,
+             'category': 'Test Category', 'supplier': 'Test Supplier'},
+            {'sku': 'LOC003', 'name': 'New Product', 'price': '1.00', 'quantity': 3,
+             'category': 'Test Category', 'supplier': 'Test Supplier'},
+        ]
+        upload = SimpleUploadedFile('products.json', json.dumps(records).encode(), content_type='application/json')
+        response = self.client.post(reverse('product-import-file'), {'file': upload}, format='multipart')
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual(self.levels(), {'MAIN': 2, 'NORTH': 6})
+        self.assertEqual(self.levels(Product.objects.get(sku='LOC003')), {'MAIN': 3})
+
+        records[0]['quantity'] = 5
+        upload = SimpleUploadedFile('products.json', json.dumps(records[:1]).encode(), content_type='application/json')
+        response = self.client.post(reverse('product-import-file'), {'file': upload}, format='multipart')
+        self.assertEqual(response.data['failed'], 1)
+        self.assertEqual(response.data['errors'][0]['error'], 'Quantity is below the stock held at other locations (6)')
+        self.assertEqual(self.levels(), {'MAIN': 2, 'NORTH': 6})
+
+    def test_delete_location(self):
+        """Test that only empty locations other than the default can be deleted"""
+        stock.transfer_stock(self.product, self.main, self.north, 1)
+        url = reverse('location-detail', args=[self.north.pk])
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        stock.transfer_stock(self.product, self.north, self.main, 1)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(StockMovement.objects.filter(location__isnull=True).count(), 2)
+        response = self.client.delete(reverse('location-detail', args=[self.main.pk]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
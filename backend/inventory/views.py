@@ -1,75 +1,280 @@
 import csv
-from django.http import HttpResponse
+import io
+from datetime import date, timedelta
+from itertools import chain
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Category, Supplier, Product, StockMovement
+from . import alerts, cold_storage, dashboard, partitions, purchasing, snapshots, stock, streams, sync
+from .caching import CachedResponseMixin, if_match_version
+from .filters import LowStockAlertFilter, ProductFilter, StockMovementFilter, start_of_day
+from .importers import CategoryImporter, SupplierImporter, ProductImporter, detect_format, read_rows
+from .models import (
+    Category, Supplier, Location, Product, ProductForecast, StockMovement, ArchivedStockMovement, LowStockAlert,
+    PurchaseOrder, VersionConflict
+)
+from .search import ProductSearchFilter
+from .streams import stream_events
+from .pagination import (
+    LookupPagination, ProductPagination, StockMovementPagination, LowStockAlertPagination, PurchaseOrderPagination
+)
 from .serializers import (
-    CategorySerializer, SupplierSerializer, ProductSerializer,
-    ProductCreateUpdateSerializer, StockMovementSerializer
+    CategorySerializer, SupplierSerializer, LocationSerializer, ProductSerializer,
+    ProductCreateUpdateSerializer, StockLevelSerializer, StockMovementSerializer, StockTransferSerializer,
+    BulkStockAdjustmentLineSerializer, LowStockAlertSerializer, LowStockAlertEventSerializer,
+    PurchaseOrderSerializer, TombstoneSerializer
 )
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """An object that implements just the write method of the file-like interface"""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Lets export actions satisfy `Accept: text/csv` during content negotiation.
+    The CSV itself is streamed by the view; only error payloads pass through here.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets feed actions satisfy `Accept: text/event-stream`; the stream itself is built by the view"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+def stream_csv(request, filename, header, rows, rows_per_chunk=500):
+    """
+    Stream rows as a CSV attachment. Rows are written in small batches so the
+    first bytes go out immediately and memory stays flat however many rows
+    the iterable produces. Under ASGI the batches are produced through
+    sync_to_async, as the server would otherwise read the whole body first.
+    """
+    writer = csv.writer(Echo())
+
+    def generate():
+        yield writer.writerow(header)
+        chunk = []
+        for row in rows:
+            chunk.append(writer.writerow(row))
+            if len(chunk) >= rows_per_chunk:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+    content = streams.iterate_in_thread(generate()) if streams.is_asgi(request) else generate()
+    response = StreamingHttpResponse(content, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+class ImportMixin:
+    """Adds a POST .../import/ action that bulk loads an uploaded CSV/JSON file"""
+    importer_class = None
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def import_file(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'file is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fmt = request.data.get('format') or detect_format(upload.name)
+        dry_run = request.data.get('dry_run') in ('1', 'true', 'True')
+        try:
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            report = self.importer_class(dry_run=dry_run).run(read_rows(stream, fmt))
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return Response(
+                {'error': f'Could not read file: {str(e)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(report.as_dict())
+
+
+class CategoryViewSet(CachedResponseMixin, ImportMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
+    cache_models = [Category]
     serializer_class = CategorySerializer
+    pagination_class = LookupPagination
+    importer_class = CategoryImporter
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'description']
 
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(CachedResponseMixin, ImportMixin, viewsets.ModelViewSet):
     queryset = Supplier.objects.all()
+    cache_models = [Supplier]
     serializer_class = SupplierSerializer
+    pagination_class = LookupPagination
+    importer_class = SupplierImporter
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'contact_person', 'email']
 
+    @action(detail=True, methods=['get', 'post'])
+    def reorder_suggestions(self, request, pk=None):
+        """
+        GET: this supplier's products below their minimum level, with the
+        quantity to order to reach their target level. POST: write them to
+        the supplier's draft purchase order, returned as {"order": ...}
+        (null when there is nothing to order).
+        """
+        supplier = self.get_object()
+        if request.method == 'POST':
+            order = purchasing.generate_drafts(supplier.pk).get(supplier.pk)
+            if order is not None:
+                order = PurchaseOrderViewSet.queryset.get(pk=order.pk)
+            return Response({'order': PurchaseOrderSerializer(order).data if order else None})
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.select_related('category', 'supplier').all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['category', 'supplier', 'is_active']
+        lines = list(purchasing.suggestions(supplier.pk))
+        return Response({
+            'supplier': supplier.pk,
+            'supplier_name': supplier.name,
+            'lines': lines,
+            'total_quantity': sum(line['suggested_quantity'] for line in lines),
+            'total_cost': str(sum((line['suggested_quantity'] * line['price'] for line in lines), Decimal('0.00'))),
+        })
+
+
+class LocationViewSet(viewsets.ModelViewSet):
+    """Warehouses and other places stock is held at (see StockLevel)"""
+    queryset = Location.objects.all()
+    serializer_class = LocationSerializer
+    pagination_class = LookupPagination
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['code', 'name']
+
+    def destroy(self, request, *args, **kwargs):
+        location = self.get_object()
+        if location.stock_levels.exclude(quantity=0).exists():
+            return Response(
+                {'error': 'Location still holds stock; transfer it elsewhere first'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if location.code == settings.DEFAULT_STOCK_LOCATION:
+            return Response(
+                {'error': 'The default location cannot be deleted'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        with transaction.atomic():
+            location.stock_levels.all().delete()
+            location.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ProductViewSet(CachedResponseMixin, ImportMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.select_related('category', 'supplier', 'forecast').all()
+    # Products are serialized with their category and supplier names and forecast
+    cache_models = [Product, Category, Supplier, ProductForecast]
+    etag_version_field = 'version'
+    # Sorted with ?ordering= and counted by the paginator
+    pagination_class = ProductPagination
+    importer_class = ProductImporter
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
+    filterset_class = ProductFilter
     search_fields = ['name', 'sku', 'description']
+    bulk_adjust_max_lines = 5000
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return ProductCreateUpdateSerializer
         return ProductSerializer
 
-    @action(detail=False, methods=['get'])
-    def export_csv(self, request):
-        """Export products to CSV"""
-        products = self.get_queryset()
+    def expected_version(self):
+        """
+        Version a write is based on: the If-Match ETag, else a `version` in
+        the body, else None (the version read by this request)
+        """
+        version = if_match_version(self.request)
+        if version is None and self.request.data.get('version') not in (None, ''):
+            try:
+                version = int(self.request.data['version'])
+            except (TypeError, ValueError):
+                version = 0
+        return version
+
+    def get_object(self):
+        product = super().get_object()
+        if self.action in ['update', 'partial_update']:
+            version = self.expected_version()
+            if version is not None:
+                product.expect_version(version)
+        return product
+
+    def conflict_response(self, conflict):
+        """409 with the product as it is now, for the client to merge or retry against"""
+        current = self.get_queryset().get(pk=conflict.product_id)
+        data = ProductSerializer(current, context=self.get_serializer_context()).data
+        return Response(
+            {'error': f'Product was changed since version {conflict.expected_version}', 'current': data},
+            status=status.HTTP_409_CONFLICT,
+            headers={'ETag': self.current_etag(self.request, data)}
+        )
+
+    def update(self, request, *args, **kwargs):
+        # Saves compare-and-swap on the version, so concurrent writers never
+        # overwrite each other silently: the later one gets a 409
+        try:
+            response = super().update(request, *args, **kwargs)
+        except VersionConflict as conflict:
+            return self.conflict_response(conflict)
+        except stock.InsufficientStock as e:
+            # A lower total is taken from the default location's stock
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response['ETag'] = self.current_etag(request, response.data)
+        return response
 
-        # Create CSV response
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="products.csv"'
+    @action(detail=False, methods=['get'], renderer_classes=[JSONRenderer, CSVRenderer])
+    def export_csv(self, request):
+        """Export products to CSV, honouring the list filters and search"""
+        products = self.filter_queryset(self.get_queryset()).values_list(
+            'sku', 'name', 'description', 'price', 'quantity', 'min_stock_level',
+            'category__name', 'supplier__name', 'is_active', 'created_at', 'updated_at'
+        )
 
-        writer = csv.writer(response)
-        # Write header
-        writer.writerow([
+        header = [
             'SKU', 'Name', 'Description', 'Price', 'Quantity',
             'Min Stock Level', 'Category', 'Supplier', 'Active',
             'Created At', 'Updated At'
-        ])
-
-        # Write data
-        for product in products:
-            writer.writerow([
-                product.sku,
-                product.name,
-                product.description or '',
-                product.price,
-                product.quantity,
-                product.min_stock_level,
-                product.category.name if product.category else '',
-                product.supplier.name if product.supplier else '',
-                'Yes' if product.is_active else 'No',
-                product.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                product.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
-            ])
-
-        return response
+        ]
+        rows = (
+            (
+                sku, name, description or '', price, quantity, min_stock_level,
+                category or '', supplier or '', 'Yes' if is_active else 'No',
+                created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+            )
+            for (sku, name, description, price, quantity, min_stock_level,
+                 category, supplier, is_active, created_at, updated_at)
+            in products.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return stream_csv(request, 'products.csv', header, rows)
 
     @action(detail=True, methods=['post'])
     def adjust_stock(self, request, pk=None):
@@ -106,16 +311,22 @@ class ProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            # Calculate new quantity
-            new_quantity = product.quantity + quantity if adjustment_type == 'add' else product.quantity - quantity
-
-            # Update product with custom reason - this will create a stock movement
-            product.quantity = new_quantity
-            product.save(stock_reason=reason)  # Pass reason to model
+        location = None
+        if request.data.get('location') not in (None, ''):
+            try:
+                location = Location.objects.get(pk=int(request.data['location']))
+            except (TypeError, ValueError, Location.DoesNotExist):
+                return Response(
+                    {'error': 'location must be the id of a location'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-            # Refresh product data
-            product.refresh_from_db()
+        try:
+            # Apply the change in the database and log the movement in one transaction
+            delta = quantity if adjustment_type == 'add' else -quantity
+            stock.adjust_stock(
+                product, delta, reason=reason, expected_version=self.expected_version(), location=location
+            )
 
             # Return updated product data
             serializer = self.get_serializer(product)
@@ -124,16 +335,358 @@ class ProductViewSet(viewsets.ModelViewSet):
                 'product': serializer.data
             })
 
+        except stock.InsufficientStock as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except VersionConflict as conflict:
+            return self.conflict_response(conflict)
         except Exception as e:
             return Response(
                 {'error': f'Failed to adjust stock: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['get'])
+    def stock_levels(self, request, pk=None):
+        """Stock of a product at each location; the levels add up to its quantity"""
+        product = self.get_object()
+        levels = product.stock_levels.select_related('location').order_by('location__code')
+        return Response({
+            'product': product.pk,
+            'quantity': product.quantity,
+            'levels': StockLevelSerializer(levels, many=True).data,
+        })
+
+    @action(detail=True, methods=['post'])
+    def transfer(self, request, pk=None):
+        """Move stock of a product between two locations, as an OUT and an IN movement"""
+        product = self.get_object()
+        serializer = StockTransferSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        try:
+            movements = stock.transfer_stock(
+                product, data['from_location'], data['to_location'], data['quantity'],
+                reason=data['reason'], reference=data['reference'], expected_version=self.expected_version()
+            )
+        except stock.InsufficientStock as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except VersionConflict as conflict:
+            return self.conflict_response(conflict)
+        return Response({
+            'message': 'Stock transferred successfully',
+            'product': self.get_serializer(product).data,
+            'movements': StockMovementSerializer(movements, many=True).data,
+        })
+
+    @action(detail=True, methods=['get'])
+    def stock_at(self, request, pk=None):
+        """Closing stock of a product on a past date, e.g. ?date=2025-01-31"""
+        product = self.get_object()
+        try:
+            on_date = date.fromisoformat(request.query_params.get('date', ''))
+        except ValueError:
+            return Response(
+                {'error': 'date is required in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        quantity, snapshot = snapshots.stock_at(product, on_date)
+        return Response({
+            'product': product.pk,
+            'date': on_date,
+            'quantity': quantity,
+            'snapshot_date': snapshot.date if snapshot else None,
+        })
+
+    @action(detail=False, methods=['post'])
+    def bulk_adjust_stock(self, request):
+        """
+        Adjust stock for many products in one transaction.
+
+        Accepts {"lines": [...], "atomic": true} or a bare list of lines. With
+        atomic (the default) nothing is applied unless every line is valid;
+        otherwise valid lines are applied and failing ones reported.
+        """
+        if isinstance(request.data, list):
+            lines, atomic = request.data, True
+        else:
+            lines = request.data.get('lines')
+            atomic = request.data.get('atomic', True) not in (False, 'false', '0', 0)
+
+        if not isinstance(lines, list) or not lines:
+            return Response(
+                {'error': 'lines must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(lines) > self.bulk_adjust_max_lines:
+            return Response(
+                {'error': f'At most {self.bulk_adjust_max_lines} lines per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Validate every line up front
+        results, valid = [], []
+        for index, line in enumerate(lines):
+            serializer = BulkStockAdjustmentLineSerializer(data=line)
+            if serializer.is_valid():
+                valid.append({'line': index, **serializer.validated_data})
+                results.append(None)
+            else:
+                results.append({'line': index, 'status': 'error', 'error': serializer.errors})
+
+        invalid = len(valid) < len(lines)
+        if atomic and invalid:
+            valid = []
+
+        applied = False
+        if valid:
+            try:
+                applied, line_results = stock.bulk_adjust_stock(valid, atomic=atomic)
+            except stock.InsufficientStock as e:
+                return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+            for result in line_results:
+                results[result['line']] = result
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = {'line': index, 'status': 'skipped'}
+
+        summary = {
+            'applied': sum(1 for result in results if result['status'] == 'ok'),
+            'failed': sum(1 for result in results if result['status'] == 'error'),
+            'results': results,
+        }
+        if atomic and not applied:
+            return Response(summary, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary)
+
 
 class StockMovementViewSet(viewsets.ModelViewSet):
+    """
+    Stock movements, most recent first. Reads only touch the main table of
+    recent months unless ?date_from reaches back into archived history (see
+    rotate_movement_partitions), in which case the archive is paged through
+    along with it.
+    """
     queryset = StockMovement.objects.select_related('product').all()
     serializer_class = StockMovementSerializer
+    pagination_class = StockMovementPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['movement_type', 'product']
+    filterset_class = StockMovementFilter
     search_fields = ['reason', 'reference', 'performed_by']
+
+    def get_archive_sources(self):
+        """
+        Archived movements matching the request's filters: the archive table
+        and the archived month files, each only when ?date_from reaches it
+        """
+        filterset = StockMovementFilter(
+            self.request.query_params,
+            queryset=ArchivedStockMovement.objects.select_related('product'),
+            request=self.request,
+        )
+        if not filterset.is_valid() or filterset.form.cleaned_data.get('date_from') is None:
+            return []
+        data = filterset.form.cleaned_data
+        start = start_of_day(data['date_from'])
+        end = start_of_day(data['date_to'] + timedelta(days=1)) if data.get('date_to') else None
+
+        sources = []
+        latest = partitions.latest_archived()
+        if latest is not None and start <= latest:
+            sources.append(filters.SearchFilter().filter_queryset(self.request, filterset.qs, self))
+        files = cold_storage.ArchivedMovements.between(
+            start, end,
+            product_id=data['product'].pk if data.get('product') else None,
+            movement_type=data.get('movement_type'),
+            search_terms=filters.SearchFilter().get_search_terms(self.request),
+            search_fields=self.search_fields,
+        )
+        if files is not None:
+            sources.append(files)
+        return sources
+
+    def paginate_queryset(self, queryset):
+        archived = self.get_archive_sources()
+        if not archived:
+            return super().paginate_queryset(queryset)
+        return self.paginator.paginate_sources([queryset, *archived], self.request, view=self)
+
+    @staticmethod
+    def export_values(source, fields):
+        if isinstance(source, QuerySet):
+            return source.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return (
+            tuple(
+                getattr(cold_storage.product_of(row), field.split('__')[1], '') if '__' in field
+                else getattr(row, field)
+                for field in fields
+            )
+            for row in source.newest_first()
+        )
+
+    @action(detail=False, methods=['get'], renderer_classes=[JSONRenderer, CSVRenderer])
+    def export_csv(self, request):
+        """Export stock movement history to CSV, e.g. ?date_from=2025-01-01&date_to=2025-01-31"""
+        header = [
+            'ID', 'Timestamp', 'SKU', 'Product', 'Type', 'Quantity',
+            'Reason', 'Reference', 'Performed By'
+        ]
+        fields = [
+            'id', 'timestamp', 'product__sku', 'product__name', 'movement_type',
+            'quantity', 'reason', 'reference', 'performed_by'
+        ]
+        # Each archive tier only holds movements older than the one before, so they simply follow
+        movements = chain.from_iterable(
+            self.export_values(source, fields)
+            for source in [self.filter_queryset(self.get_queryset()), *self.get_archive_sources()]
+        )
+        rows = (
+            (pk, timestamp.strftime('%Y-%m-%d %H:%M:%S'), *rest)
+            for pk, timestamp, *rest in movements
+        )
+        return stream_csv(request, 'stock_movements.csv', header, rows)
+
+
+class PurchaseOrderViewSet(viewsets.ReadOnlyModelViewSet):
+    """Purchase orders; drafts come from the supplier reorder suggestions"""
+    queryset = PurchaseOrder.objects.select_related('supplier').prefetch_related('lines__product')
+    serializer_class = PurchaseOrderSerializer
+    pagination_class = PurchaseOrderPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status', 'supplier']
+
+    def change_status(self, request, status_name):
+        order = self.get_object()
+        try:
+            purchasing.change_status(order, status_name)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(self.get_queryset().get(pk=order.pk)).data)
+
+    @action(detail=True, methods=['post'])
+    def submit(self, request, pk=None):
+        """Place a draft order with the supplier"""
+        return self.change_status(request, PurchaseOrder.ORDERED)
+
+    @action(detail=True, methods=['post'])
+    def receive(self, request, pk=None):
+        """Book the delivered quantities of an ordered purchase order into stock"""
+        return self.change_status(request, PurchaseOrder.RECEIVED)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        return self.change_status(request, PurchaseOrder.CANCELLED)
+
+
+class LowStockAlertViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Products at or below their minimum stock level. Lists open alerts by
+    default (?state=cleared or all for the history), most recent first.
+    """
+    queryset = LowStockAlert.objects.select_related('product')
+    serializer_class = LowStockAlertSerializer
+    pagination_class = LowStockAlertPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = LowStockAlertFilter
+    feed_max_timeout = 60
+
+    @action(detail=False, methods=['get'], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def events(self, request):
+        """
+        Alerts triggered and cleared after event ?after=<id>.
+
+        As JSON this is a long poll: it waits up to ?timeout seconds (default
+        25) for the first new event and returns {"events": [...], "last_id"},
+        where last_id is the `after` to pass next. Without `after` it waits
+        for events from now on. With `Accept: text/event-stream` events are
+        streamed instead, resuming from Last-Event-ID on reconnect.
+        """
+        try:
+            after = request.query_params.get('after') or request.headers.get('Last-Event-ID')
+            after = alerts.last_event_id() if after is None else int(after)
+            timeout = float(request.query_params.get('timeout', 25))
+        except ValueError:
+            return Response(
+                {'error': 'after and timeout must be numbers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= timeout <= self.feed_max_timeout:
+            return Response(
+                {'error': f'timeout must be between 0 and {self.feed_max_timeout}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.accepted_renderer.format == 'event-stream':
+            if streams.is_asgi(request):
+                return stream_events(streams.alert_events(after))
+            return stream_events(streams.sync_alert_events(after))
+
+        events = alerts.wait_for_events(after, timeout)
+        return Response({
+            'events': LowStockAlertEventSerializer(events, many=True).data,
+            'last_id': events[-1].pk if events else after,
+        })
+
+
+def parse_summary_params(query_params):
+    """Validate the dashboard summary parameters, returning (values, error message)"""
+    params = {
+        'days': (dashboard.DEFAULT_WINDOW_DAYS, dashboard.MAX_WINDOW_DAYS),
+        'low_stock_limit': (dashboard.DEFAULT_LOW_STOCK_LIMIT, dashboard.MAX_LOW_STOCK_LIMIT),
+    }
+    values = {}
+    for name, (default, maximum) in params.items():
+        try:
+            value = int(query_params.get(name, default))
+        except ValueError:
+            return None, f'{name} must be a valid integer'
+        if not 1 <= value <= maximum:
+            return None, f'{name} must be between 1 and {maximum}'
+        values[name] = value
+    return values, None
+
+
+class DashboardSummaryView(APIView):
+    """Aggregated dashboard metrics, computed in SQL instead of in the browser"""
+
+    def get(self, request):
+        values, error = parse_summary_params(request.query_params)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(dashboard.build_summary(**values))
+
+
+class SyncView(APIView):
+    """
+    Changes since ?since=<token> (everything without one), for clients that
+    poll instead of re-fetching the catalogue; see inventory.sync. Pass the
+    returned `next` token to the following poll, straight away while
+    `has_more` is true. Every row is to be applied as an upsert by id.
+    """
+    page_size = 500
+    max_page_size = 5000
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', self.page_size)), self.max_page_size)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            return Response({'error': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows, token, has_more = sync.changes(request.query_params.get('since'), limit)
+        except sync.InvalidToken as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        context = {'request': request}
+        return Response({
+            'products': ProductSerializer(rows['products'], many=True, context=context).data,
+            'categories': CategorySerializer(rows['categories'], many=True).data,
+            'suppliers': SupplierSerializer(rows['suppliers'], many=True).data,
+            'movements': StockMovementSerializer(rows['movements'], many=True).data,
+            'deleted': TombstoneSerializer(rows['deleted'], many=True).data,
+            'next': token,
+            'has_more': has_more,
+        })
@@ -21,6 +21,16 @@ ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost 127.0.0.1 [::1
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resized copies generated for every product image: name -> bounding box
+PRODUCT_IMAGE_RENDITIONS = {
+    'thumb': (100, 100),
+    'medium': (600, 600),
+}
+PRODUCT_IMAGE_FORMAT = os.environ.get('PRODUCT_IMAGE_FORMAT', 'WEBP')  # falls back to JPEG
+PRODUCT_IMAGE_QUALITY = int(os.environ.get('PRODUCT_IMAGE_QUALITY', 80))
+# Background threads for renditions of uploads; 0 renders inline after commit
+PRODUCT_IMAGE_WORKERS = int(os.environ.get('PRODUCT_IMAGE_WORKERS', 2))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -37,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "inventory.middleware.QueryMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -83,6 +94,119 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# CACHE_BACKEND is locmem (per process), file or redis; CACHE_LOCATION is the
+# directory for file and the URL for redis (e.g. redis://redis:6379/1)
+
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "dummy": "django.core.cache.backends.dummy.DummyCache",
+}
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND],
+        "LOCATION": os.environ.get(
+            "CACHE_LOCATION", str(BASE_DIR / ".cache") if CACHE_BACKEND == "file" else ""
+        ),
+    }
+}
+
+# Cache used for list/detail API responses and how long entries live (seconds)
+API_CACHE_ALIAS = "default"
+API_CACHE_TIMEOUT = int(os.environ.get("API_CACHE_TIMEOUT", 300))
+
+
+# Request instrumentation (inventory.middleware.QueryMetricsMiddleware)
+# Fraction of requests measured; 0 turns it off
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get("REQUEST_METRICS_SAMPLE_RATE", 1.0 if DEBUG else 0.0))
+# A statement run this many times in one request is reported as a likely N+1
+REQUEST_METRICS_DUPLICATE_THRESHOLD = int(os.environ.get("REQUEST_METRICS_DUPLICATE_THRESHOLD", 5))
+REQUEST_METRICS_PATH = "/api/_metrics/"
+
+
+# Demand forecasting (inventory.forecasting, compute_reorder_points)
+# Days of movement history used, and of it the moving average window
+FORECAST_HISTORY_DAYS = int(os.environ.get("FORECAST_HISTORY_DAYS", 90))
+FORECAST_MOVING_AVERAGE_DAYS = int(os.environ.get("FORECAST_MOVING_AVERAGE_DAYS", 28))
+# Exponential smoothing factor: higher reacts faster to recent demand
+FORECAST_SMOOTHING = float(os.environ.get("FORECAST_SMOOTHING", 0.2))
+# Probability of not running out during the lead time, sets the safety stock
+FORECAST_SERVICE_LEVEL = float(os.environ.get("FORECAST_SERVICE_LEVEL", 0.95))
+# Suggested order quantities cover this many days of demand
+FORECAST_ORDER_CYCLE_DAYS = int(os.environ.get("FORECAST_ORDER_CYCLE_DAYS", 30))
+
+# Products without a forecast are reordered up to this multiple of their minimum level
+PURCHASE_TARGET_FACTOR = int(os.environ.get("PURCHASE_TARGET_FACTOR", 2))
+
+
+# Stock movement storage (inventory.partitions, rotate_movement_partitions)
+# Months of movements kept in the main table; older ones move to the archive
+MOVEMENT_HOT_MONTHS = int(os.environ.get("MOVEMENT_HOT_MONTHS", 12))
+# Monthly partitions created ahead of time (PostgreSQL)
+MOVEMENT_PARTITIONS_AHEAD = int(os.environ.get("MOVEMENT_PARTITIONS_AHEAD", 3))
+# Months of movements kept in the database at all; archive_stock_movements
+# moves older months into compressed files under MOVEMENT_ARCHIVE_DIR
+MOVEMENT_COLD_MONTHS = int(os.environ.get("MOVEMENT_COLD_MONTHS", 12))
+MOVEMENT_ARCHIVE_DIR = os.environ.get("MOVEMENT_ARCHIVE_DIR", str(BASE_DIR / "archive"))
+
+
+# Stock locations (inventory.models.Location)
+# Code of the location stock changes that name none are made at; created on first use
+DEFAULT_STOCK_LOCATION = os.environ.get("DEFAULT_STOCK_LOCATION", "MAIN")
+
+
+# Incremental sync (/api/sync/, inventory.sync)
+# Changes this recent are sent again on the next poll, in case a slower
+# transaction commits rows stamped before the previous poll read past them
+SYNC_OVERLAP_SECONDS = int(os.environ.get("SYNC_OVERLAP_SECONDS", 10))
+
+
+# Event feeds (inventory.cursors)
+# How long a feed holds back events after a gap in the ids, waiting for a
+# transaction that may still commit the missing one (seconds)
+EVENT_ID_GAP_TIMEOUT = float(os.environ.get("EVENT_ID_GAP_TIMEOUT", 10))
+
+
+# Low-stock alert feed (/api/alerts/low-stock/events/)
+# How often waiting readers check for events written by other processes (seconds)
+LOW_STOCK_FEED_POLL_INTERVAL = float(os.environ.get("LOW_STOCK_FEED_POLL_INTERVAL", 1.0))
+# Keep-alive comment interval and maximum duration of one event stream (seconds)
+LOW_STOCK_FEED_HEARTBEAT = float(os.environ.get("LOW_STOCK_FEED_HEARTBEAT", 15))
+LOW_STOCK_FEED_STREAM_SECONDS = float(os.environ.get("LOW_STOCK_FEED_STREAM_SECONDS", 300))
+
+
+# Stock event stream (/api/stream/stock/, inventory.streams)
+# How often each process checks for movements written by other processes (seconds)
+STOCK_STREAM_POLL_INTERVAL = float(os.environ.get("STOCK_STREAM_POLL_INTERVAL", 1.0))
+# Recent events kept in memory for streams to copy and reconnects to resume from
+STOCK_STREAM_BUFFER = int(os.environ.get("STOCK_STREAM_BUFFER", 1000))
+# Keep-alive comment interval and maximum duration of one stream (seconds)
+STOCK_STREAM_HEARTBEAT = float(os.environ.get("STOCK_STREAM_HEARTBEAT", 15))
+STOCK_STREAM_SECONDS = float(os.environ.get("STOCK_STREAM_SECONDS", 300))
+
+
+# Transactional outbox of stock changes (inventory.outbox, publish_outbox)
+# Where events go: "file" (NDJSON lines appended to OUTBOX_FILE), "webhook"
+# (batches POSTed as JSON to OUTBOX_WEBHOOK_URL) or "memory" (tests)
+OUTBOX_SINK = os.environ.get("OUTBOX_SINK", "file")
+OUTBOX_FILE = os.environ.get("OUTBOX_FILE", str(BASE_DIR / "outbox" / "events.ndjson"))
+OUTBOX_WEBHOOK_URL = os.environ.get("OUTBOX_WEBHOOK_URL", "")
+OUTBOX_WEBHOOK_TIMEOUT = float(os.environ.get("OUTBOX_WEBHOOK_TIMEOUT", 10))
+# Events per delivery, and how often an idle publisher looks for new ones (seconds)
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 500))
+OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", 2.0))
+# Retry delay after a failed delivery, doubling up to the maximum (seconds)
+OUTBOX_BACKOFF_BASE = float(os.environ.get("OUTBOX_BACKOFF_BASE", 1.0))
+OUTBOX_BACKOFF_MAX = float(os.environ.get("OUTBOX_BACKOFF_MAX", 300))
+# Published events are deleted after this many days
+OUTBOX_RETENTION_DAYS = int(os.environ.get("OUTBOX_RETENTION_DAYS", 7))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -126,6 +250,13 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Django REST Framework
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'inventory.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
+}
+
+
 # CORS settings for React frontend
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -133,4 +264,7 @@ CORS_ALLOWED_ORIGINS = [
     "http://frontend:3000",
 ]
 
-CORS_ALLOW_CREDENTIALS = True
\ No newline at end of file
+CORS_ALLOW_CREDENTIALS = True
+
+# Let the React app read conditional-request and timing headers
+CORS_EXPOSE_HEADERS = ["ETag", "Server-Timing"]
\ No newline at end of file
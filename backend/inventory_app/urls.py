@@ -18,16 +18,33 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from inventory.views import CategoryViewSet, SupplierViewSet, ProductViewSet, StockMovementViewSet
+from inventory.views import (
+    CategoryViewSet, SupplierViewSet, LocationViewSet, ProductViewSet, StockMovementViewSet,
+    LowStockAlertViewSet, PurchaseOrderViewSet, DashboardSummaryView, SyncView
+)
+from inventory import async_views
+from inventory.middleware import metrics_view
 
 # Create router and register viewsets
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet)
 router.register(r'suppliers', SupplierViewSet)
+router.register(r'locations', LocationViewSet)
 router.register(r'products', ProductViewSet)
 router.register(r'stock-movements', StockMovementViewSet)
+router.register(r'purchase-orders', PurchaseOrderViewSet)
+router.register(r'alerts/low-stock', LowStockAlertViewSet, basename='low-stock-alert')
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path('api/_metrics/', metrics_view, name='metrics'),
+    path('api/dashboard/summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
+    path('api/sync/', SyncView.as_view(), name='sync'),
+    # Async read endpoints, for ASGI deployments (see inventory/async_views.py)
+    path('api/async/products/', async_views.product_list, name='async-product-list'),
+    path('api/async/products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('api/async/stock-movements/', async_views.stock_movement_list, name='async-stock-movement-list'),
+    path('api/async/dashboard/summary/', async_views.dashboard_summary, name='async-dashboard-summary'),
+    path('api/stream/stock/', async_views.stock_stream, name='stock-stream'),
     path('api/', include(router.urls)),
 ]
@@ -35,6 +35,8 @@ api.interceptors.response.use(
 const apiService = {
   // Products
   getProducts: (params = {}) => api.get('/products/', { params }),
+  // Follows a `next`/`previous` link from a paginated response
+  getPage: (url) => api.get(url),
   createProduct: (data) => api.post('/products/', data),
   updateProduct: (id, data) => api.put(`/products/${id}/`, data),
   deleteProduct: (id) => api.delete(`/products/${id}/`),
@@ -59,6 +61,19 @@ const apiService = {
   // Stock Movements
   getStockMovements: (params = {}) => api.get('/stock-movements/', { params }),
   createStockMovement: (data) => api.post('/stock-movements/', data),
+  exportStockMovementsCSV: (params = {}) => api.get('/stock-movements/export_csv/', {
+    params,
+    responseType: 'blob',
+    headers: { 'Accept': 'text/csv' }
+  }),
+
+  // Dashboard
+  getDashboardSummary: (params = {}) => api.get('/dashboard/summary/', { params }),
+
+  // Live stock movements (server-sent events); null where EventSource is unavailable
+  streamStockEvents: () => (
+    typeof EventSource === 'undefined' ? null : new EventSource(`${API_BASE_URL}/stream/stock/`)
+  ),
 };
 
 export default apiService;
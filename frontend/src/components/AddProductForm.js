@@ -33,8 +33,8 @@ const AddProductForm = ({ show, handleClose, onProductAdded }) => {
         apiService.getCategories(),
         apiService.getSuppliers(),
       ]);
-      setCategories(categoriesResponse.data);
-      setSuppliers(suppliersResponse.data);
+      setCategories(categoriesResponse.data.results || categoriesResponse.data);
+      setSuppliers(suppliersResponse.data.results || suppliersResponse.data);
     } catch (error) {
       setFetchError('Failed to load categories and suppliers');
       console.error('Error fetching data:', error);
@@ -29,31 +29,36 @@ ChartJS.register(
 );
 
 const Dashboard = () => {
-  const [products, setProducts] = useState([]);
-  const [stockMovements, setStockMovements] = useState([]);
-  const [categories, setCategories] = useState([]);
-  const [suppliers, setSuppliers] = useState([]);
+  const [summary, setSummary] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
   useEffect(() => {
     fetchDashboardData();
+
+    // Refresh quietly when stock moves, at most every few seconds
+    const source = apiService.streamStockEvents();
+    if (!source) return undefined;
+    let timer = null;
+    source.addEventListener('stock', () => {
+      if (!timer) {
+        timer = setTimeout(() => {
+          timer = null;
+          fetchDashboardData(false);
+        }, 3000);
+      }
+    });
+    return () => {
+      clearTimeout(timer);
+      source.close();
+    };
   }, []);
 
-  const fetchDashboardData = async () => {
+  const fetchDashboardData = async (showSpinner = true) => {
     try {
-      setLoading(true);
-      const [productsRes, movementsRes, categoriesRes, suppliersRes] = await Promise.all([
-        apiService.getProducts(),
-        apiService.getStockMovements({ limit: 10 }),
-        apiService.getCategories(),
-        apiService.getSuppliers(),
-      ]);
-
-      setProducts(productsRes.data.results || productsRes.data);
-      setStockMovements(movementsRes.data.results || movementsRes.data);
-      setCategories(categoriesRes.data.results || categoriesRes.data);
-      setSuppliers(suppliersRes.data.results || suppliersRes.data);
+      if (showSpinner) setLoading(true);
+      const response = await apiService.getDashboardSummary({ days: 7, low_stock_limit: 5 });
+      setSummary(response.data);
       setError(null);
     } catch (err) {
       setError('Failed to load dashboard data');
@@ -63,61 +68,6 @@ const Dashboard = () => {
     }
   };
 
-  // Calculate dashboard metrics
-  const getLowStockProducts = () => {
-    return products.filter(product => product.is_active && product.quantity <= product.min_stock_level);
-  };
-
-  const getTotalInventoryValue = () => {
-    return products
-      .filter(product => product.is_active)
-      .reduce((total, product) => total + (product.price * product.quantity), 0);
-  };
-
-  const getActiveProductsCount = () => {
-    return products.filter(product => product.is_active).length;
-  };
-
-  const getStockLevelsByCategory = () => {
-    const categoryData = {};
-    products
-      .filter(product => product.is_active)
-      .forEach(product => {
-        const categoryName = product.category_name || 'Uncategorized';
-        if (!categoryData[categoryName]) {
-          categoryData[categoryName] = { total: 0, count: 0 };
-        }
-        categoryData[categoryName].total += product.quantity;
-        categoryData[categoryName].count += 1;
-      });
-    return categoryData;
-  };
-
-  const getStockMovementsByDate = () => {
-    const last7Days = [];
-    for (let i = 6; i >= 0; i--) {
-      const date = new Date();
-      date.setDate(date.getDate() - i);
-      last7Days.push(date.toISOString().split('T')[0]);
-    }
-
-    const movementData = {};
-    stockMovements.forEach(movement => {
-      const date = movement.timestamp.split('T')[0];
-      if (!movementData[date]) {
-        movementData[date] = { IN: 0, OUT: 0, ADJ: 0 };
-      }
-      movementData[date][movement.movement_type] += movement.quantity;
-    });
-
-    return last7Days.map(date => ({
-      date,
-      IN: movementData[date]?.IN || 0,
-      OUT: movementData[date]?.OUT || 0,
-      ADJ: Math.abs(movementData[date]?.ADJ || 0),
-    }));
-  };
-
   if (loading) {
     return (
       <div className="container mt-4">
@@ -139,15 +89,16 @@ const Dashboard = () => {
   }
 
   // Data for charts
-  const lowStockProducts = getLowStockProducts();
-  const stockLevelsData = getStockLevelsByCategory();
-  const movementsData = getStockMovementsByDate();
+  const lowStockProducts = summary.low_stock;
+  const lowStockCount = summary.products.low_stock_count;
+  const movementsData = summary.movements.daily;
+  const movementTotals = summary.movements.totals;
 
   const barChartData = {
-    labels: Object.keys(stockLevelsData),
+    labels: summary.stock_by_category.map(cat => cat.category_name || 'Uncategorized'),
     datasets: [{
       label: 'Stock Quantity by Category',
-      data: Object.values(stockLevelsData).map(cat => cat.total),
+      data: summary.stock_by_category.map(cat => cat.total_quantity),
       backgroundColor: 'rgba(54, 162, 235, 0.5)',
       borderColor: 'rgba(54, 162, 235, 1)',
       borderWidth: 1,
@@ -173,7 +124,7 @@ const Dashboard = () => {
       },
       {
         label: 'Adjustments',
-        data: movementsData.map(day => day.ADJ),
+        data: movementsData.map(day => Math.abs(day.ADJ)),
         borderColor: 'rgba(255, 206, 86, 1)',
         backgroundColor: 'rgba(255, 206, 86, 0.2)',
         tension: 0.1,
@@ -185,9 +136,9 @@ const Dashboard = () => {
     labels: ['Stock In', 'Stock Out', 'Adjustments'],
     datasets: [{
       data: [
-        stockMovements.filter(m => m.movement_type === 'IN').reduce((sum, m) => sum + m.quantity, 0),
-        stockMovements.filter(m => m.movement_type === 'OUT').reduce((sum, m) => sum + m.quantity, 0),
-        Math.abs(stockMovements.filter(m => m.movement_type === 'ADJ').reduce((sum, m) => sum + m.quantity, 0))
+        movementTotals.IN,
+        movementTotals.OUT,
+        Math.abs(movementTotals.ADJ)
       ],
       backgroundColor: [
         'rgba(75, 192, 192, 0.6)',
@@ -213,7 +164,7 @@ const Dashboard = () => {
           <div className="card bg-primary text-white">
             <div className="card-body">
               <h5 className="card-title">Total Products</h5>
-              <h3 className="card-text">{getActiveProductsCount()}</h3>
+              <h3 className="card-text">{summary.products.active_products}</h3>
               <small>Active products in catalog</small>
             </div>
           </div>
@@ -222,7 +173,7 @@ const Dashboard = () => {
           <div className="card bg-success text-white">
             <div className="card-body">
               <h5 className="card-title">Inventory Value</h5>
-              <h3 className="card-text">${getTotalInventoryValue().toLocaleString()}</h3>
+              <h3 className="card-text">${Number(summary.products.inventory_value).toLocaleString()}</h3>
               <small>Total current value</small>
             </div>
           </div>
@@ -231,7 +182,7 @@ const Dashboard = () => {
           <div className="card bg-warning text-white">
             <div className="card-body">
               <h5 className="card-title">Low Stock Alert</h5>
-              <h3 className="card-text">{lowStockProducts.length}</h3>
+              <h3 className="card-text">{lowStockCount}</h3>
               <small>Products need restocking</small>
             </div>
           </div>
@@ -240,8 +191,8 @@ const Dashboard = () => {
           <div className="card bg-info text-white">
             <div className="card-body">
               <h5 className="card-title">Recent Movements</h5>
-              <h3 className="card-text">{stockMovements.length}</h3>
-              <small>Total stock transactions</small>
+              <h3 className="card-text">{summary.movements.count}</h3>
+              <small>Stock transactions in the last {summary.window.days} days</small>
             </div>
           </div>
         </div>
@@ -341,7 +292,7 @@ const Dashboard = () => {
                       </tr>
                     </thead>
                     <tbody>
-                      {lowStockProducts.slice(0, 5).map(product => (
+                      {lowStockProducts.map(product => (
                         <tr key={product.id} className="table-warning">
                           <td>{product.name}</td>
                           <td className="text-danger fw-bold">{product.quantity}</td>
@@ -350,8 +301,8 @@ const Dashboard = () => {
                       ))}
                     </tbody>
                   </table>
-                  {lowStockProducts.length > 5 && (
-                    <p className="text-muted small">And {lowStockProducts.length - 5} more...</p>
+                  {lowStockCount > lowStockProducts.length && (
+                    <p className="text-muted small">And {lowStockCount - lowStockProducts.length} more...</p>
                   )}
                 </div>
               ) : (
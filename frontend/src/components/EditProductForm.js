@@ -44,8 +44,8 @@ const EditProductForm = ({ show, handleClose, product, onProductUpdated }) => {
         apiService.getCategories(),
         apiService.getSuppliers(),
       ]);
-      setCategories(categoriesResponse.data);
-      setSuppliers(suppliersResponse.data);
+      setCategories(categoriesResponse.data.results || categoriesResponse.data);
+      setSuppliers(suppliersResponse.data.results || suppliersResponse.data);
     } catch (error) {
       setFetchError('Failed to load categories and suppliers');
       console.error('Error fetching data:', error);
@@ -89,6 +89,8 @@ const EditProductForm = ({ show, handleClose, product, onProductUpdated }) => {
         price: parseFloat(formData.price),
         quantity: parseInt(formData.quantity) || 0,
         min_stock_level: parseInt(formData.min_stock_level) || 0,
+        // Refused with 409 if the product was changed since it was loaded
+        version: product.version,
       };
 
       await apiService.updateProduct(product.id, payload);
@@ -96,7 +98,9 @@ const EditProductForm = ({ show, handleClose, product, onProductUpdated }) => {
       onProductUpdated();
     } catch (error) {
       console.error('Error updating product:', error);
-      if (error.response?.data) {
+      if (error.response?.status === 409) {
+        setFetchError('This product was changed by someone else. Close the form and reopen it to edit the latest version.');
+      } else if (error.response?.data) {
         setErrors(error.response.data);
       }
     } finally {
@@ -1,16 +1,20 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import apiService from '../api';
 import AddProductForm from './AddProductForm';
 import EditProductForm from './EditProductForm';
 import StockAdjustmentForm from './StockAdjustmentForm';
 import 'bootstrap/dist/css/bootstrap.min.css';
 
+const PAGE_SIZE = 10;
+
 const ProductList = () => {
-  const [products, setProducts] = useState([]);
-  const [allProducts, setAllProducts] = useState([]); // Store all fetched products
+  const [products, setProducts] = useState([]); // The visible page only
   const [loading, setLoading] = useState(true);
+  const [loaded, setLoaded] = useState(false);
   const [error, setError] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
+  const [lowStockOnly, setLowStockOnly] = useState(false);
   const [showAddModal, setShowAddModal] = useState(false);
   const [showEditModal, setShowEditModal] = useState(false);
   const [showStockModal, setShowStockModal] = useState(false);
@@ -18,17 +22,48 @@ const ProductList = () => {
   const [successMessage, setSuccessMessage] = useState('');
   const [sortField, setSortField] = useState('name');
   const [sortDirection, setSortDirection] = useState('asc');
-  const [currentPage, setCurrentPage] = useState(1);
-  const itemsPerPage = 10;
+  // Pages are fetched by the cursor links the API returns
+  const [pageUrl, setPageUrl] = useState(null);
+  const [links, setLinks] = useState({ next: null, previous: null });
+  const [pageIndex, setPageIndex] = useState(0);
+  const [total, setTotal] = useState({ count: 0, estimate: false });
 
-  const refreshProducts = async () => {
+  const loadPage = useCallback(async (url, params) => {
     try {
-      const response = await apiService.getProducts();
-      const allProductsData = response.data.results || response.data;
-      setAllProducts(allProductsData);
+      setLoading(true);
+      const response = url ? await apiService.getPage(url) : await apiService.getProducts(params);
+      const page = response.data.results || response.data;
+      setProducts(page);
+      setLinks({ next: response.data.next || null, previous: response.data.previous || null });
+      if (response.data.count !== undefined) {
+        setTotal({ count: response.data.count, estimate: response.data.count_is_estimate });
+      } else if (!url) {
+        setTotal({ count: page.length, estimate: false });
+      }
+      setError(null);
     } catch (err) {
-      console.error('Error refreshing products:', err);
+      setError('Failed to fetch products');
+      console.error('Error fetching products:', err);
+    } finally {
+      setLoading(false);
+      setLoaded(true);
     }
+  }, []);
+
+  const firstPageParams = useCallback(() => {
+    const params = {
+      page_size: PAGE_SIZE,
+      ordering: `${sortDirection === 'desc' ? '-' : ''}${sortField}`,
+      count: 'true',
+    };
+    if (debouncedSearch) params.search = debouncedSearch;
+    if (lowStockOnly) params.low_stock = 'true';
+    return params;
+  }, [sortField, sortDirection, debouncedSearch, lowStockOnly]);
+
+  const refreshProducts = () => {
+    // Re-fetch just the page being looked at
+    loadPage(pageUrl, firstPageParams());
   };
 
   const handleProductAdded = () => {
@@ -83,60 +118,17 @@ const ProductList = () => {
   };
 
   useEffect(() => {
-    const fetchProducts = async () => {
-      try {
-        setLoading(true);
-        const response = await apiService.getProducts();
-        const allProductsData = response.data.results || response.data;
-        setAllProducts(allProductsData);
-        setError(null);
-      } catch (err) {
-        setError('Failed to fetch products');
-        console.error('Error fetching products:', err);
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchProducts();
-  }, []);
+    // Wait for a pause in typing before searching
+    const timer = setTimeout(() => setDebouncedSearch(searchTerm.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
   useEffect(() => {
-    // Filter and sort products based on search term and sort settings
-    let filtered = allProducts;
-
-    if (searchTerm) {
-      filtered = allProducts.filter(product =>
-        product.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        product.sku.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        (product.category_name && product.category_name.toLowerCase().includes(searchTerm.toLowerCase())) ||
-        (product.supplier_name && product.supplier_name.toLowerCase().includes(searchTerm.toLowerCase()))
-      );
-    }
-
-    // Sort products
-    filtered.sort((a, b) => {
-      let aValue = a[sortField];
-      let bValue = b[sortField];
-
-      // Handle null/undefined values
-      if (aValue == null) aValue = '';
-      if (bValue == null) bValue = '';
-
-      // Handle different data types
-      if (typeof aValue === 'string') aValue = aValue.toLowerCase();
-      if (typeof bValue === 'string') bValue = bValue.toLowerCase();
-
-      if (sortDirection === 'asc') {
-        return aValue > bValue ? 1 : aValue < bValue ? -1 : 0;
-      } else {
-        return aValue > bValue ? -1 : aValue < bValue ? 1 : 0;
-      }
-    });
-
-    setProducts(filtered);
-    setCurrentPage(1); // Reset to first page when filtering/sorting changes
-  }, [allProducts, searchTerm, sortField, sortDirection]);
+    // Back to the first page whenever the search, filter or sort changes
+    setPageUrl(null);
+    setPageIndex(0);
+    loadPage(null, firstPageParams());
+  }, [firstPageParams, loadPage]);
 
   const handleSearchChange = (e) => {
     setSearchTerm(e.target.value);
@@ -151,18 +143,23 @@ const ProductList = () => {
     }
   };
 
-  // Pagination logic
-  const totalPages = Math.ceil(products.length / itemsPerPage);
-  const startIndex = (currentPage - 1) * itemsPerPage;
-  const paginatedProducts = products.slice(startIndex, startIndex + itemsPerPage);
+  const sortableHeader = (field, label) => (
+    <th style={{cursor: 'pointer'}} onClick={() => handleSort(field)}>
+      {label} {sortField === field && (sortDirection === 'asc' ? '↑' : '↓')}
+    </th>
+  );
 
-  const handlePageChange = (page) => {
-    if (page >= 1 && page <= totalPages) {
-      setCurrentPage(page);
-    }
+  const handlePageChange = (url, step) => {
+    if (!url) return;
+    setPageUrl(url);
+    setPageIndex(pageIndex + step);
+    loadPage(url);
   };
 
-  if (loading && products.length === 0) {
+  const startIndex = pageIndex * PAGE_SIZE;
+  const totalLabel = total.estimate ? `about ${total.count.toLocaleString()}` : total.count.toLocaleString();
+
+  if (!loaded) {
     return (
       <div className="container mt-4">
         <div className="text-center">
@@ -201,15 +198,27 @@ const ProductList = () => {
         </div>
       )}
 
-      {/* Search Input */}
-      <div className="mb-3">
-        <input
-          type="text"
-          className="form-control"
-          placeholder="Search products..."
-          value={searchTerm}
-          onChange={handleSearchChange}
-        />
+      {/* Search and filters */}
+      <div className="row g-2 align-items-center mb-3">
+        <div className="col">
+          <input
+            type="text"
+            className="form-control"
+            placeholder="Search products..."
+            value={searchTerm}
+            onChange={handleSearchChange}
+          />
+        </div>
+        <div className="col-auto form-check ms-2">
+          <input
+            type="checkbox"
+            className="form-check-input"
+            id="lowStockOnly"
+            checked={lowStockOnly}
+            onChange={(e) => setLowStockOnly(e.target.checked)}
+          />
+          <label className="form-check-label" htmlFor="lowStockOnly">Low stock only</label>
+        </div>
       </div>
 
       {error && (
@@ -224,22 +233,14 @@ const ProductList = () => {
           <thead className="table-dark">
             <tr>
               <th>Image</th>
-              <th style={{cursor: 'pointer'}} onClick={() => handleSort('name')}>
-                Name {sortField === 'name' && (sortDirection === 'asc' ? '↑' : '↓')}
-              </th>
-              <th style={{cursor: 'pointer'}} onClick={() => handleSort('sku')}>
-                SKU {sortField === 'sku' && (sortDirection === 'asc' ? '↑' : '↓')}
-              </th>
-              <th style={{cursor: 'pointer'}} onClick={() => handleSort('price')}>
-                Price {sortField === 'price' && (sortDirection === 'asc' ? '↑' : '↓')}
-              </th>
-              <th style={{cursor: 'pointer'}} onClick={() => handleSort('quantity')}>
-                Quantity {sortField === 'quantity' && (sortDirection === 'asc' ? '↑' : '↓')}
-              </th>
-              <th>Min Stock</th>
-              <th>Category</th>
-              <th>Supplier</th>
-              <th>Status</th>
+              {sortableHeader('name', 'Name')}
+              {sortableHeader('sku', 'SKU')}
+              {sortableHeader('price', 'Price')}
+              {sortableHeader('quantity', 'Quantity')}
+              {sortableHeader('min_stock_level', 'Min Stock')}
+              {sortableHeader('category_name', 'Category')}
+              {sortableHeader('supplier_name', 'Supplier')}
+              {sortableHeader('is_active', 'Status')}
               <th>Actions</th>
             </tr>
           </thead>
@@ -251,12 +252,12 @@ const ProductList = () => {
                 </td>
               </tr>
             ) : (
-              paginatedProducts.map((product) => (
+              products.map((product) => (
                 <tr key={product.id}>
                   <td>
                     {product.image ? (
                       <img
-                        src={product.image}
+                        src={product.image_thumb || product.image}
                         alt={product.name}
                         className="img-thumbnail"
                         style={{ width: '50px', height: '50px', objectFit: 'cover' }}
@@ -318,53 +319,42 @@ const ProductList = () => {
       </div>
 
       {/* Pagination Controls */}
-      {products.length > itemsPerPage && (
+      {(links.next || links.previous) && (
         <nav aria-label="Products pagination" className="mt-4">
           <ul className="pagination justify-content-center">
-            <li className={`page-item ${currentPage === 1 ? 'disabled' : ''}`}>
+            <li className={`page-item ${links.previous ? '' : 'disabled'}`}>
               <button
                 className="page-link"
-                onClick={() => handlePageChange(currentPage - 1)}
-                disabled={currentPage === 1}
+                onClick={() => handlePageChange(links.previous, -1)}
+                disabled={!links.previous}
               >
                 Previous
               </button>
             </li>
-
-            {Array.from({ length: Math.min(5, totalPages) }, (_, i) => {
-              const pageNum = Math.max(1, Math.min(totalPages - 4, currentPage - 2)) + i;
-              if (pageNum > totalPages) return null;
-              return (
-                <li key={pageNum} className={`page-item ${pageNum === currentPage ? 'active' : ''}`}>
-                  <button
-                    className="page-link"
-                    onClick={() => handlePageChange(pageNum)}
-                  >
-                    {pageNum}
-                  </button>
-                </li>
-              );
-            })}
-
-            <li className={`page-item ${currentPage === totalPages ? 'disabled' : ''}`}>
+            <li className="page-item active">
+              <span className="page-link">{pageIndex + 1}</span>
+            </li>
+            <li className={`page-item ${links.next ? '' : 'disabled'}`}>
               <button
                 className="page-link"
-                onClick={() => handlePageChange(currentPage + 1)}
-                disabled={currentPage === totalPages}
+                onClick={() => handlePageChange(links.next, 1)}
+                disabled={!links.next}
               >
                 Next
               </button>
             </li>
           </ul>
-
-          <div className="text-center mt-2">
-            <small className="text-muted">
-              Showing {startIndex + 1} to {Math.min(startIndex + itemsPerPage, products.length)} of {products.length} products
-            </small>
-          </div>
         </nav>
       )}
 
+      {products.length > 0 && (
+        <div className="text-center mt-2">
+          <small className="text-muted">
+            Showing {startIndex + 1} to {startIndex + products.length} of {totalLabel} products
+          </small>
+        </div>
+      )}
+
       {loading && products.length > 0 && (
         <div className="text-center mt-3">
           <div className="spinner-border spinner-border-sm" role="status">